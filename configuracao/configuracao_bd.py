@@ -1,55 +1,132 @@
 import os
-from typing import Optional
-from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, Optional
+from dataclasses import dataclass, field
 
-@dataclass
+# Keepalive TCP enviado ao servidor na abertura de cada conexão do pool,
+# para que conexões ociosas sobrevivam a NATs/firewalls
+KEEPALIVE_TCP = {
+    "tcp_keepalives_idle": "30",
+    "tcp_keepalives_interval": "10",
+    "tcp_keepalives_count": "5",
+}
+
+def _para_bool(valor: str) -> bool:
+    """Converte o texto de uma variável de ambiente em booleano."""
+    return valor.strip().lower() in ("1", "true", "sim", "yes", "on")
+
+@lru_cache(maxsize=None)
+def _ler_env(nome: str, padrao: str, conversor: Callable[[str], Any] = str) -> Any:
+    """Lê (uma única vez) e converte uma variável de ambiente."""
+    return conversor(os.getenv(nome, padrao))
+
+@lru_cache(maxsize=None)
+def obter_processos_web() -> int:
+    """
+    Número de workers do uvicorn (um processo e um pool de conexões cada):
+    1 em desenvolvimento (DEV), senão WEB_CONCURRENCY ou um por CPU.
+    """
+    if os.getenv("DEV"):
+        return 1
+    return max(1, int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+
+@dataclass(frozen=True, slots=True)
 class ConfiguracaoBancoDados:
     """
     Utiliza variáveis de ambiente quando disponíveis,
     com valores padrão para desenvolvimento local.
     """
     
-    host: str = os.getenv("POSTGRES_HOST", "localhost")
-    porta: int = int(os.getenv("POSTGRES_PORT", "5432"))
-    nome_banco: str = os.getenv("POSTGRES_DB", "agente_otimizacao")
-    usuario: str = os.getenv("POSTGRES_USER", "postgres")
-    senha: str = os.getenv("POSTGRES_PASSWORD", "postgres123")
+    host: str = field(default_factory=lambda: _ler_env("POSTGRES_HOST", "localhost"))
+    porta: int = field(default_factory=lambda: _ler_env("POSTGRES_PORT", "5432", int))
+    nome_banco: str = field(default_factory=lambda: _ler_env("POSTGRES_DB", "agente_otimizacao"))
+    usuario: str = field(default_factory=lambda: _ler_env("POSTGRES_USER", "postgres"))
+    senha: str = field(default_factory=lambda: _ler_env("POSTGRES_PASSWORD", "postgres123"))
     
-    min_conexoes: int = int(os.getenv("DB_MIN_CONNECTIONS", "2"))
-    max_conexoes: int = int(os.getenv("DB_MAX_CONNECTIONS", "10"))
+    # Limites de conexões da aplicação inteira, repartidos entre os workers
+    min_conexoes: int = field(default_factory=lambda: _ler_env("DB_MIN_CONNECTIONS", "2", int))
+    max_conexoes: int = field(default_factory=lambda: _ler_env("DB_MAX_CONNECTIONS", "10", int))
+    max_overflow: int = field(default_factory=lambda: _ler_env("DB_MAX_OVERFLOW", "20", int))
+    pool_recycle: int = field(default_factory=lambda: _ler_env("DB_POOL_RECYCLE", "1800", int))
+    pool_pre_ping: bool = field(default_factory=lambda: _ler_env("DB_POOL_PRE_PING", "true", _para_bool))
     
-    timeout_conexao: int = int(os.getenv("DB_CONNECTION_TIMEOUT", "30"))
-    timeout_comando: int = int(os.getenv("DB_COMMAND_TIMEOUT", "60"))
+    timeout_conexao: int = field(default_factory=lambda: _ler_env("DB_CONNECTION_TIMEOUT", "30", int))
+    timeout_comando: int = field(default_factory=lambda: _ler_env("DB_COMMAND_TIMEOUT", "60", int))
     
-    @property
-    def url_conexao(self) -> str:
-        """Retorna a URL de conexão PostgreSQL."""
-        return f"postgresql://{self.usuario}:{self.senha}@{self.host}:{self.porta}/{self.nome_banco}"
+    processos_web: int = field(default_factory=obter_processos_web)
+    
+    # URL, texto e parâmetros do pool montados uma única vez em __post_init__
+    # (a instância é imutável)
+    _url_conexao_async: str = field(init=False, repr=False, compare=False)
+    _texto: str = field(init=False, repr=False, compare=False)
+    _kwargs_pool: Mapping[str, Any] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Cada worker abre o próprio pool: o total não passa de
+        # max_conexoes + max_overflow (nem estoura o max_connections do servidor)
+        max_pool = max(1, (self.max_conexoes + self.max_overflow) // self.processos_web)
+        object.__setattr__(
+            self,
+            "_url_conexao_async",
+            f"postgresql+asyncpg://{self.usuario}:{self.senha}@{self.host}:{self.porta}/{self.nome_banco}"
+        )
+        object.__setattr__(
+            self,
+            "_texto",
+            f"ConfiguracaoBancoDados("
+            f"host={self.host}, "
+            f"porta={self.porta}, "
+            f"banco={self.nome_banco}, "
+            f"usuario={self.usuario}, "
+            f"pool={self.min_conexoes}-{self.max_conexoes})"
+        )
+        object.__setattr__(
+            self,
+            "_kwargs_pool",
+            MappingProxyType({
+                "host": self.host,
+                "port": self.porta,
+                "user": self.usuario,
+                "password": self.senha,
+                "database": self.nome_banco,
+                "min_size": min(self.min_conexoes, max_pool),
+                # asyncpg não tem overflow: a folga entra no limite do pool
+                "max_size": max_pool,
+                "max_inactive_connection_lifetime": self.pool_recycle,
+                "timeout": self.timeout_conexao,
+                "command_timeout": self.timeout_comando,
+                "server_settings": KEEPALIVE_TCP,
+            })
+        )
     
     @property
     def url_conexao_async(self) -> str:
         """Retorna a URL de conexão PostgreSQL para uso assíncrono."""
-        return f"postgresql+asyncpg://{self.usuario}:{self.senha}@{self.host}:{self.porta}/{self.nome_banco}"
+        return self._url_conexao_async
+    
+    @property
+    def kwargs_pool(self) -> Mapping[str, Any]:
+        """Argumentos (somente leitura) para asyncpg.create_pool."""
+        return self._kwargs_pool
     
     def validar_configuracao(self) -> bool:
         """  
         Returns:
             True se a configuração é válida, False caso contrário
         """
-        campos_obrigatorios = [
-            self.host, self.nome_banco, self.usuario, self.senha
-        ]
-        
-        return all(campo for campo in campos_obrigatorios)
+        return (
+            bool(self.host)
+            and bool(self.nome_banco)
+            and bool(self.usuario)
+            and bool(self.senha)
+        )
     
     def __str__(self) -> str:
         """Representação string da configuração (sem senha)."""
-        return (
-            f"ConfiguracaoBancoDados("
-            f"host={self.host}, "
-            f"porta={self.porta}, "
-            f"banco={self.nome_banco}, "
-            f"usuario={self.usuario}, "
-            f"pool={self.min_conexoes}-{self.max_conexoes})"
-        )
+        return self._texto
 
+@lru_cache(maxsize=None)
+def obter_configuracao() -> ConfiguracaoBancoDados:
+    """Retorna a configuração do processo, construída uma única vez."""
+    return ConfiguracaoBancoDados()
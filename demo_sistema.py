@@ -8,40 +8,43 @@ sem depender de configurações complexas de banco de dados.
 
 import asyncio
 import sys
-import os
-from datetime import datetime
-
-# Adiciona o diretório do projeto ao path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import time
 
 from servicos.analisador_codigo import AnalisadorCodigo
 from modelos.schemas import NivelDetalhamento
 
+# Instância única compartilhada por todas as demonstrações (reaproveita o cache)
+ANALISADOR = AnalisadorCodigo()
+
+# Linha separadora montada uma única vez
+_BANNER = "\n" + "=" * 60
+
 def print_header(titulo):
     """Imprime cabeçalho formatado."""
-    print("\n" + "="*60)
-    print(f"  {titulo}")
-    print("="*60)
+    sys.stdout.write(f"{_BANNER}\n  {titulo}{_BANNER}\n")
 
 def print_sugestao(sugestao, indice):
     """Imprime uma sugestão formatada."""
-    print(f"\n📋 Sugestão {indice + 1}:")
-    print(f"   Tipo: {sugestao.tipo.value}")
-    print(f"   Título: {sugestao.titulo}")
-    print(f"   Prioridade: {sugestao.prioridade}/10")
-    print(f"   Impacto: {sugestao.impacto.value}")
-    print(f"   Descrição: {sugestao.descricao}")
+    linhas = [
+        f"\n📋 Sugestão {indice + 1}:",
+        f"   Tipo: {sugestao.tipo}",
+        f"   Título: {sugestao.titulo}",
+        f"   Prioridade: {sugestao.prioridade}/10",
+        f"   Impacto: {sugestao.impacto}",
+        f"   Descrição: {sugestao.descricao}",
+    ]
     
     if sugestao.codigo_sugerido:
-        print(f"   💡 Código sugerido:")
-        print(f"   {sugestao.codigo_sugerido}")
+        linhas.append(f"   💡 Código sugerido:")
+        linhas.append(f"   {sugestao.codigo_sugerido}")
+    
+    # Uma única escrita por sugestão
+    sys.stdout.write("\n".join(linhas) + "\n")
 
-async def demonstrar_analise_basica():
+async def demonstrar_analise_basica(analisador):
     """Demonstra análise básica de código."""
     print_header("DEMONSTRAÇÃO: ANÁLISE BÁSICA DE CÓDIGO")
     
-    analisador = AnalisadorCodigo()
-    
     codigo_exemplo = """
 def calcular_media(numeros):
     soma = 0
@@ -58,7 +61,7 @@ print(resultado)
     print(codigo_exemplo)
     
     print("\n🔍 Executando análise...")
-    inicio = datetime.now()
+    inicio = time.perf_counter_ns()
     
     try:
         sugestoes = await analisador.analisar_codigo(
@@ -66,8 +69,7 @@ print(resultado)
             nivel_detalhamento=NivelDetalhamento.INTERMEDIARIO
         )
         
-        fim = datetime.now()
-        tempo_analise = (fim - inicio).total_seconds()
+        tempo_analise = (time.perf_counter_ns() - inicio) / 1e9
         
         pontuacao = analisador.calcular_pontuacao_qualidade(codigo_exemplo)
         
@@ -85,12 +87,10 @@ print(resultado)
     except Exception as e:
         print(f"❌ Erro durante análise: {e}")
 
-async def demonstrar_diferentes_niveis():
+async def demonstrar_diferentes_niveis(analisador):
     """Demonstra análise com diferentes níveis de detalhamento."""
     print_header("DEMONSTRAÇÃO: DIFERENTES NÍVEIS DE DETALHAMENTO")
     
-    analisador = AnalisadorCodigo()
-    
     codigo_complexo = """
 def funcao_complexa(dados):
     resultado = []
@@ -120,16 +120,27 @@ def processar_dados(lista_dados):
         (NivelDetalhamento.AVANCADO, "Avançado")
     ]
     
-    for nivel, nome in niveis:
+    # A pontuação não depende do nível de detalhamento
+    pontuacao = analisador.calcular_pontuacao_qualidade(codigo_complexo)
+    
+    async def analisar_cronometrado(nivel):
+        inicio = time.perf_counter_ns()
+        sugestoes = await analisador.analisar_codigo(codigo_complexo, nivel)
+        return sugestoes, (time.perf_counter_ns() - inicio) / 1e9
+    
+    # Os três níveis são analisados concorrentemente
+    resultados = await asyncio.gather(
+        *(analisar_cronometrado(nivel) for nivel, _ in niveis),
+        return_exceptions=True
+    )
+    
+    for (nivel, nome), resultado in zip(niveis, resultados):
         print(f"\n🔍 Análise {nome}...")
         
         try:
-            inicio = datetime.now()
-            sugestoes = await analisador.analisar_codigo(codigo_complexo, nivel)
-            fim = datetime.now()
-            
-            tempo = (fim - inicio).total_seconds()
-            pontuacao = analisador.calcular_pontuacao_qualidade(codigo_complexo)
+            if isinstance(resultado, Exception):
+                raise resultado
+            sugestoes, tempo = resultado
             
             print(f"   ⏱️  Tempo: {tempo:.2f}s")
             print(f"   📊 Pontuação: {pontuacao:.1f}/100")
@@ -138,12 +149,10 @@ def processar_dados(lista_dados):
         except Exception as e:
             print(f"   ❌ Erro: {e}")
 
-async def demonstrar_tipos_problemas():
+async def demonstrar_tipos_problemas(analisador):
     """Demonstra detecção de diferentes tipos de problemas."""
     print_header("DEMONSTRAÇÃO: DETECÇÃO DE DIFERENTES TIPOS DE PROBLEMAS")
     
-    analisador = AnalisadorCodigo()
-    
     exemplos = [
         ("Performance", """
 def buscar_item(lista, item):
@@ -172,17 +181,26 @@ eval(user_input)
 """)
     ]
     
-    for categoria, codigo in exemplos:
+    # Os quatro exemplos são analisados concorrentemente
+    resultados = await asyncio.gather(
+        *(
+            analisador.analisar_com_pontuacao(
+                codigo,
+                nivel_detalhamento=NivelDetalhamento.INTERMEDIARIO
+            )
+            for _, codigo in exemplos
+        ),
+        return_exceptions=True
+    )
+    
+    for (categoria, codigo), resultado in zip(exemplos, resultados):
         print(f"\n🔍 Analisando problemas de {categoria}:")
         print(f"📝 Código: {codigo.strip()[:100]}...")
         
         try:
-            sugestoes = await analisador.analisar_codigo(
-                codigo,
-                nivel_detalhamento=NivelDetalhamento.INTERMEDIARIO
-            )
-            
-            pontuacao = analisador.calcular_pontuacao_qualidade(codigo)
+            if isinstance(resultado, Exception):
+                raise resultado
+            sugestoes, pontuacao = resultado
             
             print(f"   📊 Pontuação: {pontuacao:.1f}/100")
             print(f"   📋 Sugestões: {len(sugestoes)}")
@@ -195,12 +213,10 @@ eval(user_input)
         except Exception as e:
             print(f"   ❌ Erro: {e}")
 
-def demonstrar_pontuacao():
+def demonstrar_pontuacao(analisador):
     """Demonstra sistema de pontuação."""
     print_header("DEMONSTRAÇÃO: SISTEMA DE PONTUAÇÃO DE QUALIDADE")
     
-    analisador = AnalisadorCodigo()
-    
     exemplos = [
         ("Código Excelente", '''
 def calcular_media(numeros: list[float]) -> float:
@@ -266,10 +282,10 @@ async def main():
     
     try:
         # Demonstrações
-        await demonstrar_analise_basica()
-        await demonstrar_diferentes_niveis()
-        await demonstrar_tipos_problemas()
-        demonstrar_pontuacao()
+        await demonstrar_analise_basica(ANALISADOR)
+        await demonstrar_diferentes_niveis(ANALISADOR)
+        await demonstrar_tipos_problemas(ANALISADOR)
+        demonstrar_pontuacao(ANALISADOR)
         
         print_header("DEMONSTRAÇÃO CONCLUÍDA")
         print("✅ Todas as funcionalidades principais foram demonstradas!")
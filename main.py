@@ -6,15 +6,29 @@ Este agente fornece sugestões de otimização de código Python
 baseadas em boas práticas e padrões de qualidade.
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from typing import List, Optional
 import uvicorn
+from contextvars import ContextVar
 from datetime import datetime
+import importlib.util
 import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
 
-from servicos.analisador_codigo import AnalisadorCodigo
+from configuracao.configuracao_bd import obter_processos_web
+from servicos.analisador_codigo import (
+    AnalisadorCodigo,
+    encerrar_pool_processos,
+    iniciar_pool_processos
+)
 from servicos.banco_dados import GerenciadorBancoDados
 from modelos.schemas import (
     SolicitacaoAnalise,
@@ -23,8 +37,13 @@ from modelos.schemas import (
     HistoricoAnalise
 )
 
-# Configuração de logging
-logging.basicConfig(level=logging.INFO)
+# Configuração de logging: os handlers da aplicação apenas enfileiram os
+# registros; a escrita em stdout acontece na thread do QueueListener
+_fila_logs: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_handler_saida = logging.StreamHandler()
+_handler_saida.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+_listener_logs = QueueListener(_fila_logs, _handler_saida, respect_handler_level=True)
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_fila_logs)])
 logger = logging.getLogger(__name__)
 
 # Inicialização da aplicação
@@ -36,23 +55,57 @@ app = FastAPI(
     redoc_url="/documentacao-redoc"
 )
 
-# Configuração CORS para permitir acesso de qualquer origem
+# Origens CORS permitidas (CORS_ORIGINS, separadas por vírgula). O conjunto
+# é repassado ao middleware, tornando a checagem da origem O(1)
+FROZEN_ORIGINS = frozenset(
+    origem.strip()
+    for origem in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+    if origem.strip()
+)
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=FROZEN_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=86400,
 )
 
 # Instâncias dos serviços
-analisador = AnalisadorCodigo()
 gerenciador_bd = GerenciadorBancoDados()
+analisador = AnalisadorCodigo(cache_persistente=gerenciador_bd)
+
+# Instante de início da requisição corrente, lido uma vez pelo middleware
+_now_ctx: ContextVar[datetime] = ContextVar("agora_requisicao")
+
+# Resultado da última verificação do banco no /health: (instante monotônico, status)
+TTL_STATUS_BANCO = 1.0
+_status_bd_cache: Optional[tuple] = None
+
+@app.middleware("http")
+async def _set_now(request, call_next):
+    """Registra o timestamp da requisição para reuso nos endpoints."""
+    _now_ctx.set(datetime.now())
+    return await call_next(request)
+
+async def _status_banco() -> bool:
+    """Verifica a conexão com o banco, reaproveitando o resultado por TTL_STATUS_BANCO segundos."""
+    global _status_bd_cache
+    agora = time.monotonic()
+    if _status_bd_cache is not None and agora - _status_bd_cache[0] < TTL_STATUS_BANCO:
+        return _status_bd_cache[1]
+    
+    status = await gerenciador_bd.verificar_conexao()
+    _status_bd_cache = (agora, status)
+    return status
 
 @app.on_event("startup")
 async def inicializar_aplicacao():
     """Inicializa a aplicação e configura o banco de dados."""
+    _listener_logs.start()
     logger.info("Iniciando Agente de Otimização de Código...")
+    iniciar_pool_processos()
     await gerenciador_bd.inicializar_banco()
     logger.info("Aplicação iniciada com sucesso!")
 
@@ -61,7 +114,9 @@ async def finalizar_aplicacao():
     """Finaliza a aplicação e fecha conexões."""
     logger.info("Finalizando aplicação...")
     await gerenciador_bd.fechar_conexoes()
+    encerrar_pool_processos()
     logger.info("Aplicação finalizada!")
+    _listener_logs.stop()
 
 @app.get("/health", response_model=StatusSaude, tags=["Saúde"])
 async def verificar_saude():
@@ -73,11 +128,11 @@ async def verificar_saude():
     """
     try:
         # Verifica conexão com banco de dados
-        status_bd = await gerenciador_bd.verificar_conexao()
+        status_bd = await _status_banco()
         
         return StatusSaude(
             status="ok",
-            timestamp=datetime.now(),
+            timestamp=_now_ctx.get(),
             versao="1.0.0",
             banco_dados=status_bd,
             servicos_ativos=["analisador_codigo", "banco_dados"]
@@ -87,37 +142,43 @@ async def verificar_saude():
         raise HTTPException(status_code=503, detail="Serviço indisponível")
 
 @app.post("/analyze-code", response_model=RespostaAnalise, tags=["Análise"])
-async def analisar_codigo(solicitacao: SolicitacaoAnalise):
+async def analisar_codigo(solicitacao: SolicitacaoAnalise, background: BackgroundTasks):
     """
     Endpoint principal para análise de código Python.
     
     Args:
         solicitacao: Dados da solicitação contendo o código a ser analisado
+        background: Tarefas executadas após o envio da resposta
         
     Returns:
         RespostaAnalise: Sugestões de otimização e melhorias
     """
     try:
-        logger.info(f"Iniciando análise de código para: {solicitacao.nome_arquivo or 'código anônimo'}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Iniciando análise de código para: {solicitacao.nome_arquivo or 'código anônimo'}")
         
-        # Realiza a análise do código
-        sugestoes = await analisador.analisar_codigo(
+        # Realiza a análise do código; o tempo é medido aqui porque o
+        # analisador é compartilhado entre requisições simultâneas
+        inicio_tempo = time.perf_counter()
+        sugestoes, pontuacao = await analisador.analisar_com_pontuacao(
             codigo=solicitacao.codigo,
             nivel_detalhamento=solicitacao.nivel_detalhamento,
-            focar_performance=solicitacao.focar_performance
+            focar_performance=solicitacao.focar_performance,
+            arvore_ast=solicitacao.arvore_ast
         )
         
         # Prepara a resposta
         resposta = RespostaAnalise(
             codigo_original=solicitacao.codigo,
             sugestoes=sugestoes,
-            pontuacao_qualidade=analisador.calcular_pontuacao_qualidade(solicitacao.codigo),
-            tempo_analise=analisador.ultimo_tempo_analise,
-            timestamp=datetime.now()
+            pontuacao_qualidade=pontuacao,
+            tempo_analise=time.perf_counter() - inicio_tempo,
+            timestamp=_now_ctx.get()
         )
         
-        # Salva no histórico
-        await gerenciador_bd.salvar_analise(
+        # Salva no histórico depois que a resposta for enviada
+        background.add_task(
+            _salvar_historico,
             codigo=solicitacao.codigo,
             sugestoes=sugestoes,
             pontuacao=resposta.pontuacao_qualidade,
@@ -131,7 +192,22 @@ async def analisar_codigo(solicitacao: SolicitacaoAnalise):
         logger.error(f"Erro durante análise: {e}")
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
-@app.get("/historico", response_model=List[HistoricoAnalise], tags=["Histórico"])
+async def _salvar_historico(**dados):
+    """Persiste uma análise no histórico fora do caminho da requisição."""
+    try:
+        await gerenciador_bd.salvar_analise(**dados)
+    except Exception:
+        # salvar_analise já registrou o erro e a resposta já foi enviada
+        pass
+
+# O corpo é serializado pela própria rota, registro a registro, cada um
+# validado por HistoricoAnalise; o modelo em responses documenta o OpenAPI
+@app.get(
+    "/historico",
+    response_class=StreamingResponse,
+    responses={200: {"model": List[HistoricoAnalise]}},
+    tags=["Histórico"]
+)
 async def obter_historico(
     limite: int = 10,
     offset: int = 0,
@@ -146,18 +222,43 @@ async def obter_historico(
         nome_arquivo: Filtrar por nome de arquivo específico
         
     Returns:
-        List[HistoricoAnalise]: Lista de análises realizadas
+        StreamingResponse: Array JSON de HistoricoAnalise, serializado registro a registro
     """
+    registros = gerenciador_bd.stream_historico(
+        limite=limite,
+        offset=offset,
+        nome_arquivo=nome_arquivo
+    )
+    
+    # Lê o primeiro registro antes de responder, para que falhas de banco
+    # ainda resultem em 500 em vez de um corpo truncado
     try:
-        historico = await gerenciador_bd.obter_historico(
-            limite=limite,
-            offset=offset,
-            nome_arquivo=nome_arquivo
-        )
-        return historico
+        primeiro = await anext(registros, None)
+        if primeiro is not None:
+            primeiro = HistoricoAnalise.model_validate(primeiro)
     except Exception as e:
+        await registros.aclose()
         logger.error(f"Erro ao obter histórico: {e}")
         raise HTTPException(status_code=500, detail="Erro ao acessar histórico")
+    
+    async def gerar_json():
+        try:
+            yield "["
+            if primeiro is not None:
+                yield primeiro.model_dump_json()
+                async for registro in registros:
+                    yield "," + HistoricoAnalise.model_validate(registro).model_dump_json()
+            yield "]"
+        finally:
+            await registros.aclose()
+    
+    # A tarefa de fundo fecha o gerador também quando o corpo nem chega a ser
+    # iterado (cliente desconectado antes do primeiro envio)
+    return StreamingResponse(
+        gerar_json(),
+        media_type="application/json",
+        background=BackgroundTask(registros.aclose)
+    )
 
 @app.get("/estatisticas", tags=["Estatísticas"])
 async def obter_estatisticas():
@@ -174,12 +275,24 @@ async def obter_estatisticas():
         logger.error(f"Erro ao obter estatísticas: {e}")
         raise HTTPException(status_code=500, detail="Erro ao acessar estatísticas")
 
+def _modulo_disponivel(nome: str) -> bool:
+    """Verifica se um módulo opcional está instalado sem importá-lo."""
+    return importlib.util.find_spec(nome) is not None
+
 if __name__ == "__main__":
+    # Reload só em desenvolvimento; em produção, um worker por CPU (ou
+    # WEB_CONCURRENCY), com as conexões do banco repartidas entre eles
+    modo_desenvolvimento = bool(os.getenv("DEV"))
+    usar_uvloop = sys.platform != "win32" and _modulo_disponivel("uvloop")
+    
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=modo_desenvolvimento,
+        workers=obter_processos_web(),
+        loop="uvloop" if usar_uvloop else "asyncio",
+        http="httptools" if _modulo_disponivel("httptools") else "h11",
         log_level="info"
     )
 
@@ -5,11 +5,19 @@ Define as estruturas de dados utilizadas na API para
 solicitações, respostas e armazenamento no banco de dados.
 """
 
-from pydantic import BaseModel, Field, validator
+import ast
+import hashlib
+from collections import OrderedDict
+
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_validator, model_validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
 
+# Digests (BLAKE2b) de códigos com sintaxe já validada, em LRU limitado
+TAMANHO_CACHE_VALIDACAO = 1024
+_codigos_validados: "OrderedDict[bytes, bool]" = OrderedDict()
+
 class NivelDetalhamento(str, Enum):
     """Níveis de detalhamento para análise de código."""
     BASICO = "basico"
@@ -24,9 +32,14 @@ class TipoSugestao(str, Enum):
     SEGURANCA = "seguranca"
     MANUTENCAO = "manutencao"
 
+# Valores textuais pré-computados, evitando o acesso a .value em caminhos quentes
+NIVEL_VALUES: Dict[NivelDetalhamento, str] = {n: n.value for n in NivelDetalhamento}
+
 class SolicitacaoAnalise(BaseModel):
     """Modelo para solicitação de análise de código."""
     
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     codigo: str = Field(
         ...,
         description="Código Python a ser analisado",
@@ -50,23 +63,50 @@ class SolicitacaoAnalise(BaseModel):
         description="Focar especificamente em otimizações de performance"
     )
     
-    @validator('codigo')
-    def validar_codigo(cls, v):
-        """Valida se o código não está vazio e contém Python válido."""
+    # AST gerada na validação, reaproveitada pelo analisador
+    _arvore_ast: Optional[ast.AST] = PrivateAttr(default=None)
+    
+    @field_validator('codigo')
+    @classmethod
+    def validar_codigo(cls, v: str) -> str:
+        """Valida se o código não está vazio."""
         if not v.strip():
             raise ValueError("Código não pode estar vazio")
         
-        # Verificação básica de sintaxe Python
+        return v
+    
+    @model_validator(mode='after')
+    def validar_sintaxe(self):
+        """Valida a sintaxe Python, guardando a AST para a análise."""
+        chave = hashlib.blake2b(self.codigo.encode('utf-8'), digest_size=16).digest()
+        if chave in _codigos_validados:
+            # Payload repetido: a sintaxe já foi verificada
+            _codigos_validados.move_to_end(chave)
+            return self
+        
+        # ast.parse não gera bytecode, ao contrário de compile(..., 'exec')
         try:
-            compile(v, '<string>', 'exec')
+            self._arvore_ast = ast.parse(self.codigo)
         except SyntaxError as e:
             raise ValueError(f"Erro de sintaxe no código: {e}")
         
-        return v
+        _codigos_validados[chave] = True
+        if len(_codigos_validados) > TAMANHO_CACHE_VALIDACAO:
+            _codigos_validados.popitem(last=False)
+        
+        return self
+    
+    @property
+    def arvore_ast(self) -> Optional[ast.AST]:
+        """AST do código validado."""
+        return self._arvore_ast
 
 class Sugestao(BaseModel):
     """Modelo para uma sugestão individual de otimização."""
     
+    # tipo é armazenado já como texto, dispensando a conversão na serialização
+    model_config = ConfigDict(frozen=True, extra='forbid', use_enum_values=True)
+    
     tipo: TipoSugestao = Field(
         ...,
         description="Tipo da sugestão"
@@ -120,6 +160,8 @@ class Sugestao(BaseModel):
 class RespostaAnalise(BaseModel):
     """Modelo para resposta da análise de código."""
     
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     codigo_original: str = Field(
         ...,
         description="Código original analisado"
@@ -156,6 +198,8 @@ class RespostaAnalise(BaseModel):
 class StatusSaude(BaseModel):
     """Modelo para status de saúde do sistema."""
     
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     status: str = Field(
         ...,
         description="Status geral do sistema"
@@ -184,6 +228,8 @@ class StatusSaude(BaseModel):
 class HistoricoAnalise(BaseModel):
     """Modelo para histórico de análises."""
     
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     id: int = Field(
         ...,
         description="ID único da análise"
@@ -217,6 +263,8 @@ class HistoricoAnalise(BaseModel):
 class ConfiguracaoCrewAI(BaseModel):
     """Configuração para integração com Crew AI."""
     
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     nome_agente: str = Field(
         default="otimizador_codigo_python",
         description="Nome do agente no Crew AI"
@@ -245,6 +293,8 @@ class ConfiguracaoCrewAI(BaseModel):
 class EstatisticasGerais(BaseModel):
     """Estatísticas gerais do sistema."""
     
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     total_analises: int = Field(
         ...,
         description="Total de análises realizadas"
@@ -13,7 +13,12 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 import asyncpg
-from configuracao.configuracao_bd import ConfiguracaoBancoDados
+from configuracao.configuracao_bd import obter_configuracao
+from servicos.banco_dados import (
+    SQL_FUNCAO_PARTICOES,
+    SQL_GARANTIR_PARTICOES,
+    registrar_mensagem_servidor
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,7 +28,7 @@ logger = logging.getLogger(__name__)
 
 async def criar_banco_se_nao_existir():
     """Cria o banco de dados se ele não existir."""
-    config = ConfiguracaoBancoDados()
+    config = obter_configuracao()
     
     try:
         conexao = await asyncpg.connect(
@@ -53,31 +58,31 @@ async def criar_banco_se_nao_existir():
         logger.error(f"Erro ao criar banco de dados: {e}")
         raise
 
-async def criar_tabelas():
+async def criar_tabelas(conexao: asyncpg.Connection):
     """Cria todas as tabelas necessárias."""
-    config = ConfiguracaoBancoDados()
-    
     sql_tabelas = """
     -- Extensões necessárias
     CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
     
     -- Tabela principal para histórico de análises
+    -- (particionada por mês; a chave primária inclui a chave de partição)
     CREATE TABLE IF NOT EXISTS analysis_history (
-        id SERIAL PRIMARY KEY,
+        id BIGINT GENERATED BY DEFAULT AS IDENTITY (CACHE 50),
         code_snippet TEXT NOT NULL,
         suggestions JSONB NOT NULL,
-        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-        pontuacao_qualidade DECIMAL(5,2) CHECK (pontuacao_qualidade >= 0 AND pontuacao_qualidade <= 100),
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        pontuacao_qualidade REAL CHECK (pontuacao_qualidade BETWEEN 0 AND 100),
         nome_arquivo VARCHAR(255),
-        tempo_analise DECIMAL(8,4) CHECK (tempo_analise >= 0),
+        tempo_analise REAL CHECK (tempo_analise >= 0),
         nivel_detalhamento VARCHAR(20) CHECK (nivel_detalhamento IN ('basico', 'intermediario', 'avancado')),
         numero_sugestoes INTEGER DEFAULT 0 CHECK (numero_sugestoes >= 0),
         tipos_sugestoes JSONB,
-        hash_codigo VARCHAR(64),
-        tamanho_codigo INTEGER
-    );
+        hash_codigo BYTEA CHECK (octet_length(hash_codigo) = 32),
+        tamanho_codigo INTEGER,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
     
-    -- Índices para melhor performance
+    -- Índices para melhor performance (criados em cada partição)
     CREATE INDEX IF NOT EXISTS idx_analysis_history_created_at 
     ON analysis_history(created_at DESC);
     
@@ -87,32 +92,41 @@ async def criar_tabelas():
     CREATE INDEX IF NOT EXISTS idx_analysis_history_pontuacao 
     ON analysis_history(pontuacao_qualidade DESC);
     
+    -- GIN (jsonb_path_ops) para consultas de contenção (@>) nas sugestões
+    CREATE INDEX IF NOT EXISTS idx_analysis_suggestions_gin 
+    ON analysis_history USING GIN (suggestions jsonb_path_ops);
+    
+    CREATE INDEX IF NOT EXISTS idx_analysis_tipos_gin 
+    ON analysis_history USING GIN (tipos_sugestoes jsonb_path_ops);
+    
     CREATE INDEX IF NOT EXISTS idx_analysis_history_hash 
     ON analysis_history(hash_codigo) WHERE hash_codigo IS NOT NULL;
     
     -- Tabela para cache de análises (otimização de performance)
     CREATE TABLE IF NOT EXISTS cache_analises (
-        id SERIAL PRIMARY KEY,
-        hash_codigo VARCHAR(64) UNIQUE NOT NULL,
+        id BIGINT GENERATED BY DEFAULT AS IDENTITY (CACHE 50) PRIMARY KEY,
+        hash_codigo BYTEA UNIQUE NOT NULL CHECK (octet_length(hash_codigo) = 32),
         resultado JSONB NOT NULL,
         created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
         acessos INTEGER DEFAULT 1,
         ultimo_acesso TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
     );
     
-    -- Índices para o cache
-    CREATE INDEX IF NOT EXISTS idx_cache_hash 
-    ON cache_analises(hash_codigo);
+    -- Índices para o cache (hash_codigo já é indexado pela restrição UNIQUE)
+    DROP INDEX IF EXISTS idx_cache_hash;
     
     CREATE INDEX IF NOT EXISTS idx_cache_ultimo_acesso 
     ON cache_analises(ultimo_acesso);
     
+    CREATE INDEX IF NOT EXISTS idx_cache_created_at 
+    ON cache_analises(created_at);
+    
     -- Tabela para estatísticas agregadas por dia
     CREATE TABLE IF NOT EXISTS estatisticas_diarias (
         data DATE PRIMARY KEY,
         total_analises INTEGER DEFAULT 0,
-        media_pontuacao DECIMAL(5,2),
-        tempo_medio_analise DECIMAL(8,4),
+        media_pontuacao REAL,
+        tempo_medio_analise REAL,
         tipos_sugestoes_count JSONB,
         arquivos_unicos INTEGER DEFAULT 0,
         updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
@@ -128,13 +142,14 @@ async def criar_tabelas():
     
     -- Tabela para logs de auditoria
     CREATE TABLE IF NOT EXISTS logs_auditoria (
-        id SERIAL PRIMARY KEY,
+        id BIGINT GENERATED BY DEFAULT AS IDENTITY (CACHE 50),
         acao VARCHAR(50) NOT NULL,
         detalhes JSONB,
         ip_origem INET,
         user_agent TEXT,
-        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-    );
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
     
     -- Índice para logs de auditoria
     CREATE INDEX IF NOT EXISTS idx_logs_auditoria_created_at 
@@ -159,31 +174,21 @@ async def criar_tabelas():
     CREATE TRIGGER trigger_configuracoes_updated_at
         BEFORE UPDATE ON configuracoes_sistema
         FOR EACH ROW EXECUTE FUNCTION atualizar_timestamp();
-    """
+    """ + SQL_FUNCAO_PARTICOES + """
+    -- Partições mensais (mês corrente e seguintes) das tabelas de crescimento contínuo
+    """ + SQL_GARANTIR_PARTICOES
     
     try:
-        conexao = await asyncpg.connect(
-            host=config.host,
-            port=config.porta,
-            user=config.usuario,
-            password=config.senha,
-            database=config.nome_banco
-        )
-        
         logger.info("Criando tabelas e índices...")
         await conexao.execute(sql_tabelas)
         logger.info("Tabelas criadas com sucesso!")
         
-        await conexao.close()
-        
     except Exception as e:
         logger.error(f"Erro ao criar tabelas: {e}")
         raise
 
-async def inserir_dados_iniciais():
+async def inserir_dados_iniciais(conexao: asyncpg.Connection):
     """Insere dados iniciais e configurações padrão."""
-    config = ConfiguracaoBancoDados()
-    
     configuracoes_iniciais = [
         {
             'chave': 'versao_schema',
@@ -203,52 +208,29 @@ async def inserir_dados_iniciais():
     ]
     
     try:
-        conexao = await asyncpg.connect(
-            host=config.host,
-            port=config.porta,
-            user=config.usuario,
-            password=config.senha,
-            database=config.nome_banco
-        )
-        
         logger.info("Inserindo configurações iniciais...")
         
-        for config_item in configuracoes_iniciais:
-            await conexao.execute(
-                """
-                INSERT INTO configuracoes_sistema (chave, valor, descricao)
-                VALUES ($1, $2, $3)
-                ON CONFLICT (chave) DO NOTHING
-                """,
-                config_item['chave'],
-                config_item['valor'],
-                config_item['descricao']
-            )
+        # Todas as linhas num único comando (arrays desaninhados no servidor)
+        await conexao.execute(
+            """
+            INSERT INTO configuracoes_sistema (chave, valor, descricao)
+            SELECT * FROM unnest($1::text[], $2::jsonb[], $3::text[])
+            ON CONFLICT (chave) DO NOTHING
+            """,
+            [item['chave'] for item in configuracoes_iniciais],
+            [item['valor'] for item in configuracoes_iniciais],
+            [item['descricao'] for item in configuracoes_iniciais]
+        )
         
         logger.info("Configurações iniciais inseridas!")
-        await conexao.close()
         
     except Exception as e:
         logger.error(f"Erro ao inserir dados iniciais: {e}")
         raise
 
-async def verificar_conexao():
+async def verificar_conexao(conexao: asyncpg.Connection):
     """Verifica se a conexão com o banco está funcionando."""
-    config = ConfiguracaoBancoDados()
-    
     try:
-        conexao = await asyncpg.connect(
-            host=config.host,
-            port=config.porta,
-            user=config.usuario,
-            password=config.senha,
-            database=config.nome_banco
-        )
-        
-        # Testa uma consulta simples
-        resultado = await conexao.fetchval("SELECT version()")
-        logger.info(f"Conexão bem-sucedida! PostgreSQL: {resultado}")
-        
         tabelas = await conexao.fetch(
             """
             SELECT table_name 
@@ -258,9 +240,7 @@ async def verificar_conexao():
             """
         )
         
-        logger.info(f"Tabelas encontradas: {[t['table_name'] for t in tabelas]}")
-        
-        await conexao.close()
+        logger.info(f"Conexão bem-sucedida! Tabelas encontradas: {[t['table_name'] for t in tabelas]}")
         return True
         
     except Exception as e:
@@ -271,7 +251,7 @@ async def main():
     """Função principal do script de configuração."""
     logger.info("=== Configuração do Banco de Dados ===")
     
-    config = ConfiguracaoBancoDados()
+    config = obter_configuracao()
     logger.info(f"Configuração: {config}")
     
     if not config.validar_configuracao():
@@ -281,12 +261,28 @@ async def main():
     try:
         await criar_banco_se_nao_existir()
         
-        await criar_tabelas()
+        # Todas as fases numa só conexão e numa só transação: o schema e os
+        # dados iniciais são aplicados atomicamente
+        conexao = await asyncpg.connect(
+            host=config.host,
+            port=config.porta,
+            user=config.usuario,
+            password=config.senha,
+            database=config.nome_banco
+        )
+        conexao.add_log_listener(registrar_mensagem_servidor)
+        try:
+            async with conexao.transaction():
+                await criar_tabelas(conexao)
 
-        await inserir_dados_iniciais()
+                await inserir_dados_iniciais(conexao)
+                
+                #  Verifica se tudo está funcionando
+                verificado = await verificar_conexao(conexao)
+        finally:
+            await conexao.close()
         
-        #  Verifica se tudo está funcionando
-        if await verificar_conexao():
+        if verificado:
             logger.info("✅ Configuração do banco concluída com sucesso!")
         else:
             logger.error("❌ Falha na verificação final!")
@@ -4,16 +4,135 @@ identificando problemas de performance, legibilidade e boas práticas.
 """
 
 import ast
+import asyncio
+import hashlib
+import multiprocessing
+import os
 import time
 import re
-from typing import List, Dict, Any, Optional
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, compress, count, repeat
+from typing import List, Dict, Any, Optional, Tuple
 import logging
 from datetime import datetime
 
+from configuracao.configuracao_bd import obter_processos_web
 from modelos.schemas import Sugestao, TipoSugestao, NivelDetalhamento
 
 logger = logging.getLogger(__name__)
 
+# Número máximo de resultados memoizados por instância do analisador
+TAMANHO_CACHE_ANALISES = 256
+
+# Códigos a partir deste tamanho (em caracteres) são analisados num processo
+# separado; abaixo disso o custo de IPC supera o de analisar no event loop
+TAMANHO_MINIMO_PROCESSO = 20000
+
+# Limite de tamanho do código aceito (o mesmo de SolicitacaoAnalise.codigo);
+# entradas maiores são recusadas antes de qualquer parse
+TAMANHO_MAXIMO_CODIGO = 50000
+
+# Qualquer letra: sem letras não há nomes, palavras-chave nem docstrings
+_REGEX_LETRA = re.compile(r'[^\W\d_]')
+
+# Processos do pool de análise (ANALISE_MAX_PROCESSOS). Cada worker do uvicorn
+# tem o próprio pool: o padrão divide as CPUs entre os workers, com teto de 4
+# processos por worker
+MAXIMO_PROCESSOS_ANALISE = int(os.getenv(
+    "ANALISE_MAX_PROCESSOS",
+    str(max(1, min(4, (os.cpu_count() or 1) // obter_processos_web())))
+))
+
+# Pool de processos, criado no startup da aplicação (iniciar_pool_processos)
+# ou, fora dela, no primeiro uso
+_POOL: Optional[ProcessPoolExecutor] = None
+
+def _compilar_para_texto(padrao: str) -> "re.Pattern[str]":
+    """
+    Compila um padrão de linha para ser aplicado ao código inteiro: \\s
+    deixa de casar quebras de linha, então nenhum casamento atravessa linhas.
+    """
+    return re.compile(padrao.replace(r'\s', r'[^\S\n]'))
+
+def _hash_codigo(codigo: str) -> bytes:
+    """Gera a chave de memoização (BLAKE2b de 128 bits) de um código."""
+    return hashlib.blake2b(codigo.encode('utf-8'), digest_size=16).digest()
+
+def hash_analise(
+    codigo: str,
+    nivel_detalhamento: NivelDetalhamento,
+    focar_performance: bool
+) -> bytes:
+    """
+    Gera a chave (BLAKE2b de 256 bits) de uma análise no cache persistente:
+    o código, o nível e o foco determinam o resultado.
+    """
+    dados = codigo.encode('utf-8') + f"\0{nivel_detalhamento.value}\0{int(focar_performance)}".encode()
+    return hashlib.blake2b(dados, digest_size=32).digest()
+
+class _ColetorNos(ast.NodeVisitor):
+    """
+    Agrupa, numa única visita à AST, os nós consultados pelas regras.
+    
+    O despacho por tipo é feito pelo próprio NodeVisitor (visit_<Classe>),
+    sem cadeia de isinstance; os grupos ficam na ordem do código-fonte.
+    """
+    
+    def __init__(self):
+        self.nos: Dict[str, Any] = {
+            'loops': [], 'nomes': [], 'funcoes': [], 'funcoes_classes': [],
+            'documentaveis': [], 'anotacoes': [],
+            # Loop -> níveis de loops aninhados diretamente abaixo dele
+            'niveis_loops': {}
+        }
+    
+    def visit_Module(self, node: ast.Module):
+        self.nos['documentaveis'].append(node)
+        self.generic_visit(node)
+    
+    def visit_For(self, node: ast.AST):
+        self.nos['loops'].append(node)
+        self.generic_visit(node)
+        
+        # Pós-ordem: os loops filhos já têm o nível calculado
+        niveis = self.nos['niveis_loops']
+        niveis[node] = max(
+            (niveis[filho] + 1 for filho in ast.iter_child_nodes(node) if filho in niveis),
+            default=0
+        )
+    
+    visit_While = visit_For
+    
+    def visit_Name(self, node: ast.Name):
+        # Folha: o único filho é o contexto (Load/Store/Del)
+        self.nos['nomes'].append(node)
+    
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        self.nos['funcoes'].append(node)
+        self.nos['funcoes_classes'].append(node)
+        self.nos['documentaveis'].append(node)
+        self.generic_visit(node)
+    
+    def visit_ClassDef(self, node: ast.ClassDef):
+        self.nos['funcoes_classes'].append(node)
+        self.nos['documentaveis'].append(node)
+        self.generic_visit(node)
+    
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef):
+        self.nos['documentaveis'].append(node)
+        self.generic_visit(node)
+    
+    def visit_AnnAssign(self, node: ast.AnnAssign):
+        self.nos['anotacoes'].append(node)
+        self.generic_visit(node)
+    
+    def visit_arg(self, node: ast.arg):
+        if node.annotation:
+            self.nos['anotacoes'].append(node)
+            self.generic_visit(node)
+
 class AnalisadorCodigo:
     """
     Analisador inteligente de código Python.
@@ -22,10 +141,40 @@ class AnalisadorCodigo:
     e conformidade com boas práticas de programação.
     """
     
-    def __init__(self):
-        self.ultimo_tempo_analise = 0.0
+    def __init__(self, cache_persistente: Optional[Any] = None):
+        """
+        Args:
+            cache_persistente: Objeto com obter_analise_cache/salvar_analise_cache
+                (ex.: GerenciadorBancoDados), consultado antes de analisar
+        """
+        self._cache_persistente = cache_persistente
+        self._gravacoes_pendentes: set = set()
         self.regras_analise = self._carregar_regras_analise()
         
+        # Padrões pré-compilados ligados à instância (evita lookups por linha)
+        regras = self.regras_analise
+        self._regex_nome_curto = regras['legibilidade']['nomes_variaveis']['regex']
+        
+        # Regras textuais, aplicadas de uma vez ao código inteiro
+        self._regex_texto = {
+            'concatenacao_strings': _compilar_para_texto(regras['performance']['concatenacao_strings']['padrao']),
+            'list_comprehension': _compilar_para_texto(regras['performance']['list_comprehension']['padrao']),
+            'excecoes_genericas': _compilar_para_texto(regras['boas_praticas']['excecoes_genericas']['padrao']),
+            'eval_exec': _compilar_para_texto(regras['seguranca']['eval_exec']['padrao']),
+            'sql_injection': _compilar_para_texto(regras['seguranca']['sql_injection']['padrao'])
+        }
+        self._cache_sugestoes: "OrderedDict[Tuple, List[Sugestao]]" = OrderedDict()
+        self._cache_pontuacao: "OrderedDict[bytes, float]" = OrderedDict()
+        self._analises_em_andamento: Dict[Tuple, asyncio.Task] = {}
+        
+    @staticmethod
+    def _guardar_em_cache(cache: OrderedDict, chave: Any, valor: Any):
+        """Armazena um resultado no cache LRU, descartando o mais antigo."""
+        cache[chave] = valor
+        cache.move_to_end(chave)
+        if len(cache) > TAMANHO_CACHE_ANALISES:
+            cache.popitem(last=False)
+        
     def _carregar_regras_analise(self) -> Dict[str, Any]:
         """Carrega as regras de análise de código."""
         return {
@@ -37,11 +186,13 @@ class AnalisadorCodigo:
                 },
                 'concatenacao_strings': {
                     'padrao': r'\+.*str\(',
+                    'regex': re.compile(r'\+.*str\('),
                     'prioridade': 6,
                     'impacto': 'médio'
                 },
                 'list_comprehension': {
                     'padrao': r'for.*in.*append\(',
+                    'regex': re.compile(r'for.*in.*append\('),
                     'prioridade': 5,
                     'impacto': 'médio'
                 }
@@ -49,6 +200,7 @@ class AnalisadorCodigo:
             'legibilidade': {
                 'nomes_variaveis': {
                     'padrao': r'\b[a-z]\b|\b[a-z]{1,2}\b',
+                    'regex': re.compile(r'\b[a-z]\b|\b[a-z]{1,2}\b'),
                     'prioridade': 4,
                     'impacto': 'baixo'
                 },
@@ -74,6 +226,7 @@ class AnalisadorCodigo:
                 },
                 'excecoes_genericas': {
                     'padrao': r'except\s*:',
+                    'regex': re.compile(r'except\s*:'),
                     'prioridade': 7,
                     'impacto': 'alto'
                 }
@@ -81,11 +234,13 @@ class AnalisadorCodigo:
             'seguranca': {
                 'eval_exec': {
                     'padrao': r'\b(eval|exec)\s*\(',
+                    'regex': re.compile(r'\b(eval|exec)\s*\('),
                     'prioridade': 9,
                     'impacto': 'alto'
                 },
                 'sql_injection': {
                     'padrao': r'execute\s*\(\s*["\'].*%.*["\']',
+                    'regex': re.compile(r'execute\s*\(\s*["\'].*%.*["\']'),
                     'prioridade': 10,
                     'impacto': 'alto'
                 }
@@ -96,7 +251,8 @@ class AnalisadorCodigo:
         self,
         codigo: str,
         nivel_detalhamento: NivelDetalhamento = NivelDetalhamento.INTERMEDIARIO,
-        focar_performance: bool = False
+        focar_performance: bool = False,
+        arvore_ast: Optional[ast.AST] = None
     ) -> List[Sugestao]:
         """
         
@@ -104,43 +260,142 @@ class AnalisadorCodigo:
             codigo: Código Python a ser analisado
             nivel_detalhamento: Nível de detalhamento da análise
             focar_performance: Se deve focar em otimizações de performance
+            arvore_ast: AST já construída para o código (evita um novo parse)
             
         Returns:
             Lista de sugestões de otimização
         """
-        inicio_tempo = time.time()
+        return await self._analisar(
+            codigo, _hash_codigo(codigo), nivel_detalhamento, focar_performance, arvore_ast
+        )
+    
+    async def analisar_com_pontuacao(
+        self,
+        codigo: str,
+        nivel_detalhamento: NivelDetalhamento = NivelDetalhamento.INTERMEDIARIO,
+        focar_performance: bool = False,
+        arvore_ast: Optional[ast.AST] = None
+    ) -> Tuple[List[Sugestao], float]:
+        """
+        Analisa o código e calcula sua pontuação de qualidade de uma só vez,
+        compartilhando o hash do código entre os dois caches.
+        
+        Returns:
+            Tupla (sugestões, pontuação de qualidade)
+        """
+        digest = _hash_codigo(codigo)
+        sugestoes = await self._analisar(
+            codigo, digest, nivel_detalhamento, focar_performance, arvore_ast
+        )
+        return sugestoes, self._obter_pontuacao(codigo, digest)
+    
+    async def _analisar(
+        self,
+        codigo: str,
+        digest: bytes,
+        nivel_detalhamento: NivelDetalhamento,
+        focar_performance: bool,
+        arvore_ast: Optional[ast.AST]
+    ) -> List[Sugestao]:
+        """Consulta o cache de análises ou agenda uma nova análise."""
+        if not codigo.strip():
+            raise ValueError("Código não pode estar vazio")
+        if len(codigo) > TAMANHO_MAXIMO_CODIGO:
+            raise ValueError(f"Código excede o limite de {TAMANHO_MAXIMO_CODIGO} caracteres")
+        if self._sem_construcoes(codigo):
+            # Nenhuma regra pode disparar: dispensa o parse e as regras
+            return []
+        
+        chave = (digest, nivel_detalhamento, focar_performance)
+        
+        sugestoes = self._cache_sugestoes.get(chave)
+        if sugestoes is not None:
+            self._cache_sugestoes.move_to_end(chave)
+            logger.debug("Análise obtida do cache")
+            return list(sugestoes)
+        
+        # Requisições simultâneas do mesmo código compartilham a mesma análise
+        tarefa = self._analises_em_andamento.get(chave)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(
+                self._executar_analise(codigo, digest, nivel_detalhamento, focar_performance, arvore_ast)
+            )
+            self._analises_em_andamento[chave] = tarefa
+            tarefa.add_done_callback(lambda t: self._finalizar_analise(chave, t))
+        
+        return list(await asyncio.shield(tarefa))
+    
+    def _sem_construcoes(self, codigo: str) -> bool:
+        """
+        Indica se o código não tem nada que as regras possam apontar: nenhuma
+        letra (logo nenhum nome, palavra-chave ou texto casado pelos padrões)
+        e nenhuma linha acima do limite de comprimento.
+        """
+        if _REGEX_LETRA.search(codigo):
+            return False
+        limite_linha = self.regras_analise['legibilidade']['linhas_muito_longas']['limite']
+        return max(map(len, codigo.split('\n'))) <= limite_linha
+    
+    def _finalizar_analise(self, chave: Tuple, tarefa: asyncio.Task):
+        """Remove a análise concluída da fila e memoiza o resultado."""
+        self._analises_em_andamento.pop(chave, None)
+        if not tarefa.cancelled() and tarefa.exception() is None:
+            self._guardar_em_cache(self._cache_sugestoes, chave, tarefa.result())
+    
+    async def _executar_analise(
+        self,
+        codigo: str,
+        digest: bytes,
+        nivel_detalhamento: NivelDetalhamento,
+        focar_performance: bool,
+        arvore_ast: Optional[ast.AST] = None
+    ) -> List[Sugestao]:
+        """
+        Executa a análise, no event loop ou no pool de processos (códigos
+        grandes), memoizando a pontuação calculada junto pelo digest.
+        """
+        inicio_tempo = time.perf_counter()
         logger.info("Iniciando análise de código...")
         
         try:
-            arvore_ast = ast.parse(codigo)
-            
-            sugestoes = []
+            chave_persistente = None
+            if self._cache_persistente is not None:
+                chave_persistente = hash_analise(codigo, nivel_detalhamento, focar_performance)
+                resultado = await self._cache_persistente.obter_analise_cache(chave_persistente)
+                if resultado is not None:
+                    sugestoes = [Sugestao(**dados_sugestao) for dados_sugestao in resultado['sugestoes']]
+                    if digest not in self._cache_pontuacao:
+                        self._guardar_em_cache(self._cache_pontuacao, digest, resultado['pontuacao'])
+                    logger.debug("Análise obtida do cache persistente")
+                    return sugestoes
             
-            # Análises específicas baseadas no nível de detalhamento
-            if nivel_detalhamento in [NivelDetalhamento.BASICO, NivelDetalhamento.INTERMEDIARIO, NivelDetalhamento.AVANCADO]:
-                sugestoes.extend(await self._analisar_performance(codigo, arvore_ast, focar_performance))
-                sugestoes.extend(await self._analisar_legibilidade(codigo, arvore_ast))
-                
-            if nivel_detalhamento in [NivelDetalhamento.INTERMEDIARIO, NivelDetalhamento.AVANCADO]:
-                sugestoes.extend(await self._analisar_boas_praticas(codigo, arvore_ast))
-                
-            if nivel_detalhamento == NivelDetalhamento.AVANCADO:
-                sugestoes.extend(await self._analisar_seguranca(codigo, arvore_ast))
-                sugestoes.extend(await self._analisar_complexidade(codigo, arvore_ast))
+            if len(codigo) >= TAMANHO_MINIMO_PROCESSO:
+                # Trabalho puramente de CPU: executa fora do event loop. A AST é
+                # refeita no processo filho, o que é mais barato que serializá-la
+                loop = asyncio.get_running_loop()
+                dados, pontuacao = await loop.run_in_executor(
+                    _obter_pool_processos(),
+                    _analisar_em_processo,
+                    codigo,
+                    nivel_detalhamento,
+                    focar_performance
+                )
+                sugestoes = [Sugestao(**dados_sugestao) for dados_sugestao in dados]
+            else:
+                if arvore_ast is None:
+                    arvore_ast = ast.parse(codigo)
+                sugestoes, pontuacao = self._aplicar_regras(
+                    codigo, nivel_detalhamento, focar_performance, arvore_ast
+                )
             
-            sugestoes.sort(key=lambda x: x.prioridade, reverse=True)
-            
-            # Limita o número de sugestões baseado no nível
-            limite_sugestoes = {
-                NivelDetalhamento.BASICO: 5,
-                NivelDetalhamento.INTERMEDIARIO: 10,
-                NivelDetalhamento.AVANCADO: 20
-            }
+            if digest not in self._cache_pontuacao:
+                self._guardar_em_cache(self._cache_pontuacao, digest, pontuacao)
             
-            sugestoes = sugestoes[:limite_sugestoes[nivel_detalhamento]]
+            if chave_persistente is not None:
+                self._agendar_gravacao(chave_persistente, sugestoes, pontuacao)
             
-            self.ultimo_tempo_analise = time.time() - inicio_tempo
-            logger.info(f"Análise concluída em {self.ultimo_tempo_analise:.2f}s com {len(sugestoes)} sugestões")
+            tempo_analise = time.perf_counter() - inicio_tempo
+            logger.info(f"Análise concluída em {tempo_analise:.2f}s com {len(sugestoes)} sugestões")
             
             return sugestoes
             
@@ -148,215 +403,342 @@ class AnalisadorCodigo:
             logger.error(f"Erro durante análise: {e}")
             raise
     
-    async def _analisar_performance(self, codigo: str, arvore_ast: ast.AST, focar_performance: bool) -> List[Sugestao]:
+    def _agendar_gravacao(self, chave: bytes, sugestoes: List[Sugestao], pontuacao: float):
+        """Grava o resultado no cache persistente sem atrasar a resposta."""
+        resultado = {
+            'sugestoes': [sugestao.model_dump() for sugestao in sugestoes],
+            'pontuacao': pontuacao
+        }
+        tarefa = asyncio.ensure_future(
+            self._cache_persistente.salvar_analise_cache(chave, resultado)
+        )
+        # Mantém a referência até o fim, senão a tarefa pode ser coletada
+        self._gravacoes_pendentes.add(tarefa)
+        tarefa.add_done_callback(self._gravacoes_pendentes.discard)
+    
+    def _aplicar_regras(
+        self,
+        codigo: str,
+        nivel_detalhamento: NivelDetalhamento,
+        focar_performance: bool,
+        arvore_ast: ast.AST
+    ) -> Tuple[List[Sugestao], float]:
+        """
+        Aplica as regras do nível pedido e calcula a pontuação.
+        
+        As linhas são separadas uma única vez e compartilhadas entre as
+        regras e o cálculo da pontuação.
+        """
+        linhas = codigo.split('\n')
+        linhas_stripped = [linha.strip() for linha in linhas]
+        
+        # Uma passada pela AST e uma pelas linhas alimentam todas as regras
+        nos = self._coletar_nos(arvore_ast)
+        ocorrencias = self._varrer_linhas(codigo, linhas)
+        
+        sugestoes = []
+        
+        # Análises específicas baseadas no nível de detalhamento
+        if nivel_detalhamento in [NivelDetalhamento.BASICO, NivelDetalhamento.INTERMEDIARIO, NivelDetalhamento.AVANCADO]:
+            sugestoes.extend(self._analisar_performance(linhas_stripped, nos, ocorrencias, focar_performance))
+            sugestoes.extend(self._analisar_legibilidade(linhas, linhas_stripped, nos, ocorrencias))
+            
+        if nivel_detalhamento in [NivelDetalhamento.INTERMEDIARIO, NivelDetalhamento.AVANCADO]:
+            sugestoes.extend(self._analisar_boas_praticas(linhas_stripped, nos, ocorrencias))
+            
+        if nivel_detalhamento == NivelDetalhamento.AVANCADO:
+            sugestoes.extend(self._analisar_seguranca(linhas_stripped, ocorrencias))
+            sugestoes.extend(self._analisar_complexidade(nos))
+        
+        sugestoes.sort(key=lambda x: x.prioridade, reverse=True)
+        
+        # Limita o número de sugestões baseado no nível
+        limite_sugestoes = {
+            NivelDetalhamento.BASICO: 5,
+            NivelDetalhamento.INTERMEDIARIO: 10,
+            NivelDetalhamento.AVANCADO: 20
+        }
+        
+        sugestoes = sugestoes[:limite_sugestoes[nivel_detalhamento]]
+        
+        return sugestoes, self._calcular_pontuacao(
+            codigo, nos, linhas, linhas_stripped, len(ocorrencias['linhas_muito_longas'])
+        )
+    
+    def _coletar_nos(self, arvore_ast: ast.AST) -> Dict[str, Any]:
+        """Percorre a AST uma única vez, agrupando os nós usados pelas regras."""
+        coletor = _ColetorNos()
+        coletor.visit(arvore_ast)
+        return coletor.nos
+    
+    def _varrer_linhas(self, codigo: str, linhas: List[str]) -> Dict[str, List[int]]:
+        """
+        Registra (1-based) as linhas que disparam cada regra textual.
+        
+        Cada padrão percorre o código inteiro num único finditer (laço em C);
+        os offsets são convertidos em números de linha por busca binária
+        sobre o início de cada linha.
+        """
+        # Comprimentos calculados uma vez por map (laço em C) e reaproveitados
+        comprimentos = list(map(len, linhas))
+        inicios = list(accumulate(map((1).__add__, comprimentos[:-1]), initial=0))
+        ocorrencias = {}
+        
+        for regra, regex in self._regex_texto.items():
+            numeros = []
+            for casamento in regex.finditer(codigo):
+                numero = bisect_right(inicios, casamento.start())
+                if not numeros or numeros[-1] != numero:
+                    numeros.append(numero)
+            ocorrencias[regra] = numeros
+        
+        limite_linha = self.regras_analise['legibilidade']['linhas_muito_longas']['limite']
+        ocorrencias['linhas_muito_longas'] = list(
+            compress(count(1), map(limite_linha.__lt__, comprimentos))
+        )
+        
+        return ocorrencias
+    
+    def _analisar_performance(self, linhas_stripped: List[str], nos: Dict[str, Any], ocorrencias: Dict[str, List[int]], focar_performance: bool) -> List[Sugestao]:
         """Analisa problemas de performance no código."""
         sugestoes = []
-        linhas = codigo.split('\n')
         
         # Detecta loops aninhados
-        for node in ast.walk(arvore_ast):
-            if isinstance(node, (ast.For, ast.While)):
-                nivel_aninhamento = self._contar_loops_aninhados(node)
-                if nivel_aninhamento > self.regras_analise['performance']['loops_aninhados']['limite']:
-                    sugestoes.append(Sugestao(
-                        tipo=TipoSugestao.PERFORMANCE,
-                        titulo="Loops muito aninhados detectados",
-                        descricao=f"Encontrado {nivel_aninhamento} níveis de loops aninhados. "
-                                 "Considere refatorar para melhorar a performance e legibilidade.",
-                        linha_inicio=node.lineno,
-                        impacto="alto",
-                        prioridade=8,
-                        codigo_sugerido="# Considere usar funções auxiliares ou algoritmos mais eficientes"
-                    ))
-        
-        for i, linha in enumerate(linhas, 1):
-            if re.search(self.regras_analise['performance']['concatenacao_strings']['padrao'], linha):
+        for node in nos['loops']:
+            nivel_aninhamento = nos['niveis_loops'][node]
+            if nivel_aninhamento > self.regras_analise['performance']['loops_aninhados']['limite']:
                 sugestoes.append(Sugestao(
                     tipo=TipoSugestao.PERFORMANCE,
-                    titulo="Concatenação ineficiente de strings",
-                    descricao="Use join() ou f-strings para concatenação mais eficiente de strings.",
-                    linha_inicio=i,
-                    codigo_original=linha.strip(),
-                    codigo_sugerido="# Use: ''.join(lista_strings) ou f'{var1}{var2}'",
-                    impacto="médio",
-                    prioridade=6
+                    titulo="Loops muito aninhados detectados",
+                    descricao=f"Encontrado {nivel_aninhamento} níveis de loops aninhados. "
+                             "Considere refatorar para melhorar a performance e legibilidade.",
+                    linha_inicio=node.lineno,
+                    impacto="alto",
+                    prioridade=8,
+                    codigo_sugerido="# Considere usar funções auxiliares ou algoritmos mais eficientes"
                 ))
         
-        # Detecta oportunidades para list comprehension
-        for i, linha in enumerate(linhas, 1):
-            if re.search(self.regras_analise['performance']['list_comprehension']['padrao'], linha):
-                sugestoes.append(Sugestao(
-                    tipo=TipoSugestao.PERFORMANCE,
-                    titulo="Oportunidade para list comprehension",
-                    descricao="Substitua loops simples por list comprehensions para melhor performance.",
-                    linha_inicio=i,
-                    codigo_original=linha.strip(),
-                    codigo_sugerido="# Use: [expressao for item in lista if condicao]",
-                    impacto="médio",
-                    prioridade=5
-                ))
+        # Concatenação ineficiente de strings
+        for i in ocorrencias['concatenacao_strings']:
+            sugestoes.append(Sugestao(
+                tipo=TipoSugestao.PERFORMANCE,
+                titulo="Concatenação ineficiente de strings",
+                descricao="Use join() ou f-strings para concatenação mais eficiente de strings.",
+                linha_inicio=i,
+                codigo_original=linhas_stripped[i - 1],
+                codigo_sugerido="# Use: ''.join(lista_strings) ou f'{var1}{var2}'",
+                impacto="médio",
+                prioridade=6
+            ))
+        
+        
+        for i in ocorrencias['list_comprehension']:
+            sugestoes.append(Sugestao(
+                tipo=TipoSugestao.PERFORMANCE,
+                titulo="Oportunidade para list comprehension",
+                descricao="Substitua loops simples por list comprehensions para melhor performance.",
+                linha_inicio=i,
+                codigo_original=linhas_stripped[i - 1],
+                codigo_sugerido="# Use: [expressao for item in lista if condicao]",
+                impacto="médio",
+                prioridade=5
+            ))
         
         return sugestoes
     
-    async def _analisar_legibilidade(self, codigo: str, arvore_ast: ast.AST) -> List[Sugestao]:
+    def _analisar_legibilidade(self, linhas: List[str], linhas_stripped: List[str], nos: Dict[str, Any], ocorrencias: Dict[str, List[int]]) -> List[Sugestao]:
         """Analisa problemas de legibilidade no código."""
         sugestoes = []
-        linhas = codigo.split('\n')
         
-        for i, linha in enumerate(linhas, 1):
-            if len(linha) > self.regras_analise['legibilidade']['linhas_muito_longas']['limite']:
+        for i in ocorrencias['linhas_muito_longas']:
+            sugestoes.append(Sugestao(
+                tipo=TipoSugestao.LEGIBILIDADE,
+                titulo="Linha muito longa",
+                descricao=f"Linha {i} tem {len(linhas[i - 1])} caracteres. "
+                         "Considere quebrar em múltiplas linhas para melhor legibilidade.",
+                linha_inicio=i,
+                codigo_original=linhas_stripped[i - 1],
+                impacto="baixo",
+                prioridade=3
+            ))
+        
+        # Verifica nomes de variáveis muito curtos
+        for node in nos['nomes']:
+            if self._regex_nome_curto.match(node.id):
                 sugestoes.append(Sugestao(
                     tipo=TipoSugestao.LEGIBILIDADE,
-                    titulo="Linha muito longa",
-                    descricao=f"Linha {i} tem {len(linha)} caracteres. "
-                             "Considere quebrar em múltiplas linhas para melhor legibilidade.",
-                    linha_inicio=i,
-                    codigo_original=linha.strip(),
+                    titulo="Nome de variável pouco descritivo",
+                    descricao=f"A variável '{node.id}' tem um nome muito curto. "
+                             "Use nomes mais descritivos para melhor legibilidade.",
+                    linha_inicio=getattr(node, 'lineno', 1),
+                    codigo_original=node.id,
                     impacto="baixo",
-                    prioridade=3
+                    prioridade=4
                 ))
         
-        # Verifica nomes de variáveis muito curtos
-        for node in ast.walk(arvore_ast):
-            if isinstance(node, ast.Name) and hasattr(node, 'id'):
-                if re.match(self.regras_analise['legibilidade']['nomes_variaveis']['padrao'], node.id):
-                    sugestoes.append(Sugestao(
-                        tipo=TipoSugestao.LEGIBILIDADE,
-                        titulo="Nome de variável pouco descritivo",
-                        descricao=f"A variável '{node.id}' tem um nome muito curto. "
-                                 "Use nomes mais descritivos para melhor legibilidade.",
-                        linha_inicio=getattr(node, 'lineno', 1),
-                        codigo_original=node.id,
-                        impacto="baixo",
-                        prioridade=4
-                    ))
-        
-        for node in ast.walk(arvore_ast):
-            if isinstance(node, ast.FunctionDef):
-                linhas_funcao = self._contar_linhas_funcao(node)
-                if linhas_funcao > self.regras_analise['legibilidade']['funcoes_muito_longas']['limite']:
-                    sugestoes.append(Sugestao(
-                        tipo=TipoSugestao.LEGIBILIDADE,
-                        titulo="Função muito longa",
-                        descricao=f"A função '{node.name}' tem {linhas_funcao} linhas. "
-                                 "Considere dividir em funções menores.",
-                        linha_inicio=node.lineno,
-                        impacto="médio",
-                        prioridade=6
-                    ))
+        for node in nos['funcoes']:
+            linhas_funcao = self._contar_linhas_funcao(node)
+            if linhas_funcao > self.regras_analise['legibilidade']['funcoes_muito_longas']['limite']:
+                sugestoes.append(Sugestao(
+                    tipo=TipoSugestao.LEGIBILIDADE,
+                    titulo="Função muito longa",
+                    descricao=f"A função '{node.name}' tem {linhas_funcao} linhas. "
+                             "Considere dividir em funções menores.",
+                    linha_inicio=node.lineno,
+                    impacto="médio",
+                    prioridade=6
+                ))
         
         return sugestoes
     
-    async def _analisar_boas_praticas(self, codigo: str, arvore_ast: ast.AST) -> List[Sugestao]:
+    def _analisar_boas_praticas(self, linhas_stripped: List[str], nos: Dict[str, Any], ocorrencias: Dict[str, List[int]]) -> List[Sugestao]:
         """Analisa conformidade com boas práticas."""
         sugestoes = []
-        linhas = codigo.split('\n')
         
         # Verifica docstrings ausentes
-        for node in ast.walk(arvore_ast):
-            if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
-                if not ast.get_docstring(node):
-                    tipo_elemento = "função" if isinstance(node, ast.FunctionDef) else "classe"
-                    sugestoes.append(Sugestao(
-                        tipo=TipoSugestao.BOAS_PRATICAS,
-                        titulo=f"Docstring ausente em {tipo_elemento}",
-                        descricao=f"A {tipo_elemento} '{node.name}' não possui docstring. "
-                                 "Adicione documentação para melhor manutenibilidade.",
-                        linha_inicio=node.lineno,
-                        codigo_sugerido=f'"""\n    Documentação da {tipo_elemento} {node.name}.\n    """',
-                        impacto="médio",
-                        prioridade=5
-                    ))
-        
-        for i, linha in enumerate(linhas, 1):
-            if re.search(self.regras_analise['boas_praticas']['excecoes_genericas']['padrao'], linha):
+        for node in nos['funcoes_classes']:
+            if not ast.get_docstring(node):
+                tipo_elemento = "função" if isinstance(node, ast.FunctionDef) else "classe"
                 sugestoes.append(Sugestao(
                     tipo=TipoSugestao.BOAS_PRATICAS,
-                    titulo="Exceção genérica capturada",
-                    descricao="Evite capturar exceções genéricas. Especifique o tipo de exceção.",
-                    linha_inicio=i,
-                    codigo_original=linha.strip(),
-                    codigo_sugerido="except SpecificException as e:",
-                    impacto="alto",
-                    prioridade=7
+                    titulo=f"Docstring ausente em {tipo_elemento}",
+                    descricao=f"A {tipo_elemento} '{node.name}' não possui docstring. "
+                             "Adicione documentação para melhor manutenibilidade.",
+                    linha_inicio=node.lineno,
+                    codigo_sugerido=f'"""\n    Documentação da {tipo_elemento} {node.name}.\n    """',
+                    impacto="médio",
+                    prioridade=5
                 ))
         
+        for i in ocorrencias['excecoes_genericas']:
+            sugestoes.append(Sugestao(
+                tipo=TipoSugestao.BOAS_PRATICAS,
+                titulo="Exceção genérica capturada",
+                descricao="Evite capturar exceções genéricas. Especifique o tipo de exceção.",
+                linha_inicio=i,
+                codigo_original=linhas_stripped[i - 1],
+                codigo_sugerido="except SpecificException as e:",
+                impacto="alto",
+                prioridade=7
+            ))
+        
         return sugestoes
     
-    async def _analisar_seguranca(self, codigo: str, arvore_ast: ast.AST) -> List[Sugestao]:
+    def _analisar_seguranca(self, linhas_stripped: List[str], ocorrencias: Dict[str, List[int]]) -> List[Sugestao]:
         """Analisa problemas de segurança no código."""
         sugestoes = []
-        linhas = codigo.split('\n')
         
         # Verifica uso de eval/exec
-        for i, linha in enumerate(linhas, 1):
-            if re.search(self.regras_analise['seguranca']['eval_exec']['padrao'], linha):
-                sugestoes.append(Sugestao(
-                    tipo=TipoSugestao.SEGURANCA,
-                    titulo="Uso perigoso de eval/exec",
-                    descricao="O uso de eval() ou exec() pode ser perigoso. "
-                             "Considere alternativas mais seguras.",
-                    linha_inicio=i,
-                    codigo_original=linha.strip(),
-                    impacto="alto",
-                    prioridade=9
-                ))
+        for i in ocorrencias['eval_exec']:
+            sugestoes.append(Sugestao(
+                tipo=TipoSugestao.SEGURANCA,
+                titulo="Uso perigoso de eval/exec",
+                descricao="O uso de eval() ou exec() pode ser perigoso. "
+                         "Considere alternativas mais seguras.",
+                linha_inicio=i,
+                codigo_original=linhas_stripped[i - 1],
+                impacto="alto",
+                prioridade=9
+            ))
         
-        # Verifica possível SQL injection
-        for i, linha in enumerate(linhas, 1):
-            if re.search(self.regras_analise['seguranca']['sql_injection']['padrao'], linha):
-                sugestoes.append(Sugestao(
-                    tipo=TipoSugestao.SEGURANCA,
-                    titulo="Possível vulnerabilidade SQL injection",
-                    descricao="Use parâmetros preparados em vez de concatenação de strings em SQL.",
-                    linha_inicio=i,
-                    codigo_original=linha.strip(),
-                    codigo_sugerido="cursor.execute('SELECT * FROM table WHERE id = %s', (user_id,))",
-                    impacto="alto",
-                    prioridade=10
-                ))
+        
+        for i in ocorrencias['sql_injection']:
+            sugestoes.append(Sugestao(
+                tipo=TipoSugestao.SEGURANCA,
+                titulo="Possível vulnerabilidade SQL injection",
+                descricao="Use parâmetros preparados em vez de concatenação de strings em SQL.",
+                linha_inicio=i,
+                codigo_original=linhas_stripped[i - 1],
+                codigo_sugerido="cursor.execute('SELECT * FROM table WHERE id = %s', (user_id,))",
+                impacto="alto",
+                prioridade=10
+            ))
         
         return sugestoes
     
-    async def _analisar_complexidade(self, codigo: str, arvore_ast: ast.AST) -> List[Sugestao]:
+    def _analisar_complexidade(self, nos: Dict[str, Any]) -> List[Sugestao]:
         """Analisa complexidade ciclomática do código."""
         sugestoes = []
         
-        for node in ast.walk(arvore_ast):
-            if isinstance(node, ast.FunctionDef):
-                complexidade = self._calcular_complexidade_ciclomatica(node)
-                if complexidade > 10:
-                    sugestoes.append(Sugestao(
-                        tipo=TipoSugestao.MANUTENCAO,
-                        titulo="Alta complexidade ciclomática",
-                        descricao=f"A função '{node.name}' tem complexidade {complexidade}. "
-                                 "Considere refatorar para reduzir a complexidade.",
-                        linha_inicio=node.lineno,
-                        impacto="alto",
-                        prioridade=8
-                    ))
+        for node in nos['funcoes']:
+            complexidade = self._calcular_complexidade_ciclomatica(node)
+            if complexidade > 10:
+                sugestoes.append(Sugestao(
+                    tipo=TipoSugestao.MANUTENCAO,
+                    titulo="Alta complexidade ciclomática",
+                    descricao=f"A função '{node.name}' tem complexidade {complexidade}. "
+                             "Considere refatorar para reduzir a complexidade.",
+                    linha_inicio=node.lineno,
+                    impacto="alto",
+                    prioridade=8
+                ))
         
         return sugestoes
     
-    def calcular_pontuacao_qualidade(self, codigo: str) -> float:
+    def calcular_pontuacao_qualidade(self, codigo: str, arvore_ast: Optional[ast.AST] = None) -> float:
         """
         Calcula uma pontuação de qualidade para o código (0-100).
         
         Args:
             codigo: Código Python a ser avaliado
+            arvore_ast: AST já construída para o código (evita um novo parse)
             
         Returns:
             Pontuação de qualidade (0-100)
         """
+        return self._obter_pontuacao(codigo, _hash_codigo(codigo), arvore_ast)
+    
+    def _obter_pontuacao(self, codigo: str, digest: bytes, arvore_ast: Optional[ast.AST] = None) -> float:
+        """Consulta o cache de pontuações, calculando-a se necessário."""
+        pontuacao = self._cache_pontuacao.get(digest)
+        if pontuacao is None:
+            nos = self._coletar_nos(arvore_ast) if arvore_ast is not None else None
+            pontuacao = self._calcular_pontuacao(codigo, nos)
+            self._guardar_em_cache(self._cache_pontuacao, digest, pontuacao)
+        else:
+            self._cache_pontuacao.move_to_end(digest)
+        return pontuacao
+    
+    def _calcular_pontuacao(
+        self,
+        codigo: str,
+        nos: Optional[Dict[str, Any]] = None,
+        linhas: Optional[List[str]] = None,
+        linhas_stripped: Optional[List[str]] = None,
+        linhas_longas: Optional[int] = None
+    ) -> float:
+        """
+        Aplica as penalidades e bônus que compõem a pontuação.
+        
+        Docstrings e type hints são contados nos nós da AST; código que não
+        compila não recebe esses bônus. As contagens por linha usam
+        builtins (laços em C) em vez de laços Python.
+        """
         try:
             pontuacao = 100.0
-            linhas = codigo.split('\n')
+            if linhas is None:
+                linhas = codigo.split('\n')
+            if nos is None:
+                nos = {'documentaveis': [], 'anotacoes': []}
+                # Sem letras não há docstrings nem anotações: dispensa o parse
+                if _REGEX_LETRA.search(codigo):
+                    try:
+                        nos = self._coletar_nos(ast.parse(codigo))
+                    except SyntaxError:
+                        pass
+            
+            if linhas_stripped is None:
+                linhas_stripped = [linha.strip() for linha in linhas]
+            if linhas_longas is None:
+                limite_linha = self.regras_analise['legibilidade']['linhas_muito_longas']['limite']
+                linhas_longas = sum(map(limite_linha.__lt__, map(len, linhas)))
+            linhas_vazias = linhas_stripped.count('')
+            linhas_comentario = sum(map(str.startswith, linhas_stripped, repeat('#')))
             
             # Penalidades por problemas encontrados
             penalidades = {
-                'linhas_longas': len([l for l in linhas if len(l) > 88]) * 2,
-                'linhas_vazias_excessivas': max(0, (len([l for l in linhas if not l.strip()]) - len(linhas) * 0.1) * 1),
-                'falta_espacos': len([l for l in linhas if '=' in l and ('=' not in l.replace('==', '').replace('!=', '').replace('<=', '').replace('>=', '') or ' = ' not in l)]) * 1,
+                'linhas_longas': linhas_longas * 2,
+                'linhas_vazias_excessivas': max(0, (linhas_vazias - len(linhas) * 0.1) * 1),
             }
             
             # Aplica penalidades
@@ -365,9 +747,9 @@ class AnalisadorCodigo:
             
             # Bônus por boas práticas
             bonus = {
-                'docstrings': len(re.findall(r'""".*?"""', codigo, re.DOTALL)) * 5,
-                'comentarios': len([l for l in linhas if l.strip().startswith('#')]) * 1,
-                'type_hints': len(re.findall(r':\s*\w+', codigo)) * 2,
+                'docstrings': sum(1 for node in nos['documentaveis'] if ast.get_docstring(node, clean=False)) * 5,
+                'comentarios': linhas_comentario * 1,
+                'type_hints': len(nos['anotacoes']) * 2,
             }
             
             for tipo, valor in bonus.items():
@@ -379,14 +761,6 @@ class AnalisadorCodigo:
             logger.error(f"Erro ao calcular pontuação: {e}")
             return 50.0 
     
-    def _contar_loops_aninhados(self, node: ast.AST, nivel: int = 0) -> int:
-        """Conta o nível de aninhamento de loops."""
-        max_nivel = nivel
-        for child in ast.iter_child_nodes(node):
-            if isinstance(child, (ast.For, ast.While)):
-                max_nivel = max(max_nivel, self._contar_loops_aninhados(child, nivel + 1))
-        return max_nivel
-    
     def _contar_linhas_funcao(self, node: ast.FunctionDef) -> int:
         """Conta o número de linhas de uma função."""
         if hasattr(node, 'end_lineno') and node.end_lineno:
@@ -405,3 +779,53 @@ class AnalisadorCodigo:
         
         return complexidade
 
+def iniciar_pool_processos() -> ProcessPoolExecutor:
+    """
+    Cria o pool de processos do analisador (idempotente).
+    
+    Os processos nascem de um forkserver (spawn onde não houver): um fork
+    direto do processo da aplicação, que já tem threads em execução (p.ex. a
+    do QueueListener de logs), pode herdar locks presos e travar o filho.
+    """
+    global _POOL
+    if _POOL is None:
+        metodo = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _POOL = ProcessPoolExecutor(
+            max_workers=MAXIMO_PROCESSOS_ANALISE,
+            mp_context=multiprocessing.get_context(metodo)
+        )
+    return _POOL
+
+def _obter_pool_processos() -> ProcessPoolExecutor:
+    """Retorna o pool de processos do analisador, criando-o se preciso."""
+    return _POOL if _POOL is not None else iniciar_pool_processos()
+
+def encerrar_pool_processos():
+    """Encerra o pool de processos do analisador, se ele tiver sido criado."""
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+
+# Analisador reaproveitado dentro de cada processo do pool
+_ANALISADOR_PROCESSO: Optional[AnalisadorCodigo] = None
+
+def _analisar_em_processo(
+    codigo: str,
+    nivel_detalhamento: NivelDetalhamento,
+    focar_performance: bool
+) -> Tuple[List[Dict[str, Any]], float]:
+    """
+    Executa as regras num processo do pool.
+    
+    Returns:
+        Sugestões como dicionários (baratos de serializar) e a pontuação
+    """
+    global _ANALISADOR_PROCESSO
+    if _ANALISADOR_PROCESSO is None:
+        _ANALISADOR_PROCESSO = AnalisadorCodigo()
+    
+    sugestoes, pontuacao = _ANALISADOR_PROCESSO._aplicar_regras(
+        codigo, nivel_detalhamento, focar_performance, ast.parse(codigo)
+    )
+    return [sugestao.model_dump() for sugestao in sugestoes], pontuacao
@@ -7,20 +7,222 @@ incluindo armazenamento de análises, consultas de histórico e estatísticas.
 
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
-import json
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Dict, Any, Optional
+from datetime import date, datetime, timedelta
+from operator import attrgetter
 
 import asyncpg
-from sqlalchemy import create_engine, text
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+import orjson
 
-from configuracao.configuracao_bd import ConfiguracaoBancoDados
-from modelos.schemas import HistoricoAnalise, Sugestao
+from configuracao.configuracao_bd import obter_configuracao
+from modelos.schemas import HistoricoAnalise, NivelDetalhamento, Sugestao
 
 logger = logging.getLogger(__name__)
 
+# Consultas fixas, executadas como prepared statements (ver ConexaoPreparada)
+SQL_OBTER_CACHE = """
+SELECT resultado FROM cache_analises WHERE hash_codigo = $1
+"""
+
+# Acessos ao cache acumulados em memória, gravados junto com as estatísticas:
+# $1 = chaves (em ordem, para que workers concorrentes travem as linhas na
+# mesma sequência), $2 = quantidade de acessos de cada uma
+SQL_REGISTRAR_ACESSOS_CACHE = """
+UPDATE cache_analises AS c
+SET acessos = c.acessos + a.quantidade, ultimo_acesso = CURRENT_TIMESTAMP
+FROM unnest($1::bytea[], $2::int[]) AS a(hash_codigo, quantidade)
+WHERE c.hash_codigo = a.hash_codigo
+"""
+
+SQL_INSERIR_ANALISE = """
+INSERT INTO analysis_history (
+    code_snippet, suggestions, pontuacao_qualidade, 
+    nome_arquivo, tempo_analise, nivel_detalhamento,
+    numero_sugestoes, tipos_sugestoes
+) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+RETURNING id
+"""
+
+# Uma variante do INSERT por nível de detalhamento, com o nível como
+# constante: um parâmetro a menos no Bind de cada gravação
+SQL_INSERIR_ANALISE_POR_NIVEL = {
+    nivel.value: f"""
+INSERT INTO analysis_history (
+    code_snippet, suggestions, pontuacao_qualidade, 
+    nome_arquivo, tempo_analise, nivel_detalhamento,
+    numero_sugestoes, tipos_sugestoes
+) VALUES ($1, $2, $3, $4, $5, '{nivel.value}', $6, $7)
+RETURNING id
+"""
+    for nivel in NivelDetalhamento
+}
+
+# Colunas gravadas por salvar_analises_em_lote (COPY binário)
+COLUNAS_COPIA_ANALISES = (
+    "code_snippet", "suggestions", "pontuacao_qualidade",
+    "nome_arquivo", "tempo_analise", "nivel_detalhamento",
+    "numero_sugestoes", "tipos_sugestoes",
+)
+
+# Mescla um lote acumulado de análises do dia: $2 = quantidade,
+# $3/$4 = somas de pontuação e tempo, $5 = contagem de tipos do lote
+SQL_ATUALIZAR_ESTATISTICAS = """
+INSERT INTO estatisticas_diarias (
+    data, total_analises, media_pontuacao, tempo_medio_analise, tipos_sugestoes_count
+) VALUES ($1, $2::int, $3::real / $2, $4::real / $2, $5::jsonb)
+ON CONFLICT (data) DO UPDATE SET
+    total_analises = estatisticas_diarias.total_analises + $2,
+    media_pontuacao = (
+        estatisticas_diarias.media_pontuacao * estatisticas_diarias.total_analises + $3
+    ) / (estatisticas_diarias.total_analises + $2),
+    tempo_medio_analise = (
+        estatisticas_diarias.tempo_medio_analise * estatisticas_diarias.total_analises + $4
+    ) / (estatisticas_diarias.total_analises + $2),
+    tipos_sugestoes_count = (
+        SELECT COALESCE(jsonb_object_agg(tipos.key, tipos.total), '{}'::jsonb)
+        FROM (
+            SELECT key, SUM(value::int) AS total
+            FROM (
+                SELECT * FROM jsonb_each_text(
+                    COALESCE(estatisticas_diarias.tipos_sugestoes_count, '{}'::jsonb)
+                )
+                UNION ALL
+                SELECT * FROM jsonb_each_text($5::jsonb)
+            ) AS contagens
+            GROUP BY key
+        ) AS tipos
+    ),
+    updated_at = CURRENT_TIMESTAMP
+"""
+
+# Intervalo (segundos) entre as gravações do acumulador de estatísticas diárias
+INTERVALO_DESCARGA_ESTATISTICAS = 5.0
+
+SQL_ANALISE_POR_ID = """
+SELECT * FROM analysis_history WHERE id = $1
+"""
+
+SQL_VERIFICAR_CONEXAO = "SELECT 1"
+
+SQL_LIMPAR_CACHE = """
+DELETE FROM cache_analises
+WHERE created_at < CURRENT_TIMESTAMP - ($1::int * INTERVAL '1 day')
+"""
+
+# O histórico só traz o início do código (um caractere além do exibido,
+# para saber se houve truncamento); LEFT lê só o prefixo do valor TOAST
+TAMANHO_SNIPPET_HISTORICO = 200
+
+# Registros lidos por consulta em stream_historico; a conexão é devolvida ao
+# pool entre um lote e outro
+TAMANHO_LOTE_HISTORICO = 200
+
+SQL_HISTORICO = f"""
+SELECT id, LEFT(code_snippet, {TAMANHO_SNIPPET_HISTORICO + 1}) AS snippet, numero_sugestoes,
+       pontuacao_qualidade, nome_arquivo, created_at
+FROM analysis_history
+ORDER BY created_at DESC
+LIMIT $1 OFFSET $2
+"""
+
+SQL_HISTORICO_POR_ARQUIVO = f"""
+SELECT id, LEFT(code_snippet, {TAMANHO_SNIPPET_HISTORICO + 1}) AS snippet, numero_sugestoes,
+       pontuacao_qualidade, nome_arquivo, created_at
+FROM analysis_history
+WHERE nome_arquivo = $1
+ORDER BY created_at DESC
+LIMIT $2 OFFSET $3
+"""
+
+# Tabelas particionadas por mês (created_at) e quantos meses criar adiante
+TABELAS_PARTICIONADAS = ("analysis_history", "logs_auditoria")
+MESES_PARTICOES_ADIANTE = 2
+
+SQL_FUNCAO_PARTICOES = """
+-- Cria as partições mensais (mês corrente e os seguintes) e a partição DEFAULT
+CREATE OR REPLACE FUNCTION criar_particoes_mensais(tabela TEXT, meses_adiante INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    inicio DATE;
+BEGIN
+    -- Tabelas ausentes (logs_auditoria só existe após scripts/configurar_banco.py)
+    -- ou criadas antes do particionamento são mantidas como estão
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(tabela)
+    ) THEN
+        RETURN;
+    END IF;
+    
+    FOR i IN 0..meses_adiante LOOP
+        inicio := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::date;
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                tabela || '_' || to_char(inicio, 'YYYY_MM'),
+                tabela,
+                inicio,
+                (inicio + INTERVAL '1 month')::date
+            );
+        EXCEPTION WHEN check_violation THEN
+            -- Linhas do mês já caíram na partição DEFAULT; ficam por lá até
+            -- serem movidas manualmente; o aviso chega ao log da aplicação
+            RAISE WARNING 'Partição % de % não criada: linhas do mês estão em %_default',
+                inicio, tabela, tabela;
+        END;
+    END LOOP;
+    
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT', tabela || '_default', tabela);
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Mantém as partições do mês corrente e dos seguintes; roda na criação das
+# tabelas e uma vez por dia, para que nenhum mês chegue sem partição
+SQL_GARANTIR_PARTICOES = "".join(
+    f"SELECT criar_particoes_mensais('{tabela}', {MESES_PARTICOES_ADIANTE});\n"
+    for tabela in TABELAS_PARTICIONADAS
+)
+
+def registrar_mensagem_servidor(conexao: asyncpg.Connection, mensagem: Any):
+    """Repassa ao log da aplicação os avisos (RAISE WARNING) do servidor."""
+    if mensagem.severity_en == "WARNING":
+        logger.warning(f"PostgreSQL: {mensagem.message}")
+    else:
+        logger.debug(f"PostgreSQL: {mensagem.message}")
+
+def _codificar_jsonb(valor: Any) -> bytes:
+    """Codifica um objeto Python no formato binário do JSONB (versão 1)."""
+    return b"\x01" + orjson.dumps(valor)
+
+def _decodificar_jsonb(dados: bytes) -> Any:
+    """Decodifica o formato binário do JSONB (descarta o byte de versão)."""
+    return orjson.loads(dados[1:])
+
+class ConexaoPreparada(asyncpg.Connection):
+    """
+    Conexão que guarda os prepared statements criados nela.
+    
+    Prepared statements pertencem à conexão; cada conexão do pool prepara
+    a consulta no primeiro uso e a reaproveita nas execuções seguintes,
+    poupando o parse/plan do servidor.
+    """
+    
+    __slots__ = ('_preparadas',)
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._preparadas: Dict[str, "asyncpg.prepared_stmt.PreparedStatement"] = {}
+    
+    async def preparar(self, sql: str) -> "asyncpg.prepared_stmt.PreparedStatement":
+        """Retorna o prepared statement da consulta, preparando-o se necessário."""
+        sentenca = self._preparadas.get(sql)
+        if sentenca is None:
+            sentenca = self._preparadas[sql] = await self.prepare(sql)
+        return sentenca
+
 class GerenciadorBancoDados:
     """
     Gerenciador principal do banco de dados PostgreSQL.
@@ -30,9 +232,22 @@ class GerenciadorBancoDados:
     """
     
     def __init__(self):
-        self.config = ConfiguracaoBancoDados()
+        self.config = obter_configuracao()
         self.pool_conexoes = None
-        self.engine = None
+        # Limita as operações simultâneas ao max_size do pool (overflow
+        # incluso): o excesso espera aqui (backpressure) em vez de se acumular
+        # no pool
+        self._semaforo_conexoes = asyncio.Semaphore(self.config.kwargs_pool["max_size"])
+        # Estatísticas diárias acumuladas em memória até a próxima descarga:
+        # data -> [total, soma_pontuacao, soma_tempo, Counter de tipos]
+        self._buffer_estatisticas: Dict[date, list] = {}
+        self._lock_estatisticas = asyncio.Lock()
+        self._tarefa_estatisticas: Optional[asyncio.Task] = None
+        # Acessos ao cache persistente ainda não gravados: hash -> quantidade
+        self._acessos_cache: Counter = Counter()
+        # Data de hoje e o instante (time.monotonic) em que ela deixa de valer
+        self._hoje: Optional[date] = None
+        self._fim_do_dia = 0.0
         
     async def inicializar_banco(self):
         """Inicializa a conexão com o banco de dados e cria as tabelas necessárias."""
@@ -41,43 +256,75 @@ class GerenciadorBancoDados:
             
             # Cria o pool de conexões
             self.pool_conexoes = await asyncpg.create_pool(
-                host=self.config.host,
-                port=self.config.porta,
-                user=self.config.usuario,
-                password=self.config.senha,
-                database=self.config.nome_banco,
-                min_size=self.config.min_conexoes,
-                max_size=self.config.max_conexoes,
-                command_timeout=60
+                **self.config.kwargs_pool,
+                connection_class=ConexaoPreparada,
+                init=self._configurar_conexao,
+                setup=self._testar_conexao if self.config.pool_pre_ping else None
             )
             
             # Cria as tabelas se não existirem
             await self._criar_tabelas()
             
+            self._tarefa_estatisticas = asyncio.create_task(
+                self._descarregar_estatisticas_periodicamente()
+            )
+            
             logger.info("Banco de dados inicializado com sucesso!")
             
         except Exception as e:
             logger.error(f"Erro ao inicializar banco de dados: {e}")
             raise
     
+    @asynccontextmanager
+    async def _adquirir_conexao(self) -> AsyncIterator["ConexaoPreparada"]:
+        """Empresta uma conexão do pool, respeitando o limite de concorrência."""
+        async with self._semaforo_conexoes, self.pool_conexoes.acquire() as conexao:
+            yield conexao
+    
+    async def _configurar_conexao(self, conexao):
+        """
+        Registra o codec de JSONB em cada conexão nova do pool: parâmetros e
+        colunas JSONB trafegam como objetos Python, sem json.dumps/json.loads
+        no código da aplicação.
+        """
+        await conexao.set_type_codec(
+            'jsonb',
+            encoder=_codificar_jsonb,
+            decoder=_decodificar_jsonb,
+            schema='pg_catalog',
+            format='binary'
+        )
+        conexao.add_log_listener(registrar_mensagem_servidor)
+    
+    async def _testar_conexao(self, conexao):
+        """
+        Testa a conexão antes de entregá-la (pre-ping).
+        
+        Se o teste falhar, o asyncpg fecha a conexão e a próxima
+        aquisição abre uma nova.
+        """
+        await conexao.execute("SELECT 1")
+    
     async def _criar_tabelas(self):
         """Cria as tabelas necessárias no banco de dados."""
         sql_criar_tabelas = """
         -- Tabela principal para histórico de análises
+        -- (particionada por mês; a chave primária inclui a chave de partição)
         CREATE TABLE IF NOT EXISTS analysis_history (
-            id SERIAL PRIMARY KEY,
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY (CACHE 50),
             code_snippet TEXT NOT NULL,
             suggestions JSONB NOT NULL,
-            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-            pontuacao_qualidade DECIMAL(5,2),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            pontuacao_qualidade REAL,
             nome_arquivo VARCHAR(255),
-            tempo_analise DECIMAL(8,4),
+            tempo_analise REAL,
             nivel_detalhamento VARCHAR(20),
             numero_sugestoes INTEGER,
-            tipos_sugestoes JSONB
-        );
+            tipos_sugestoes JSONB,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
         
-        -- Índices para melhor performance
+        -- Índices para melhor performance (criados em cada partição)
         CREATE INDEX IF NOT EXISTS idx_analysis_history_created_at 
         ON analysis_history(created_at);
         
@@ -87,32 +334,62 @@ class GerenciadorBancoDados:
         CREATE INDEX IF NOT EXISTS idx_analysis_history_pontuacao 
         ON analysis_history(pontuacao_qualidade);
         
+        -- GIN (jsonb_path_ops) para consultas de contenção (@>) nas sugestões
+        CREATE INDEX IF NOT EXISTS idx_analysis_suggestions_gin 
+        ON analysis_history USING GIN (suggestions jsonb_path_ops);
+        
+        CREATE INDEX IF NOT EXISTS idx_analysis_tipos_gin 
+        ON analysis_history USING GIN (tipos_sugestoes jsonb_path_ops);
+        
         -- Tabela para cache de análises (otimização)
         CREATE TABLE IF NOT EXISTS cache_analises (
-            id SERIAL PRIMARY KEY,
-            hash_codigo VARCHAR(64) UNIQUE NOT NULL,
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY (CACHE 50) PRIMARY KEY,
+            hash_codigo BYTEA UNIQUE NOT NULL CHECK (octet_length(hash_codigo) = 32),
             resultado JSONB NOT NULL,
             created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-            acessos INTEGER DEFAULT 1
+            acessos INTEGER DEFAULT 1,
+            ultimo_acesso TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
         );
         
-        -- Índice para o cache
-        CREATE INDEX IF NOT EXISTS idx_cache_hash 
-        ON cache_analises(hash_codigo);
+        ALTER TABLE cache_analises
+        ADD COLUMN IF NOT EXISTS ultimo_acesso TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+        
+        -- Chaves antigas em hexadecimal passam a ser armazenadas em binário
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'cache_analises'
+                AND column_name = 'hash_codigo'
+                AND data_type <> 'bytea'
+            ) THEN
+                ALTER TABLE cache_analises
+                ALTER COLUMN hash_codigo TYPE BYTEA USING decode(hash_codigo, 'hex');
+                ALTER TABLE cache_analises
+                ADD CHECK (octet_length(hash_codigo) = 32);
+            END IF;
+        END
+        $$;
+        
+        -- hash_codigo já é indexado pela restrição UNIQUE
+        DROP INDEX IF EXISTS idx_cache_hash;
+        
+        CREATE INDEX IF NOT EXISTS idx_cache_created_at
+        ON cache_analises(created_at);
         
         -- Tabela para estatísticas agregadas
         CREATE TABLE IF NOT EXISTS estatisticas_diarias (
             data DATE PRIMARY KEY,
             total_analises INTEGER DEFAULT 0,
-            media_pontuacao DECIMAL(5,2),
-            tempo_medio_analise DECIMAL(8,4),
+            media_pontuacao REAL,
+            tempo_medio_analise REAL,
             tipos_sugestoes_count JSONB,
             updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
         );
         """
         
-        async with self.pool_conexoes.acquire() as conexao:
-            await conexao.execute(sql_criar_tabelas)
+        async with self._adquirir_conexao() as conexao:
+            await conexao.execute(SQL_FUNCAO_PARTICOES + sql_criar_tabelas + SQL_GARANTIR_PARTICOES)
             logger.info("Tabelas criadas/verificadas com sucesso!")
     
     async def salvar_analise(
@@ -140,46 +417,90 @@ class GerenciadorBancoDados:
         """
         try:
             # Converte sugestões para JSON
-            sugestoes_json = [sugestao.dict() for sugestao in sugestoes]
+            sugestoes_json = [sugestao.model_dump(mode='json') for sugestao in sugestoes]
             
-            # Conta tipos de sugestões
-            tipos_sugestoes = {}
-            for sugestao in sugestoes:
-                tipo = sugestao.tipo.value
-                tipos_sugestoes[tipo] = tipos_sugestoes.get(tipo, 0) + 1
+            # Conta tipos de sugestões (Sugestao guarda o tipo já como texto)
+            tipos_sugestoes = Counter(map(attrgetter('tipo'), sugestoes))
             
-            sql_inserir = """
-            INSERT INTO analysis_history (
-                code_snippet, suggestions, pontuacao_qualidade, 
-                nome_arquivo, tempo_analise, nivel_detalhamento,
-                numero_sugestoes, tipos_sugestoes
-            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-            RETURNING id
-            """
+            # A conexão só fica emprestada durante o INSERT; as estatísticas
+            # diárias são acumuladas em memória e gravadas em lote
+            nivel = getattr(nivel_detalhamento, 'value', nivel_detalhamento)
+            sql_especializado = SQL_INSERIR_ANALISE_POR_NIVEL.get(nivel)
+            if sql_especializado is not None:
+                parametros = (
+                    codigo, sugestoes_json, pontuacao, nome_arquivo,
+                    tempo_analise, len(sugestoes), tipos_sugestoes
+                )
+            else:
+                parametros = (
+                    codigo, sugestoes_json, pontuacao, nome_arquivo,
+                    tempo_analise, nivel, len(sugestoes), tipos_sugestoes
+                )
+            
+            async with self._adquirir_conexao() as conexao:
+                sentenca = await conexao.preparar(sql_especializado or SQL_INSERIR_ANALISE)
+                analise_id = await sentenca.fetchval(*parametros)
+            
+            # Atualiza estatísticas diárias
+            self._atualizar_estatisticas_diarias(pontuacao, tempo_analise, tipos_sugestoes)
+            
+            logger.info(f"Análise salva com ID: {analise_id}")
+            return analise_id
+                
+        except Exception as e:
+            logger.error(f"Erro ao salvar análise: {e}")
+            raise
+    
+    async def salvar_analises_em_lote(self, itens: List[Dict[str, Any]]) -> int:
+        """
+        Salva várias análises de uma vez pelo protocolo COPY (binário).
+        
+        Uma única ida e volta ao banco para todo o lote; os IDs gerados não
+        são devolvidos (use salvar_analise quando o ID for necessário).
+        
+        Args:
+            itens: Dicionários com os mesmos argumentos de salvar_analise
+                (codigo, sugestoes, pontuacao e, opcionalmente, nome_arquivo,
+                tempo_analise e nivel_detalhamento)
             
-            async with self.pool_conexoes.acquire() as conexao:
-                resultado = await conexao.fetchrow(
-                    sql_inserir,
-                    codigo,
-                    json.dumps(sugestoes_json),
-                    pontuacao,
-                    nome_arquivo,
-                    tempo_analise,
-                    nivel_detalhamento,
+        Returns:
+            Quantidade de análises gravadas
+        """
+        try:
+            registros = []
+            for item in itens:
+                sugestoes = item['sugestoes']
+                registros.append((
+                    item['codigo'],
+                    [sugestao.model_dump(mode='json') for sugestao in sugestoes],
+                    item['pontuacao'],
+                    item.get('nome_arquivo'),
+                    item.get('tempo_analise', 0.0),
+                    item.get('nivel_detalhamento', "intermediario"),
                     len(sugestoes),
-                    json.dumps(tipos_sugestoes)
+                    Counter(map(attrgetter('tipo'), sugestoes))
+                ))
+            
+            if not registros:
+                return 0
+            
+            # As colunas JSONB usam o codec binário registrado na conexão
+            async with self._adquirir_conexao() as conexao:
+                await conexao.copy_records_to_table(
+                    'analysis_history',
+                    records=registros,
+                    columns=COLUNAS_COPIA_ANALISES
                 )
-                
-                analise_id = resultado['id']
-                
-                # Atualiza estatísticas diárias
-                await self._atualizar_estatisticas_diarias(pontuacao, tempo_analise, tipos_sugestoes)
-                
-                logger.info(f"Análise salva com ID: {analise_id}")
-                return analise_id
+            
+            # Atualiza estatísticas diárias
+            for registro in registros:
+                self._atualizar_estatisticas_diarias(registro[2], registro[4], registro[7])
+            
+            logger.info(f"{len(registros)} análises salvas em lote")
+            return len(registros)
                 
         except Exception as e:
-            logger.error(f"Erro ao salvar análise: {e}")
+            logger.error(f"Erro ao salvar análises em lote: {e}")
             raise
     
     async def obter_historico(
@@ -200,53 +521,88 @@ class GerenciadorBancoDados:
             Lista de análises do histórico
         """
         try:
-            sql_base = """
-            SELECT id, code_snippet, numero_sugestoes, pontuacao_qualidade,
-                   nome_arquivo, created_at
-            FROM analysis_history
-            """
-            
-            parametros = []
-            where_clause = ""
+            sql_completo, parametros = self._montar_consulta_historico(limite, offset, nome_arquivo)
             
-            if nome_arquivo:
-                where_clause = " WHERE nome_arquivo = $1"
-                parametros.append(nome_arquivo)
-            
-            sql_completo = f"""
-            {sql_base}
-            {where_clause}
-            ORDER BY created_at DESC
-            LIMIT ${len(parametros) + 1} OFFSET ${len(parametros) + 2}
-            """
-            
-            parametros.extend([limite, offset])
-            
-            async with self.pool_conexoes.acquire() as conexao:
-                registros = await conexao.fetch(sql_completo, *parametros)
-                
-                historico = []
-                for registro in registros:
-                    # Trunca o código para exibição
-                    codigo_snippet = registro['code_snippet'][:200]
-                    if len(registro['code_snippet']) > 200:
-                        codigo_snippet += "..."
-                    
-                    historico.append(HistoricoAnalise(
-                        id=registro['id'],
-                        codigo_snippet=codigo_snippet,
-                        numero_sugestoes=registro['numero_sugestoes'],
-                        pontuacao_qualidade=float(registro['pontuacao_qualidade']),
-                        nome_arquivo=registro['nome_arquivo'],
-                        created_at=registro['created_at']
-                    ))
+            async with self._adquirir_conexao() as conexao:
+                sentenca = await conexao.preparar(sql_completo)
+                registros = await sentenca.fetch(*parametros)
                 
-                return historico
+                return [
+                    HistoricoAnalise(**self._registro_para_historico(registro))
+                    for registro in registros
+                ]
                 
         except Exception as e:
             logger.error(f"Erro ao obter histórico: {e}")
             raise
     
+    async def stream_historico(
+        self,
+        limite: int = 10,
+        offset: int = 0,
+        nome_arquivo: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Percorre o histórico de análises em lotes de TAMANHO_LOTE_HISTORICO,
+        sem carregar todos os registros em memória.
+        
+        Nenhuma conexão fica presa enquanto o consumidor processa um lote
+        (por exemplo, enviando-o a um cliente lento): cada lote é uma
+        consulta própria, paginada por OFFSET.
+        
+        Args:
+            limite: Número máximo de registros
+            offset: Número de registros a pular
+            nome_arquivo: Filtrar por nome de arquivo
+            
+        Yields:
+            Dicionários com os campos de HistoricoAnalise
+        """
+        restantes = limite
+        while restantes > 0:
+            lote = min(restantes, TAMANHO_LOTE_HISTORICO)
+            sql_completo, parametros = self._montar_consulta_historico(lote, offset, nome_arquivo)
+            
+            async with self._adquirir_conexao() as conexao:
+                sentenca = await conexao.preparar(sql_completo)
+                registros = await sentenca.fetch(*parametros)
+            
+            for registro in registros:
+                yield self._registro_para_historico(registro)
+            
+            if len(registros) < lote:
+                return
+            restantes -= lote
+            offset += lote
+    
+    @staticmethod
+    def _montar_consulta_historico(
+        limite: int,
+        offset: int,
+        nome_arquivo: Optional[str]
+    ) -> tuple:
+        """Escolhe o SQL (fixo, preparável) e os parâmetros da consulta de histórico."""
+        if nome_arquivo:
+            return SQL_HISTORICO_POR_ARQUIVO, [nome_arquivo, limite, offset]
+        return SQL_HISTORICO, [limite, offset]
+    
+    @staticmethod
+    def _registro_para_historico(registro: asyncpg.Record) -> Dict[str, Any]:
+        """Converte um registro do histórico nos campos de HistoricoAnalise."""
+        # Trunca o código para exibição
+        codigo_snippet = registro['snippet']
+        if len(codigo_snippet) > TAMANHO_SNIPPET_HISTORICO:
+            codigo_snippet = codigo_snippet[:TAMANHO_SNIPPET_HISTORICO] + "..."
+        
+        return {
+            "id": registro['id'],
+            "codigo_snippet": codigo_snippet,
+            "numero_sugestoes": registro['numero_sugestoes'],
+            "pontuacao_qualidade": float(registro['pontuacao_qualidade']),
+            "nome_arquivo": registro['nome_arquivo'],
+            "created_at": registro['created_at']
+        }
+    
     async def obter_estatisticas(self) -> Dict[str, Any]:
         """
         Obtém estatísticas gerais do sistema.
@@ -255,52 +611,49 @@ class GerenciadorBancoDados:
             Dicionário com estatísticas
         """
         try:
+            # Uma única consulta: o recorte dos últimos 30 dias é lido uma vez
+            # (CTE base) e as três agregações voltam numa só linha
             sql_estatisticas = """
-            SELECT 
-                COUNT(*) as total_analises,
-                AVG(pontuacao_qualidade) as media_pontuacao,
-                AVG(tempo_analise) as tempo_medio_analise
-            FROM analysis_history
-            WHERE created_at >= CURRENT_DATE - INTERVAL '30 days'
-            """
-            
-            sql_tipos_sugestoes = """
-            SELECT tipos_sugestoes
-            FROM analysis_history
-            WHERE created_at >= CURRENT_DATE - INTERVAL '30 days'
-            AND tipos_sugestoes IS NOT NULL
-            """
-            
-            sql_analises_por_dia = """
-            SELECT 
-                DATE(created_at) as data,
-                COUNT(*) as total
-            FROM analysis_history
-            WHERE created_at >= CURRENT_DATE - INTERVAL '30 days'
-            GROUP BY DATE(created_at)
-            ORDER BY data DESC
+            WITH base AS (
+                SELECT pontuacao_qualidade, tempo_analise, tipos_sugestoes, created_at
+                FROM analysis_history
+                WHERE created_at >= CURRENT_DATE - INTERVAL '30 days'
+            ),
+            gerais AS (
+                SELECT 
+                    COUNT(*) as total_analises,
+                    AVG(pontuacao_qualidade) as media_pontuacao,
+                    AVG(tempo_analise) as tempo_medio_analise
+                FROM base
+            ),
+            tipos AS (
+                SELECT jsonb_object_agg(tipo, total) as tipos_sugestoes
+                FROM (
+                    SELECT key AS tipo, SUM(value::int) AS total
+                    FROM base, jsonb_each_text(base.tipos_sugestoes)
+                    GROUP BY key
+                ) por_tipo
+            ),
+            dias AS (
+                SELECT jsonb_object_agg(data::text, total) as analises_por_dia
+                FROM (
+                    SELECT DATE(created_at) as data, COUNT(*) as total
+                    FROM base
+                    GROUP BY DATE(created_at)
+                ) por_dia
+            )
+            SELECT * FROM gerais, tipos, dias
             """
             
-            async with self.pool_conexoes.acquire() as conexao:
-                # Estatísticas gerais
+            async with self._adquirir_conexao() as conexao:
                 stats_gerais = await conexao.fetchrow(sql_estatisticas)
                 
-                # Tipos de sugestões mais comuns
-                tipos_registros = await conexao.fetch(sql_tipos_sugestoes)
-                tipos_consolidados = {}
-                
-                for registro in tipos_registros:
-                    if registro['tipos_sugestoes']:
-                        tipos_data = json.loads(registro['tipos_sugestoes'])
-                        for tipo, count in tipos_data.items():
-                            tipos_consolidados[tipo] = tipos_consolidados.get(tipo, 0) + count
+                tipos_consolidados = stats_gerais['tipos_sugestoes'] or {}
                 
-                # Análises por dia
-                analises_dia = await conexao.fetch(sql_analises_por_dia)
-                analises_por_dia = {
-                    str(registro['data']): registro['total']
-                    for registro in analises_dia
-                }
+                # Objetos JSONB não guardam ordem: dias mais recentes primeiro
+                analises_por_dia = dict(
+                    sorted((stats_gerais['analises_por_dia'] or {}).items(), reverse=True)
+                )
                 
                 return {
                     "total_analises": stats_gerais['total_analises'] or 0,
@@ -323,63 +676,179 @@ class GerenciadorBancoDados:
             True se a conexão está ok, False caso contrário
         """
         try:
-            async with self.pool_conexoes.acquire() as conexao:
-                await conexao.fetchval("SELECT 1")
+            async with self._adquirir_conexao() as conexao:
+                sentenca = await conexao.preparar(SQL_VERIFICAR_CONEXAO)
+                await sentenca.fetchval()
                 return True
         except Exception as e:
             logger.error(f"Erro na verificação de conexão: {e}")
             return False
     
-    async def _atualizar_estatisticas_diarias(
+    def _atualizar_estatisticas_diarias(
         self,
         pontuacao: float,
         tempo_analise: float,
         tipos_sugestoes: Dict[str, int]
     ):
-        """Atualiza as estatísticas diárias agregadas."""
-        try:
-            data_hoje = datetime.now().date()
-            
-            sql_upsert = """
-            INSERT INTO estatisticas_diarias (
-                data, total_analises, media_pontuacao, tempo_medio_analise, tipos_sugestoes_count
-            ) VALUES ($1, 1, $2, $3, $4)
-            ON CONFLICT (data) DO UPDATE SET
-                total_analises = estatisticas_diarias.total_analises + 1,
-                media_pontuacao = (
-                    estatisticas_diarias.media_pontuacao * estatisticas_diarias.total_analises + $2
-                ) / (estatisticas_diarias.total_analises + 1),
-                tempo_medio_analise = (
-                    estatisticas_diarias.tempo_medio_analise * estatisticas_diarias.total_analises + $3
-                ) / (estatisticas_diarias.total_analises + 1),
-                tipos_sugestoes_count = (
-                    COALESCE(estatisticas_diarias.tipos_sugestoes_count, '{}'::jsonb) || $4::jsonb
-                ),
-                updated_at = CURRENT_TIMESTAMP
-            """
+        """
+        Acumula uma análise nas estatísticas diárias em memória.
+        
+        A gravação no banco é feita em lote por _descarregar_estatisticas.
+        """
+        data_hoje = self._data_hoje()
+        acumulado = self._buffer_estatisticas.get(data_hoje)
+        if acumulado is None:
+            acumulado = self._buffer_estatisticas[data_hoje] = [0, 0.0, 0.0, Counter()]
+        acumulado[0] += 1
+        acumulado[1] += pontuacao
+        acumulado[2] += tempo_analise
+        acumulado[3].update(tipos_sugestoes)
+    
+    def _data_hoje(self) -> date:
+        """Data local de hoje, recalculada só quando o dia vira."""
+        if time.monotonic() >= self._fim_do_dia:
+            agora = datetime.now()
+            amanha = datetime.combine(agora.date() + timedelta(days=1), datetime.min.time())
+            self._hoje = agora.date()
+            self._fim_do_dia = time.monotonic() + (amanha - agora).total_seconds()
+        return self._hoje
+    
+    async def _descarregar_estatisticas(self):
+        """Grava as estatísticas acumuladas (um upsert por data, via executemany)."""
+        async with self._lock_estatisticas:
+            if not self._buffer_estatisticas or self.pool_conexoes is None:
+                return
             
-            async with self.pool_conexoes.acquire() as conexao:
-                await conexao.execute(
-                    sql_upsert,
-                    data_hoje,
-                    pontuacao,
-                    tempo_analise,
-                    json.dumps(tipos_sugestoes)
-                )
-                
+            buffer, self._buffer_estatisticas = self._buffer_estatisticas, {}
+            try:
+                async with self._adquirir_conexao() as conexao:
+                    sentenca = await conexao.preparar(SQL_ATUALIZAR_ESTATISTICAS)
+                    await sentenca.executemany([
+                        (data, total, soma_pontuacao, soma_tempo, dict(tipos))
+                        for data, (total, soma_pontuacao, soma_tempo, tipos) in buffer.items()
+                    ])
+                    
+            except Exception as e:
+                logger.warning(f"Erro ao atualizar estatísticas diárias: {e}")
+                # Devolve o lote ao acumulador para a próxima tentativa
+                for data, (total, soma_pontuacao, soma_tempo, tipos) in buffer.items():
+                    acumulado = self._buffer_estatisticas.setdefault(data, [0, 0.0, 0.0, Counter()])
+                    acumulado[0] += total
+                    acumulado[1] += soma_pontuacao
+                    acumulado[2] += soma_tempo
+                    acumulado[3].update(tipos)
+    
+    async def _descarregar_acessos_cache(self):
+        """Grava, num único UPDATE, os acessos ao cache acumulados desde a última descarga."""
+        if not self._acessos_cache or self.pool_conexoes is None:
+            return
+        
+        acessos, self._acessos_cache = self._acessos_cache, Counter()
+        chaves = sorted(acessos)
+        try:
+            async with self._adquirir_conexao() as conexao:
+                sentenca = await conexao.preparar(SQL_REGISTRAR_ACESSOS_CACHE)
+                await sentenca.fetch(chaves, [acessos[chave] for chave in chaves])
         except Exception as e:
-            logger.warning(f"Erro ao atualizar estatísticas diárias: {e}")
-            # Não propaga o erro para não afetar a operação principal
+            # Contadores são informativos: o lote é descartado
+            logger.warning(f"Erro ao registrar acessos ao cache: {e}")
+    
+    async def _garantir_particoes(self) -> bool:
+        """Cria as partições que faltarem a partir do mês corrente."""
+        try:
+            async with self._adquirir_conexao() as conexao:
+                await conexao.execute(SQL_GARANTIR_PARTICOES)
+            return True
+        except Exception as e:
+            logger.warning(f"Erro ao criar partições mensais: {e}")
+            return False
+    
+    async def _descarregar_estatisticas_periodicamente(self):
+        """
+        Tarefa de fundo que descarrega o acumulador a cada intervalo e, quando
+        o dia vira, garante as partições dos próximos meses.
+        """
+        # As partições do dia da inicialização já foram criadas em _criar_tabelas
+        data_particoes = self._data_hoje()
+        while True:
+            await asyncio.sleep(INTERVALO_DESCARGA_ESTATISTICAS)
+            # shield: cancelar a tarefa não interrompe uma descarga em andamento
+            await asyncio.shield(self._descarregar_estatisticas())
+            await asyncio.shield(self._descarregar_acessos_cache())
+            
+            hoje = self._data_hoje()
+            if hoje != data_particoes and await asyncio.shield(self._garantir_particoes()):
+                data_particoes = hoje
     
     async def fechar_conexoes(self):
         """Fecha todas as conexões com o banco de dados."""
         try:
+            if self._tarefa_estatisticas:
+                self._tarefa_estatisticas.cancel()
+                self._tarefa_estatisticas = None
+            # Grava o que ainda estiver acumulado antes de fechar o pool
+            await self._descarregar_estatisticas()
+            await self._descarregar_acessos_cache()
+            
             if self.pool_conexoes:
                 await self.pool_conexoes.close()
                 logger.info("Conexões com banco de dados fechadas")
         except Exception as e:
             logger.error(f"Erro ao fechar conexões: {e}")
     
+    async def obter_analise_cache(self, hash_codigo: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Busca uma análise no cache persistente. A leitura não escreve no
+        banco: o acesso é contabilizado em memória e gravado em lote.
+        
+        Args:
+            hash_codigo: Chave da análise (ver analisador_codigo.hash_analise)
+            
+        Returns:
+            Resultado armazenado ou None se ausente ou se o banco falhar
+        """
+        if self.pool_conexoes is None:
+            return None
+        
+        try:
+            async with self._adquirir_conexao() as conexao:
+                sentenca = await conexao.preparar(SQL_OBTER_CACHE)
+                resultado = await sentenca.fetchval(hash_codigo)
+                
+            if resultado is not None:
+                self._acessos_cache[hash_codigo] += 1
+            return resultado
+            
+        except Exception as e:
+            # Falha no cache equivale a um miss: a análise segue normalmente
+            logger.warning(f"Erro ao consultar cache de análises: {e}")
+            return None
+    
+    async def salvar_analise_cache(self, hash_codigo: bytes, resultado: Dict[str, Any]):
+        """
+        Armazena (ou substitui) uma análise no cache persistente.
+        
+        Args:
+            hash_codigo: Chave da análise (ver analisador_codigo.hash_analise)
+            resultado: Sugestões serializadas e pontuação
+        """
+        if self.pool_conexoes is None:
+            return
+        
+        try:
+            sql_salvar = """
+            INSERT INTO cache_analises (hash_codigo, resultado)
+            VALUES ($1, $2)
+            ON CONFLICT (hash_codigo) DO UPDATE
+            SET resultado = EXCLUDED.resultado, ultimo_acesso = CURRENT_TIMESTAMP
+            """
+            
+            async with self._adquirir_conexao() as conexao:
+                await conexao.execute(sql_salvar, hash_codigo, resultado)
+                
+        except Exception as e:
+            logger.warning(f"Erro ao salvar cache de análises: {e}")
+    
     async def limpar_cache_antigo(self, dias: int = 7):
         """
         Remove entradas antigas do cache.
@@ -388,14 +857,12 @@ class GerenciadorBancoDados:
             dias: Número de dias para manter no cache
         """
         try:
-            sql_limpar = """
-            DELETE FROM cache_analises 
-            WHERE created_at < CURRENT_TIMESTAMP - INTERVAL '%s days'
-            """
-            
-            async with self.pool_conexoes.acquire() as conexao:
-                resultado = await conexao.execute(sql_limpar, dias)
-                logger.info(f"Cache limpo: {resultado} entradas removidas")
+            async with self._adquirir_conexao() as conexao:
+                # O status do comando ("DELETE n") fica em get_statusmsg()
+                sentenca = await conexao.preparar(SQL_LIMPAR_CACHE)
+                await sentenca.fetch(dias)
+                removidas = int(sentenca.get_statusmsg().split()[-1])
+                logger.info(f"Cache limpo: {removidas} entradas removidas")
                 
         except Exception as e:
             logger.error(f"Erro ao limpar cache: {e}")
@@ -411,12 +878,9 @@ class GerenciadorBancoDados:
             Dados da análise ou None se não encontrada
         """
         try:
-            sql_buscar = """
-            SELECT * FROM analysis_history WHERE id = $1
-            """
-            
-            async with self.pool_conexoes.acquire() as conexao:
-                registro = await conexao.fetchrow(sql_buscar, analise_id)
+            async with self._adquirir_conexao() as conexao:
+                sentenca = await conexao.preparar(SQL_ANALISE_POR_ID)
+                registro = await sentenca.fetchrow(analise_id)
                 
                 if registro:
                     return dict(registro)
@@ -5,13 +5,19 @@ Implementa sistema de cache distribuído usando Redis para melhorar
 a performance e escalabilidade do agente de otimização.
 """
 
+import array
 import asyncio
 import hashlib
+import heapq
 import json
 import logging
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Union
-from datetime import datetime, timedelta
-import pickle
+from datetime import datetime
+
+import orjson
 
 try:
     import redis.asyncio as redis
@@ -24,6 +30,29 @@ from configuracao.configuracao_bd import ConfiguracaoBancoDados
 
 logger = logging.getLogger(__name__)
 
+# Byte prefixado aos valores gravados no Redis; entradas sem ele
+# (p.ex. o antigo formato pickle) são tratadas como ausentes
+VERSAO_FORMATO_CACHE = b"\x01"
+# Análise gravada com as sugestões substituídas por seus hashes (sug:<hash>)
+FORMATO_SUGESTOES_DEDUPLICADAS = b"\x02"
+OPCOES_ORJSON = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+# Chaves ordenadas: sugestões iguais geram os mesmos bytes (e o mesmo hash)
+OPCOES_ORJSON_CANONICO = OPCOES_ORJSON | orjson.OPT_SORT_KEYS
+# Índices dos contadores de uso do cache (GerenciadorCache._contadores)
+_HITS, _MISSES, _SETS, _DELETES = range(4)
+NOMES_CONTADORES = ('hits', 'misses', 'sets', 'deletes')
+
+# Chaves por iteração do SCAN (e por UNLINK) na invalidação de cache
+TAMANHO_LOTE_SCAN = 500
+
+@lru_cache(maxsize=128)
+def _hash_codigo(codigo: str) -> str:
+    """
+    Hash BLAKE2b de 64 bits do código, memorizado: a consulta e a gravação
+    de um mesmo código (miss seguido de set) calculam o hash uma única vez.
+    """
+    return hashlib.blake2b(codigo.encode('utf-8'), digest_size=8).hexdigest()
+
 class GerenciadorCache:
     """
     Gerenciador de cache distribuído para otimização de performance.
@@ -34,15 +63,27 @@ class GerenciadorCache:
     
     def __init__(self):
         self.redis_client = None
-        self.cache_local = {} 
+        # Ordem de acesso (LRU) e min-heap de (expira_em, chave) para a limpeza;
+        # expira_em é um prazo em time.monotonic()
+        self.cache_local = OrderedDict()
+        self._heap_expiracao = []
         self.config = self._carregar_configuracao_cache()
-        self.estatisticas = {
-            'hits': 0,
-            'misses': 0,
-            'sets': 0,
-            'deletes': 0,
-            'inicio': datetime.now()
+        # Prefixos das chaves dos namespaces usados, montados uma única vez
+        self._prefixos_chaves = {
+            namespace: f"{self.config['prefixo_chaves']}{namespace}:"
+            for namespace in ('analise', 'sug', 'stats', 'user')
         }
+        # Contadores contíguos (hits, misses, sets, deletes); o dicionário de
+        # estatísticas só é montado quando consultado
+        self._contadores = array.array('Q', bytes(8 * len(NOMES_CONTADORES)))
+        self._inicio = datetime.now()
+    
+    @property
+    def estatisticas(self) -> Dict[str, Any]:
+        """Estatísticas de uso do cache (cópia montada a partir dos contadores)."""
+        estatisticas = dict(zip(NOMES_CONTADORES, self._contadores))
+        estatisticas['inicio'] = self._inicio
+        return estatisticas
     
     def _carregar_configuracao_cache(self) -> Dict[str, Any]:
         """Carrega configurações do cache."""
@@ -53,6 +94,7 @@ class GerenciadorCache:
             'ttl_padrao': 3600,  
             'ttl_analises': 7200,  
             'ttl_estatisticas': 300,  
+            'ttl_sugestoes': 86400,  
             'max_cache_local': 1000, 
             'prefixo_chaves': 'agente_otimizacao:'
         }
@@ -82,12 +124,19 @@ class GerenciadorCache:
     
     def _gerar_chave_cache(self, namespace: str, identificador: str) -> str:
         """Gera chave única para o cache."""
-        chave_base = f"{self.config['prefixo_chaves']}{namespace}:{identificador}"
-        return chave_base
+        prefixo = self._prefixos_chaves.get(namespace)
+        if prefixo is None:
+            return f"{self.config['prefixo_chaves']}{namespace}:{identificador}"
+        return prefixo + identificador
     
     def _gerar_hash_codigo(self, codigo: str) -> str:
-        """Gera hash único para um código."""
-        return hashlib.sha256(codigo.encode('utf-8')).hexdigest()[:16]
+        """Gera hash único (BLAKE2b de 64 bits, 16 caracteres hex) para um código."""
+        return _hash_codigo(codigo)
+    
+    @staticmethod
+    def _gerar_hash_bytes(dados: bytes) -> str:
+        """Gera hash BLAKE2b de 64 bits (16 caracteres hex) para bytes."""
+        return hashlib.blake2b(dados, digest_size=8).hexdigest()
     
     async def obter_analise_cache(self, codigo: str) -> Optional[Dict[str, Any]]:
         """
@@ -103,26 +152,86 @@ class GerenciadorCache:
         chave = self._gerar_chave_cache("analise", hash_codigo)
         
         try:
-            resultado = await self._obter_do_cache(chave)
-            if resultado:
-                self.estatisticas['hits'] += 1
+            if self.redis_client:
+                dados_bytes = await self.redis_client.get(chave)
+                resultado = (await self._decodificar_analises([dados_bytes]))[0]
+            else:
+                resultado = await self._obter_do_cache(chave)
+            
+            if resultado is not None:
+                self._contadores[_HITS] += 1
                 logger.debug(f"Cache hit para análise: {hash_codigo}")
-                return resultado
+                return self._montar_entrada_analise(resultado, hash_codigo, codigo)
             else:
-                self.estatisticas['misses'] += 1
+                self._contadores[_MISSES] += 1
                 logger.debug(f"Cache miss para análise: {hash_codigo}")
                 return None
                 
         except Exception as e:
             logger.error(f"Erro ao obter do cache: {e}")
-            self.estatisticas['misses'] += 1
+            self._contadores[_MISSES] += 1
             return None
     
+    async def obter_analises_cache(self, codigos: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Obtém do cache as análises de vários códigos de uma só vez.
+        
+        Com Redis, faz um único MGET para as análises (e outro para as
+        sugestões deduplicadas), em vez de uma ida e volta por código.
+        
+        Args:
+            codigos: Códigos Python para buscar no cache
+            
+        Returns:
+            Lista, na ordem de ``codigos``, com o resultado ou None para cada um
+        """
+        hashes = [self._gerar_hash_codigo(codigo) for codigo in codigos]
+        chaves = [self._gerar_chave_cache("analise", h) for h in hashes]
+        
+        try:
+            if self.redis_client:
+                resultados = await self._decodificar_analises(
+                    await self.redis_client.mget(chaves)
+                )
+            else:
+                resultados = [await self._obter_do_cache(chave) for chave in chaves]
+                
+        except Exception as e:
+            logger.error(f"Erro ao obter do cache: {e}")
+            resultados = [None] * len(codigos)
+        
+        hits = len(resultados) - resultados.count(None)
+        self._contadores[_HITS] += hits
+        self._contadores[_MISSES] += len(resultados) - hits
+        return [
+            None if resultado is None else self._montar_entrada_analise(resultado, h, codigo)
+            for resultado, h, codigo in zip(resultados, hashes, codigos)
+        ]
+    
+    @staticmethod
+    def _montar_entrada_analise(
+        resultado: Any,
+        hash_codigo: str,
+        codigo: str
+    ) -> Dict[str, Any]:
+        """
+        Monta a entrada devolvida pelo cache de análises.
+        
+        Só o resultado é gravado; hash e tamanho são derivados do código
+        consultado (a idade da entrada, se necessária, vem do TTL da chave).
+        """
+        return {
+            'resultado': resultado,
+            'hash_codigo': hash_codigo,
+            'tamanho_codigo': len(codigo)
+        }
+    
     async def salvar_analise_cache(
         self,
         codigo: str,
         resultado_analise: Dict[str, Any],
-        ttl: Optional[int] = None
+        ttl: Optional[int] = None,
+        hash_codigo: Optional[str] = None
     ):
         """
         Salva resultado de análise no cache.
@@ -131,26 +240,125 @@ class GerenciadorCache:
             codigo: Código Python analisado
             resultado_analise: Resultado da análise
             ttl: Tempo de vida em segundos (opcional)
+            hash_codigo: Hash já calculado do código (evita recalculá-lo)
         """
-        hash_codigo = self._gerar_hash_codigo(codigo)
+        hash_codigo = hash_codigo or self._gerar_hash_codigo(codigo)
         chave = self._gerar_chave_cache("analise", hash_codigo)
         ttl_final = ttl or self.config['ttl_analises']
         
-        dados_cache = {
-            'resultado': resultado_analise,
-            'timestamp': datetime.now().isoformat(),
-            'hash_codigo': hash_codigo,
-            'tamanho_codigo': len(codigo)
-        }
-        
         try:
-            await self._salvar_no_cache(chave, dados_cache, ttl_final)
-            self.estatisticas['sets'] += 1
+            if self.redis_client and self._sugestoes_deduplicaveis(resultado_analise):
+                await self._salvar_analise_deduplicada(chave, resultado_analise, ttl_final)
+            else:
+                await self._salvar_no_cache(chave, resultado_analise, ttl_final)
+            self._contadores[_SETS] += 1
             logger.debug(f"Análise salva no cache: {hash_codigo}")
             
         except Exception as e:
             logger.error(f"Erro ao salvar no cache: {e}")
     
+    @staticmethod
+    def _sugestoes_deduplicaveis(resultado_analise: Any) -> bool:
+        """Verifica se o resultado tem uma lista de sugestões (dicts) a deduplicar."""
+        if not isinstance(resultado_analise, dict):
+            return False
+        sugestoes = resultado_analise.get('sugestoes')
+        return (
+            isinstance(sugestoes, list)
+            and bool(sugestoes)
+            and all(isinstance(s, dict) for s in sugestoes)
+        )
+    
+    async def _salvar_analise_deduplicada(
+        self,
+        chave: str,
+        resultado_analise: Dict[str, Any],
+        ttl: int
+    ):
+        """
+        Salva a análise no Redis endereçando cada sugestão pelo seu conteúdo.
+        
+        Cada sugestão é gravada uma única vez em ``sug:<hash>`` (compartilhada
+        entre análises) e a análise guarda apenas a lista de hashes. Todas as
+        gravações vão num único pipeline (uma ida e volta ao Redis).
+        """
+        sugestoes = {}
+        hashes = []
+        for sugestao in resultado_analise['sugestoes']:
+            dados_bytes = orjson.dumps(sugestao, option=OPCOES_ORJSON_CANONICO)
+            hash_sugestao = self._gerar_hash_bytes(dados_bytes)
+            sugestoes[hash_sugestao] = dados_bytes
+            hashes.append(hash_sugestao)
+        
+        resultado_referencia = {**resultado_analise, 'sugestoes': hashes}
+        # As sugestões nunca podem expirar antes das análises que as referenciam
+        ttl_sugestoes = max(ttl, self.config['ttl_sugestoes'])
+        
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipeline:
+                for hash_sugestao, dados_bytes in sugestoes.items():
+                    pipeline.setex(
+                        self._gerar_chave_cache("sug", hash_sugestao),
+                        ttl_sugestoes,
+                        VERSAO_FORMATO_CACHE + dados_bytes
+                    )
+                pipeline.setex(
+                    chave,
+                    ttl,
+                    FORMATO_SUGESTOES_DEDUPLICADAS
+                    + orjson.dumps(resultado_referencia, option=OPCOES_ORJSON)
+                )
+                await pipeline.execute()
+        except Exception as e:
+            logger.error(f"Erro ao salvar no Redis: {e}")
+            # Fallback para cache local
+            await self._salvar_cache_local(chave, resultado_analise, ttl)
+    
+    async def _decodificar_analises(
+        self,
+        valores: List[Optional[bytes]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Decodifica análises lidas do Redis, reidratando as que guardam
+        apenas os hashes das sugestões (um único MGET para todas).
+        
+        Returns:
+            Lista com a análise ou None (ausente, formato desconhecido ou
+            com alguma sugestão que não está mais no cache)
+        """
+        resultados = []
+        deduplicados = []
+        for dados_bytes in valores:
+            formato = dados_bytes[:1] if dados_bytes else None
+            if formato == VERSAO_FORMATO_CACHE:
+                resultados.append(orjson.loads(dados_bytes[1:]))
+            elif formato == FORMATO_SUGESTOES_DEDUPLICADAS:
+                deduplicados.append(len(resultados))
+                resultados.append(orjson.loads(dados_bytes[1:]))
+            else:
+                resultados.append(None)
+        
+        if not deduplicados:
+            return resultados
+        
+        hashes = list({h: None for i in deduplicados for h in resultados[i]['sugestoes']})
+        valores_sugestoes = await self.redis_client.mget(
+            [self._gerar_chave_cache("sug", h) for h in hashes]
+        )
+        sugestoes = {
+            h: orjson.loads(dados_bytes[1:])
+            for h, dados_bytes in zip(hashes, valores_sugestoes)
+            if dados_bytes and dados_bytes[:1] == VERSAO_FORMATO_CACHE
+        }
+        
+        for i in deduplicados:
+            referencias = resultados[i]['sugestoes']
+            if all(h in sugestoes for h in referencias):
+                resultados[i]['sugestoes'] = [sugestoes[h] for h in referencias]
+            else:
+                resultados[i] = None
+        return resultados
+    
     async def obter_estatisticas_cache(self) -> Optional[Dict[str, Any]]:
         """Obtém estatísticas do sistema do cache."""
         chave = self._gerar_chave_cache("stats", "sistema")
@@ -177,11 +385,21 @@ class GerenciadorCache:
         
         try:
             if self.redis_client:
-                chaves = await self.redis_client.keys(padrao)
-                if chaves:
-                    await self.redis_client.delete(*chaves)
-                    self.estatisticas['deletes'] += len(chaves)
-                    logger.info(f"Invalidadas {len(chaves)} chaves do usuário {identificador_usuario}")
+                # SCAN incremental + UNLINK (liberação assíncrona no servidor):
+                # não bloqueia o Redis como KEYS/DEL sobre todo o keyspace
+                lote = []
+                total = 0
+                async for chave in self.redis_client.scan_iter(match=padrao, count=TAMANHO_LOTE_SCAN):
+                    lote.append(chave)
+                    if len(lote) >= TAMANHO_LOTE_SCAN:
+                        total += await self.redis_client.unlink(*lote)
+                        lote.clear()
+                if lote:
+                    total += await self.redis_client.unlink(*lote)
+                
+                if total:
+                    self._contadores[_DELETES] += total
+                    logger.info(f"Invalidadas {total} chaves do usuário {identificador_usuario}")
             else:
                 chaves_remover = [
                     k for k in self.cache_local.keys()
@@ -189,7 +407,7 @@ class GerenciadorCache:
                 ]
                 for chave in chaves_remover:
                     del self.cache_local[chave]
-                self.estatisticas['deletes'] += len(chaves_remover)
+                self._contadores[_DELETES] += len(chaves_remover)
                 
         except Exception as e:
             logger.error(f"Erro ao invalidar cache do usuário: {e}")
@@ -199,31 +417,32 @@ class GerenciadorCache:
         if self.redis_client:
             return
         
-        agora = datetime.now()
-        chaves_expiradas = []
-        
-        for chave, dados in self.cache_local.items():
-            if isinstance(dados, dict) and 'expira_em' in dados:
-                if agora > dados['expira_em']:
-                    chaves_expiradas.append(chave)
+        agora = time.monotonic()
+        removidas = 0
         
-        for chave in chaves_expiradas:
-            del self.cache_local[chave]
+        # Só percorre as entradas vencidas; as do heap que não batem com a
+        # expiração atual da chave (regravada ou removida) são descartadas
+        while self._heap_expiracao and self._heap_expiracao[0][0] < agora:
+            expira_em, chave = heapq.heappop(self._heap_expiracao)
+            dados = self.cache_local.get(chave)
+            if dados is not None and dados['expira_em'] == expira_em:
+                del self.cache_local[chave]
+                removidas += 1
         
-        if chaves_expiradas:
-            logger.info(f"Removidas {len(chaves_expiradas)} entradas expiradas do cache local")
+        if removidas:
+            logger.info(f"Removidas {removidas} entradas expiradas do cache local")
     
     async def obter_info_cache(self) -> Dict[str, Any]:
         """Obtém informações detalhadas sobre o cache."""
         info = {
             'tipo_cache': 'redis' if self.redis_client else 'local',
-            'estatisticas': self.estatisticas.copy(),
+            'estatisticas': self.estatisticas,
             'configuracao': self.config.copy()
         }
         
-        total_acessos = self.estatisticas['hits'] + self.estatisticas['misses']
+        total_acessos = self._contadores[_HITS] + self._contadores[_MISSES]
         if total_acessos > 0:
-            info['taxa_acerto'] = (self.estatisticas['hits'] / total_acessos) * 100
+            info['taxa_acerto'] = (self._contadores[_HITS] / total_acessos) * 100
         else:
             info['taxa_acerto'] = 0
         
@@ -254,8 +473,8 @@ class GerenciadorCache:
         if self.redis_client:
             try:
                 dados_bytes = await self.redis_client.get(chave)
-                if dados_bytes:
-                    return pickle.loads(dados_bytes)
+                if dados_bytes and dados_bytes[:1] == VERSAO_FORMATO_CACHE:
+                    return orjson.loads(dados_bytes[1:])
                 return None
             except Exception as e:
                 logger.error(f"Erro ao obter do Redis: {e}")
@@ -264,9 +483,10 @@ class GerenciadorCache:
             dados = self.cache_local.get(chave)
             if dados and isinstance(dados, dict):
                 # Verifica expiração
-                if 'expira_em' in dados and datetime.now() > dados['expira_em']:
+                if 'expira_em' in dados and time.monotonic() > dados['expira_em']:
                     del self.cache_local[chave]
                     return None
+                self.cache_local.move_to_end(chave)
                 return dados.get('valor')
             return dados
     
@@ -274,7 +494,7 @@ class GerenciadorCache:
         """Salva valor no cache (Redis ou local)."""
         if self.redis_client:
             try:
-                dados_bytes = pickle.dumps(valor)
+                dados_bytes = VERSAO_FORMATO_CACHE + orjson.dumps(valor, option=OPCOES_ORJSON)
                 await self.redis_client.setex(chave, ttl, dados_bytes)
             except Exception as e:
                 logger.error(f"Erro ao salvar no Redis: {e}")
@@ -284,16 +504,24 @@ class GerenciadorCache:
             await self._salvar_cache_local(chave, valor, ttl)
     
     async def _salvar_cache_local(self, chave: str, valor: Any, ttl: int):
-        """Salva valor no cache local."""
-        if len(self.cache_local) >= self.config['max_cache_local']:
-            chave_mais_antiga = next(iter(self.cache_local))
-            del self.cache_local[chave_mais_antiga]
+        """Salva valor no cache local (removendo a entrada menos usada se cheio)."""
+        if chave not in self.cache_local and len(self.cache_local) >= self.config['max_cache_local']:
+            self.cache_local.popitem(last=False)
         
-        expira_em = datetime.now() + timedelta(seconds=ttl)
+        expira_em = time.monotonic() + ttl
         self.cache_local[chave] = {
             'valor': valor,
             'expira_em': expira_em
         }
+        self.cache_local.move_to_end(chave)
+        heapq.heappush(self._heap_expiracao, (expira_em, chave))
+        
+        # Reconstrói o heap quando as entradas obsoletas passam a dominar
+        if len(self._heap_expiracao) > 2 * self.config['max_cache_local']:
+            self._heap_expiracao = [
+                (dados['expira_em'], k) for k, dados in self.cache_local.items()
+            ]
+            heapq.heapify(self._heap_expiracao)
     
     async def fechar_conexoes(self):
         """Fecha conexões do cache."""
@@ -306,6 +534,7 @@ class GerenciadorCache:
         
         # Limpa cache local
         self.cache_local.clear()
+        self._heap_expiracao.clear()
 
 gerenciador_cache = GerenciadorCache()
 
@@ -4,41 +4,189 @@ Crew AI, permitindo workflows complexos e colaboração entre agentes.
 """
 
 import asyncio
+import hashlib
+import heapq
 import logging
-from typing import Dict, List, Any, Optional
+import os
+import sys
+import time
+from collections import Counter, OrderedDict
+from operator import attrgetter
+from pathlib import Path
+from types import MappingProxyType
+from typing import Collection, Dict, Iterable, List, Any, Optional, Tuple
 from datetime import datetime
+from functools import lru_cache
+from itertools import chain, islice
+from weakref import WeakKeyDictionary
 
 from servicos.orquestrador_crew import OrquestradorCrewAI
 from servicos.analisador_codigo import AnalisadorCodigo
-from modelos.schemas import SolicitacaoAnalise, RespostaAnalise, Sugestao, TipoSugestao
+from modelos.schemas import SolicitacaoAnalise, RespostaAnalise, Sugestao, TipoSugestao, NIVEL_VALUES
 
 logger = logging.getLogger(__name__)
 
+# Prioridade numérica de cada severidade informada pelos agentes
+_PRIORIDADE_POR_SEVERIDADE = {
+    'baixa': 3,
+    'media': 6,
+    'alta': 9,
+    'critica': 10
+}
+
+# Nome de exibição de cada tipo de sugestão no resumo (somente leitura)
+_NOME_TIPO_SUGESTAO = MappingProxyType({
+    'performance': 'performance',
+    'legibilidade': 'legibilidade',
+    'boas_praticas': 'boas práticas',
+    'seguranca': 'segurança',
+    'manutencao': 'manutenção'
+})
+
+# Conversão do resultado de cada tarefa do workflow em sugestões:
+# tarefa_id -> (tipo, campo com os itens, formato do título, severidade fixa).
+# Sem severidade fixa, impacto e prioridade vêm da severidade de cada item
+_CONVERSORES_TAREFA = {
+    'analise_performance': (
+        TipoSugestao.PERFORMANCE, 'problemas_encontrados', 'Otimização de {tipo}', None
+    ),
+    'revisao_boas_praticas': (
+        TipoSugestao.BOAS_PRATICAS, 'problemas_encontrados', 'Melhoria em {tipo}', None
+    ),
+    'auditoria_seguranca': (
+        TipoSugestao.SEGURANCA, 'vulnerabilidades_encontradas', 'Vulnerabilidade: {tipo}', 'alta'
+    )
+}
+
+# Registros de workflows mantidos; os mais antigos já encerrados são descartados
+MAXIMO_WORKFLOWS_REGISTRADOS = 1024
+STATUS_TERMINAIS = frozenset(('concluido', 'erro', 'cancelado'))
+
+# Respostas memorizadas por conteúdo (código + opções da análise)
+TAMANHO_CACHE_RESULTADOS = 128
+
+# Cópia em disco das respostas memorizadas (sobrevive a reinícios), opcional:
+# ativada por CREW_CACHE_DISCO ou pelo argumento diretorio_cache. O orçamento
+# em bytes é verificado a cada GRAVACOES_ENTRE_PODAS gravações
+DIRETORIO_CACHE_DISCO = (
+    Path(os.environ["CREW_CACHE_DISCO"]).expanduser()
+    if os.getenv("CREW_CACHE_DISCO") else None
+)
+ORCAMENTO_CACHE_DISCO = 64 * 1024 * 1024
+GRAVACOES_ENTRE_PODAS = 64
+
+# Versão das respostas memorizadas, incluída na chave: incrementar quando as
+# regras do analisador ou o formato de RespostaAnalise mudarem, para que
+# entradas antigas (inclusive as do disco) deixem de ser encontradas
+VERSAO_CACHE_RESULTADOS = 1
+
+# Análises simultâneas por chamada de analisar_lote
+MAXIMO_ANALISES_CONCORRENTES = min(32, (os.cpu_count() or 1) * 4)
+
+@lru_cache(maxsize=None)
+def _obter_analisador_compartilhado() -> AnalisadorCodigo:
+    """
+    Analisador local único do processo, compartilhado pelos integradores.
+    
+    O AnalisadorCodigo é reentrante (assíncrono, com caches LRU e coalescência
+    de análises idênticas em andamento): uma instância compartilhada evita o
+    custo de construção e aproveita esses caches entre todos os chamadores.
+    """
+    return AnalisadorCodigo()
+
+@lru_cache(maxsize=8)
+def _prioridades_analise(focar_performance: bool, nivel: str) -> Tuple[str, ...]:
+    """Prioridades do workflow; só dependem do foco e do nível da solicitação."""
+    prioridades = []
+    
+    if focar_performance:
+        prioridades.append("performance")
+    
+    prioridades.extend(["boas_praticas", "seguranca"])
+    
+    if nivel == "avancado":
+        prioridades.extend(["complexidade", "manutencao"])
+    
+    return tuple(prioridades)
+
+# Um orquestrador por event loop, compartilhado pelos integradores desse loop
+# e descartado junto com ele
+_ORQUESTRADORES_POR_LOOP: WeakKeyDictionary[asyncio.AbstractEventLoop, OrquestradorCrewAI] = (
+    WeakKeyDictionary()
+)
+
+def _obter_orquestrador() -> OrquestradorCrewAI:
+    """Orquestrador do event loop em execução, criado no primeiro uso."""
+    loop = asyncio.get_running_loop()
+    orquestrador = _ORQUESTRADORES_POR_LOOP.get(loop)
+    if orquestrador is None:
+        orquestrador = _ORQUESTRADORES_POR_LOOP[loop] = OrquestradorCrewAI()
+    return orquestrador
+
 class IntegradorCrewAI:
     """
     Coordena a execução de workflows complexos utilizando múltiplos
     agentes especializados para análise abrangente de código.
     """
     
-    def __init__(self):
-        self.orquestrador = OrquestradorCrewAI()
-        self.analisador_local = AnalisadorCodigo()
-        self.workflows_em_execucao = {}
+    def __init__(
+        self,
+        diretorio_cache: Optional[Path] = DIRETORIO_CACHE_DISCO,
+        max_concorrencia: int = MAXIMO_ANALISES_CONCORRENTES
+    ):
+        self.analisador_local = _obter_analisador_compartilhado()
+        self.workflows_em_execucao: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        # Quantidade de workflows por status, mantida a cada transição
+        self._contagem_status = Counter()
+        self._resultado_cache: OrderedDict[str, RespostaAnalise] = OrderedDict()
+        # None desativa o cache em disco
+        self.diretorio_cache = diretorio_cache
+        self._gravacoes_disco = 0
+        self.max_concorrencia = max_concorrencia
+    
+    @property
+    def orquestrador(self) -> OrquestradorCrewAI:
+        """Orquestrador compartilhado do event loop corrente."""
+        return _obter_orquestrador()
     
     async def analisar_com_crew_ai(
         self,
         solicitacao: SolicitacaoAnalise,
-        usar_workflow_completo: bool = True
+        usar_workflow_completo: bool = True,
+        atraso_hedge: Optional[float] = None
     ) -> RespostaAnalise:
         """    
         Args:
             solicitacao: Dados da solicitação de análise
             usar_workflow_completo: Se deve usar workflow completo ou análise simples
+            atraso_hedge: Segundos de espera pelo workflow antes de iniciar, em
+                paralelo, a análise local; vence a que terminar primeiro.
+                None (padrão) só usa a análise local após erro do workflow
             
         Returns:
             Resposta com análise completa do código
         """
-        inicio_tempo = datetime.now()
+        inicio_tempo = time.perf_counter()
+        
+        chave_cache = self._chave_resultado(solicitacao, usar_workflow_completo)
+        resposta_cache = self._resultado_cache.get(chave_cache)
+        if resposta_cache is not None:
+            self._resultado_cache.move_to_end(chave_cache)
+        elif self.diretorio_cache is not None:
+            resposta_cache = await asyncio.to_thread(self._ler_resultado_disco, chave_cache)
+            if resposta_cache is not None:
+                self._guardar_resultado(chave_cache, resposta_cache, gravar_disco=False)
+        
+        if resposta_cache is not None:
+            return resposta_cache.model_copy(update={
+                'tempo_analise': time.perf_counter() - inicio_tempo,
+                'timestamp': datetime.now()
+            })
+        
+        if usar_workflow_completo and atraso_hedge is not None:
+            return await self._executar_com_hedge(
+                solicitacao, inicio_tempo, atraso_hedge, chave_cache
+            )
         
         try:
             if usar_workflow_completo:
@@ -52,6 +200,7 @@ class IntegradorCrewAI:
             )
             
             logger.info(f"Análise Crew AI concluída em {resposta.tempo_analise:.2f}s")
+            self._guardar_resultado(chave_cache, resposta)
             return resposta
             
         except Exception as e:
@@ -59,6 +208,166 @@ class IntegradorCrewAI:
             # Fallback para análise local em caso de erro
             return await self._executar_fallback_local(solicitacao)
     
+    async def analisar_lote(
+        self,
+        solicitacoes: Iterable[SolicitacaoAnalise],
+        usar_workflow_completo: bool = True,
+        atraso_hedge: Optional[float] = None
+    ) -> List[RespostaAnalise]:
+        """
+        Analisa várias solicitações concorrentemente, com no máximo
+        max_concorrencia análises em andamento ao mesmo tempo.
+        
+        Returns:
+            Respostas na mesma ordem das solicitações
+        """
+        semaforo = asyncio.Semaphore(self.max_concorrencia)
+        
+        async def analisar(solicitacao: SolicitacaoAnalise) -> RespostaAnalise:
+            async with semaforo:
+                return await self.analisar_com_crew_ai(
+                    solicitacao, usar_workflow_completo, atraso_hedge
+                )
+        
+        return list(await asyncio.gather(*map(analisar, solicitacoes)))
+    
+    @staticmethod
+    def _chave_resultado(solicitacao: SolicitacaoAnalise, usar_workflow_completo: bool) -> str:
+        """
+        Chave de memorização: BLAKE2b do código, das opções da análise e da
+        versão do cache.
+        """
+        hash_chave = hashlib.blake2b(solicitacao.codigo.encode('utf-8'), digest_size=16)
+        hash_chave.update(
+            f"\0v{VERSAO_CACHE_RESULTADOS}"
+            f"\0{NIVEL_VALUES[solicitacao.nivel_detalhamento]}"
+            f"\0{int(solicitacao.focar_performance)}"
+            f"\0{int(usar_workflow_completo)}".encode()
+        )
+        return hash_chave.hexdigest()
+    
+    def _guardar_resultado(
+        self,
+        chave: str,
+        resposta: RespostaAnalise,
+        gravar_disco: bool = True
+    ):
+        """Memoriza uma resposta (LRU limitado a TAMANHO_CACHE_RESULTADOS)."""
+        self._resultado_cache[chave] = resposta
+        self._resultado_cache.move_to_end(chave)
+        if len(self._resultado_cache) > TAMANHO_CACHE_RESULTADOS:
+            self._resultado_cache.popitem(last=False)
+        
+        if gravar_disco and self.diretorio_cache is not None:
+            # Contagem feita aqui, no loop; a gravação (e a poda) fica fora do
+            # caminho da resposta e suas falhas só são registradas
+            self._gravacoes_disco += 1
+            podar = self._gravacoes_disco % GRAVACOES_ENTRE_PODAS == 0
+            asyncio.get_running_loop().run_in_executor(
+                None, self._gravar_resultado_disco, chave, resposta, podar
+            )
+    
+    def _ler_resultado_disco(self, chave: str) -> Optional[RespostaAnalise]:
+        """Lê uma resposta do cache em disco (None se ausente ou ilegível)."""
+        try:
+            return RespostaAnalise.model_validate_json(
+                (self.diretorio_cache / f"{chave}.json").read_bytes()
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache em disco ilegível para {chave}: {e}")
+            return None
+    
+    def _gravar_resultado_disco(self, chave: str, resposta: RespostaAnalise, podar: bool = False):
+        """Grava uma resposta no cache em disco (escrita atômica via os.replace)."""
+        try:
+            self.diretorio_cache.mkdir(parents=True, exist_ok=True)
+            destino = self.diretorio_cache / f"{chave}.json"
+            temporario = destino.with_suffix(f".{os.getpid()}.tmp")
+            temporario.write_text(resposta.model_dump_json(), encoding='utf-8')
+            os.replace(temporario, destino)
+            
+            if podar:
+                self._podar_cache_disco()
+        except OSError as e:
+            logger.warning(f"Falha ao gravar cache em disco: {e}")
+    
+    def _podar_cache_disco(self):
+        """Remove as respostas mais antigas quando o orçamento em bytes estoura."""
+        arquivos = [
+            (info.st_mtime, info.st_size, caminho)
+            for caminho in self.diretorio_cache.glob("*.json")
+            for info in (caminho.stat(),)
+        ]
+        excesso = sum(tamanho for _, tamanho, _ in arquivos) - ORCAMENTO_CACHE_DISCO
+        for _, tamanho, caminho in sorted(arquivos):
+            if excesso <= 0:
+                break
+            caminho.unlink(missing_ok=True)
+            excesso -= tamanho
+    
+    async def _executar_workflow_convertido(
+        self,
+        solicitacao: SolicitacaoAnalise,
+        inicio_tempo: float
+    ) -> RespostaAnalise:
+        """Executa o workflow completo e o converte para a resposta da API."""
+        resultado = await self._executar_workflow_completo(solicitacao)
+        resposta = await self._converter_resultado_para_resposta(
+            resultado, solicitacao, inicio_tempo
+        )
+        logger.info(f"Análise Crew AI concluída em {resposta.tempo_analise:.2f}s")
+        return resposta
+    
+    async def _executar_com_hedge(
+        self,
+        solicitacao: SolicitacaoAnalise,
+        inicio_tempo: float,
+        atraso_hedge: float,
+        chave_cache: str
+    ) -> RespostaAnalise:
+        """
+        Execução especulativa: se o workflow não responder em atraso_hedge
+        segundos, a análise local começa em paralelo e a primeira resposta
+        válida é devolvida (a outra execução é cancelada). Só a resposta do
+        workflow é memorizada.
+        """
+        tarefa_crew = asyncio.create_task(
+            self._executar_workflow_convertido(solicitacao, inicio_tempo)
+        )
+        tarefa_local = None
+        
+        try:
+            await asyncio.wait({tarefa_crew}, timeout=atraso_hedge)
+            if tarefa_crew.done():
+                if tarefa_crew.exception() is None:
+                    self._guardar_resultado(chave_cache, tarefa_crew.result())
+                    return tarefa_crew.result()
+                logger.error(f"Erro na análise Crew AI: {tarefa_crew.exception()}")
+                return await self._executar_fallback_local(solicitacao)
+            
+            tarefa_local = asyncio.create_task(self._executar_fallback_local(solicitacao))
+            pendentes = {tarefa_crew, tarefa_local}
+            while pendentes:
+                concluidas, pendentes = await asyncio.wait(
+                    pendentes, return_when=asyncio.FIRST_COMPLETED
+                )
+                # Com as duas prontas ao mesmo tempo, prefere o workflow
+                for tarefa in (tarefa_crew, tarefa_local):
+                    if tarefa in concluidas and tarefa.exception() is None:
+                        if tarefa is tarefa_crew:
+                            self._guardar_resultado(chave_cache, tarefa.result())
+                        return tarefa.result()
+            
+            logger.error(f"Erro na análise Crew AI: {tarefa_crew.exception()}")
+            return tarefa_local.result()
+            
+        finally:
+            for tarefa in (tarefa_crew, tarefa_local):
+                if tarefa is not None and not tarefa.done():
+                    tarefa.cancel()
+    
     async def _executar_workflow_completo(
         self,
         solicitacao: SolicitacaoAnalise
@@ -73,24 +382,77 @@ class IntegradorCrewAI:
             nome_arquivo=solicitacao.nome_arquivo,
             prioridades=prioridades
         )
+        # Só o necessário para o status: o código não fica retido no registro
+        # (o orquestrador também o libera quando o workflow termina)
         self.workflows_em_execucao[workflow_id] = {
-            'solicitacao': solicitacao,
-            'inicio': datetime.now(),
-            'status': 'executando'
+            'nome_arquivo': solicitacao.nome_arquivo,
+            'inicio': datetime.now()
         }
+        self._definir_status(workflow_id, 'executando')
+        
+        # Tarefa própria, registrada para que cancelar_workflow interrompa a
+        # execução de fato (e não só o status)
+        tarefa = asyncio.create_task(self.orquestrador.executar_workflow(workflow_id))
+        self.workflows_em_execucao[workflow_id]['tarefa'] = tarefa
         
         try:
-            resultado = await self.orquestrador.executar_workflow(workflow_id)
+            resultado = await tarefa
 
-            self.workflows_em_execucao[workflow_id]['status'] = 'concluido'
-            self.workflows_em_execucao[workflow_id]['resultado'] = resultado
+            self._definir_status(workflow_id, 'concluido')
             
             return resultado
             
+        except asyncio.CancelledError:
+            self._definir_status(workflow_id, 'cancelado')
+            if asyncio.current_task().cancelling():
+                raise
+            # Cancelado por cancelar_workflow: quem aguardava segue para o fallback
+            raise RuntimeError(f"Workflow {workflow_id} cancelado") from None
+            
         except Exception as e:
-            self.workflows_em_execucao[workflow_id]['status'] = 'erro'
-            self.workflows_em_execucao[workflow_id]['erro'] = str(e)
+            if workflow_id in self.workflows_em_execucao:
+                self.workflows_em_execucao[workflow_id]['erro'] = str(e)
+            self._definir_status(workflow_id, 'erro')
             raise
+        
+        finally:
+            dados_workflow = self.workflows_em_execucao.get(workflow_id)
+            if dados_workflow is not None and dados_workflow.get('tarefa') is tarefa:
+                del dados_workflow['tarefa']
+    
+    def _definir_status(self, workflow_id: str, status: str):
+        """Atualiza o status de um workflow e a contagem por status."""
+        dados_workflow = self.workflows_em_execucao.get(workflow_id)
+        if dados_workflow is None:
+            # Registro já descartado (p.ex. cancelado e removido pelo limite)
+            return
+        anterior = dados_workflow.get('status')
+        if anterior is not None:
+            self._contagem_status[anterior] -= 1
+        dados_workflow['status'] = status
+        self._contagem_status[status] += 1
+        
+        if status in STATUS_TERMINAIS:
+            self._descartar_workflows_antigos()
+    
+    def _descartar_workflows_antigos(self):
+        """Descarta os registros encerrados mais antigos acima do limite."""
+        excesso = len(self.workflows_em_execucao) - MAXIMO_WORKFLOWS_REGISTRADOS
+        if excesso <= 0:
+            return
+        
+        # Workflows ainda em execução nunca são descartados
+        descartaveis = list(islice(
+            (
+                wf_id for wf_id, dados in self.workflows_em_execucao.items()
+                if dados['status'] in STATUS_TERMINAIS
+            ),
+            excesso
+        ))
+        orquestrador = self.orquestrador
+        for wf_id in descartaveis:
+            self._contagem_status[self.workflows_em_execucao.pop(wf_id)['status']] -= 1
+            orquestrador.descartar_workflow(wf_id)
     
     async def _executar_analise_simples(
         self,
@@ -98,44 +460,36 @@ class IntegradorCrewAI:
     ) -> Dict[str, Any]:
         """Executa análise simples usando apenas o agente local."""
         
-        sugestoes = await self.analisador_local.analisar_codigo(
+        sugestoes, pontuacao = await self.analisador_local.analisar_com_pontuacao(
             codigo=solicitacao.codigo,
             nivel_detalhamento=solicitacao.nivel_detalhamento,
-            focar_performance=solicitacao.focar_performance
+            focar_performance=solicitacao.focar_performance,
+            arvore_ast=solicitacao.arvore_ast
         )
         
         return {
             'tipo_execucao': 'analise_simples',
             'sugestoes': sugestoes,
-            'pontuacao_qualidade': self.analisador_local.calcular_pontuacao_qualidade(
-                solicitacao.codigo
-            ),
+            'pontuacao_qualidade': pontuacao,
             'agente_executor': 'analisador_local'
         }
     
-    def _determinar_prioridades(self, solicitacao: SolicitacaoAnalise) -> List[str]:
+    def _determinar_prioridades(self, solicitacao: SolicitacaoAnalise) -> Tuple[str, ...]:
         """Determina prioridades de análise baseadas na solicitação."""
-        prioridades = []
-        
-        if solicitacao.focar_performance:
-            prioridades.append("performance")
-        
-        prioridades.extend(["boas_praticas", "seguranca"])
-        
-        if solicitacao.nivel_detalhamento.value == "avancado":
-            prioridades.extend(["complexidade", "manutencao"])
-        
-        return prioridades
+        return _prioridades_analise(
+            solicitacao.focar_performance,
+            NIVEL_VALUES[solicitacao.nivel_detalhamento]
+        )
     
     async def _converter_resultado_para_resposta(
         self,
         resultado: Dict[str, Any],
         solicitacao: SolicitacaoAnalise,
-        inicio_tempo: datetime
+        inicio_tempo: float
     ) -> RespostaAnalise:
         """Converte resultado do Crew AI para formato da API."""
         
-        tempo_analise = (datetime.now() - inicio_tempo).total_seconds()
+        tempo_analise = time.perf_counter() - inicio_tempo
         
         if resultado.get('tipo_execucao') == 'analise_simples':
             sugestoes = resultado['sugestoes']
@@ -161,81 +515,88 @@ class IntegradorCrewAI:
         resultado_workflow: Dict[str, Any]
     ) -> List[Sugestao]:
         """Extrai e converte sugestões do resultado do workflow."""
-        sugestoes = []
-        
         resultados_tarefas = resultado_workflow.get('resultados_por_tarefa', {})
         
-        for tarefa_id, resultado_tarefa in resultados_tarefas.items():
-            sugestoes_tarefa = self._converter_resultado_tarefa_para_sugestoes(
-                tarefa_id, resultado_tarefa
-            )
-            sugestoes.extend(sugestoes_tarefa)
-        
-        # Remove duplicatas e ordena por prioridade
-        sugestoes_unicas = self._remover_sugestoes_duplicadas(sugestoes)
-        return sorted(sugestoes_unicas, key=lambda x: x.prioridade, reverse=True)
+        # Converte cada tarefa numa corrotina própria: conversões que façam
+        # I/O (enriquecimento, consultas) se sobrepõem em vez de serializar
+        async with asyncio.TaskGroup() as grupo:
+            conversoes = [
+                grupo.create_task(
+                    self._converter_resultado_tarefa_para_sugestoes(tarefa_id, resultado_tarefa)
+                )
+                for tarefa_id, resultado_tarefa in resultados_tarefas.items()
+            ]
+        
+        # As sugestões de cada tarefa seguem direto para a deduplicação, sem
+        # lista intermediária; nlargest ordena por prioridade (equivale a
+        # sorted(..., reverse=True), estável para prioridades iguais)
+        sugestoes_unicas = self._remover_sugestoes_duplicadas(
+            chain.from_iterable(conversao.result() for conversao in conversoes)
+        )
+        return heapq.nlargest(
+            len(sugestoes_unicas), sugestoes_unicas, key=attrgetter('prioridade')
+        )
     
-    def _converter_resultado_tarefa_para_sugestoes(
+    async def _converter_resultado_tarefa_para_sugestoes(
         self,
         tarefa_id: str,
         resultado_tarefa: Dict[str, Any]
     ) -> List[Sugestao]:
         """Converte resultado de uma tarefa específica em sugestões."""
+        conversor = _CONVERSORES_TAREFA.get(tarefa_id)
+        if conversor is None:
+            return []
+        
+        tipo, campo, formato_titulo, severidade_fixa = conversor
         sugestoes = []
         
-        if tarefa_id == "analise_performance":
-            for problema in resultado_tarefa.get('problemas_encontrados', []):
-                sugestoes.append(Sugestao(
-                    tipo=TipoSugestao.PERFORMANCE,
-                    titulo=f"Otimização de {problema['tipo']}",
-                    descricao=problema['descricao'],
-                    impacto=problema['severidade'],
-                    prioridade=self._mapear_severidade_para_prioridade(problema['severidade'])
-                ))
-        
-        elif tarefa_id == "revisao_boas_praticas":
-            for problema in resultado_tarefa.get('problemas_encontrados', []):
-                sugestoes.append(Sugestao(
-                    tipo=TipoSugestao.BOAS_PRATICAS,
-                    titulo=f"Melhoria em {problema['tipo']}",
-                    descricao=problema['descricao'],
-                    impacto=problema['severidade'],
-                    prioridade=self._mapear_severidade_para_prioridade(problema['severidade'])
-                ))
-        
-        elif tarefa_id == "auditoria_seguranca":
-            for vuln in resultado_tarefa.get('vulnerabilidades_encontradas', []):
-                sugestoes.append(Sugestao(
-                    tipo=TipoSugestao.SEGURANCA,
-                    titulo=f"Vulnerabilidade: {vuln.get('tipo', 'Desconhecida')}",
-                    descricao=vuln.get('descricao', 'Vulnerabilidade de segurança identificada'),
-                    impacto="alto",
-                    prioridade=9
-                ))
+        for item in resultado_tarefa.get(campo, []):
+            if severidade_fixa is None:
+                titulo = formato_titulo.format(tipo=item['tipo'])
+                descricao = item['descricao']
+                impacto = item['severidade']
+                prioridade = self._mapear_severidade_para_prioridade(impacto)
+            else:
+                # Vulnerabilidades podem vir incompletas e têm impacto fixo
+                titulo = formato_titulo.format(tipo=item.get('tipo', 'Desconhecida'))
+                descricao = item.get('descricao', 'Vulnerabilidade de segurança identificada')
+                impacto = "alto"
+                prioridade = self._mapear_severidade_para_prioridade(severidade_fixa)
+            
+            sugestoes.append(Sugestao(
+                tipo=tipo,
+                titulo=titulo,
+                descricao=descricao,
+                impacto=impacto,
+                prioridade=prioridade
+            ))
         
         return sugestoes
     
     def _mapear_severidade_para_prioridade(self, severidade: str) -> int:
         """Mapeia severidade para prioridade numérica."""
-        mapeamento = {
-            'baixa': 3,
-            'media': 6,
-            'alta': 9,
-            'critica': 10
-        }
-        return mapeamento.get(severidade.lower(), 5)
+        # Severidades já chegam em minúsculas; lower() só na falta
+        return (
+            _PRIORIDADE_POR_SEVERIDADE.get(severidade)
+            or _PRIORIDADE_POR_SEVERIDADE.get(severidade.lower(), 5)
+        )
     
-    def _remover_sugestoes_duplicadas(self, sugestoes: List[Sugestao]) -> List[Sugestao]:
-        """Remove sugestões duplicadas baseadas no título."""
-        sugestoes_unicas = []
-        titulos_vistos = set()
+    def _remover_sugestoes_duplicadas(self, sugestoes: Iterable[Sugestao]) -> Collection[Sugestao]:
+        """
+        Remove sugestões duplicadas baseadas no título, mantendo a de maior
+        prioridade (na posição da primeira ocorrência).
+        """
+        melhores = {}
         
         for sugestao in sugestoes:
-            if sugestao.titulo not in titulos_vistos:
-                sugestoes_unicas.append(sugestao)
-                titulos_vistos.add(sugestao.titulo)
-        
-        return sugestoes_unicas
+            # Títulos se repetem entre tarefas: internados, as chaves iguais
+            # são o mesmo objeto e a comparação no dict para na identidade
+            titulo = sys.intern(sugestao.titulo)
+            anterior = melhores.get(titulo)
+            if anterior is None or sugestao.prioridade > anterior.prioridade:
+                melhores[titulo] = sugestao
+        
+        return melhores.values()
     
     def _calcular_pontuacao_do_workflow(self, resultado_workflow: Dict[str, Any]) -> float:
         """Calcula pontuação de qualidade baseada no resultado do workflow."""
@@ -264,44 +625,28 @@ class IntegradorCrewAI:
         if not sugestoes:
             return "Nenhuma melhoria específica identificada. Código em boa qualidade."
         
-        tipos_count = {}
-        for sugestao in sugestoes:
-            tipo = sugestao.tipo.value
-            tipos_count[tipo] = tipos_count.get(tipo, 0) + 1
-        
-        principais_tipos = sorted(
-            tipos_count.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:3]
-        
-        resumo_partes = []
+        # most_common mantém a ordem de aparição entre contagens iguais
+        principais_tipos = Counter(map(attrgetter('tipo'), sugestoes)).most_common(3)
         
-        if principais_tipos:
-            resumo_partes.append(f"Identificadas {len(sugestoes)} oportunidades de melhoria.")
-            
-            areas_principais = []
-            for tipo, count in principais_tipos:
-                tipo_nome = {
-                    'performance': 'performance',
-                    'legibilidade': 'legibilidade',
-                    'boas_praticas': 'boas práticas',
-                    'seguranca': 'segurança',
-                    'manutencao': 'manutenção'
-                }.get(tipo, tipo)
-                
-                areas_principais.append(f"{tipo_nome} ({count} sugestões)")
-            
-            resumo_partes.append(f"Principais áreas: {', '.join(areas_principais)}.")
+        # Com sugestões há sempre ao menos um tipo: as partes vão direto para
+        # o texto, sem listas intermediárias
+        areas_principais = ", ".join(
+            f"{_NOME_TIPO_SUGESTAO.get(tipo, tipo)} ({count} sugestões)"
+            for tipo, count in principais_tipos
+        )
+        resumo = (
+            f"Identificadas {len(sugestoes)} oportunidades de melhoria. "
+            f"Principais áreas: {areas_principais}."
+        )
         
-        sugestoes_alta_prioridade = [s for s in sugestoes if s.prioridade >= 8]
-        if sugestoes_alta_prioridade:
-            resumo_partes.append(
-                f"Recomenda-se priorizar {len(sugestoes_alta_prioridade)} "
+        total_alta_prioridade = sum(1 for s in sugestoes if s.prioridade >= 8)
+        if total_alta_prioridade:
+            resumo += (
+                f" Recomenda-se priorizar {total_alta_prioridade} "
                 f"sugestões de alta prioridade."
             )
         
-        return " ".join(resumo_partes)
+        return resumo
     
     async def _executar_fallback_local(
         self,
@@ -310,51 +655,51 @@ class IntegradorCrewAI:
         """Executa análise local como fallback em caso de erro no Crew AI."""
         logger.warning("Executando fallback para análise local")
         
-        inicio_tempo = datetime.now()
+        inicio_tempo = time.perf_counter()
         
-        sugestoes = await self.analisador_local.analisar_codigo(
+        sugestoes, pontuacao = await self.analisador_local.analisar_com_pontuacao(
             codigo=solicitacao.codigo,
             nivel_detalhamento=solicitacao.nivel_detalhamento,
-            focar_performance=solicitacao.focar_performance
+            focar_performance=solicitacao.focar_performance,
+            arvore_ast=solicitacao.arvore_ast
         )
         
-        tempo_analise = (datetime.now() - inicio_tempo).total_seconds()
+        tempo_analise = time.perf_counter() - inicio_tempo
         
         return RespostaAnalise(
             codigo_original=solicitacao.codigo,
             sugestoes=sugestoes,
-            pontuacao_qualidade=self.analisador_local.calcular_pontuacao_qualidade(
-                solicitacao.codigo
-            ),
+            pontuacao_qualidade=pontuacao,
             tempo_analise=tempo_analise,
             timestamp=datetime.now(),
             resumo_melhorias="Análise realizada com agente local (modo fallback)."
         )
     
-    def obter_status_workflows(self) -> Dict[str, Any]:
-        """Obtém status de todos os workflows em execução."""
-        return {
-            'workflows_ativos': len([
-                w for w in self.workflows_em_execucao.values()
-                if w['status'] == 'executando'
-            ]),
-            'workflows_concluidos': len([
-                w for w in self.workflows_em_execucao.values()
-                if w['status'] == 'concluido'
-            ]),
-            'workflows_com_erro': len([
-                w for w in self.workflows_em_execucao.values()
-                if w['status'] == 'erro'
-            ]),
-            'detalhes': {
+    def obter_status_workflows(self, incluir_detalhes: bool = True) -> Dict[str, Any]:
+        """
+        Obtém status de todos os workflows em execução.
+        
+        Args:
+            incluir_detalhes: Se deve listar cada workflow (percorre todos);
+                sem detalhes, a consulta só lê as contagens por status
+        """
+        status = {
+            'workflows_ativos': self._contagem_status['executando'],
+            'workflows_concluidos': self._contagem_status['concluido'],
+            'workflows_com_erro': self._contagem_status['erro']
+        }
+        
+        if incluir_detalhes:
+            status['detalhes'] = {
                 wf_id: {
                     'status': wf_data['status'],
                     'inicio': wf_data['inicio'].isoformat(),
-                    'nome_arquivo': wf_data['solicitacao'].nome_arquivo
+                    'nome_arquivo': wf_data['nome_arquivo']
                 }
                 for wf_id, wf_data in self.workflows_em_execucao.items()
             }
-        }
+        
+        return status
     
     async def cancelar_workflow(self, workflow_id: str) -> bool:
         """
@@ -366,10 +711,17 @@ class IntegradorCrewAI:
         Returns:
             True se cancelado com sucesso, False caso contrário
         """
-        if workflow_id in self.workflows_em_execucao:
-            self.workflows_em_execucao[workflow_id]['status'] = 'cancelado'
-            logger.info(f"Workflow {workflow_id} cancelado")
-            return True
-        
-        return False
+        dados_workflow = self.workflows_em_execucao.get(workflow_id)
+        if dados_workflow is None:
+            return False
+        
+        tarefa = dados_workflow.get('tarefa')
+        if tarefa is not None and not tarefa.done():
+            tarefa.cancel()
+            # Só responde depois que a execução realmente parou
+            await asyncio.gather(tarefa, return_exceptions=True)
+        
+        self._definir_status(workflow_id, 'cancelado')
+        logger.info(f"Workflow {workflow_id} cancelado")
+        return True
 
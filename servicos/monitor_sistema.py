@@ -4,17 +4,24 @@ incluindo métricas de performance, saúde dos serviços e alertas.
 """
 
 import asyncio
+import bisect
 import logging
+import os
 import psutil
+import sys
 import time
-from typing import Dict, List, Any, Optional
+from collections import deque
+from typing import Dict, List, Any, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from operator import attrgetter
 import json
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# slots: sem __dict__ em cada ponto do histórico
+@dataclass(slots=True)
 class MetricasSistema:
     """Métricas do sistema em um momento específico."""
     timestamp: datetime
@@ -25,8 +32,11 @@ class MetricasSistema:
     disco_disponivel_gb: float
     processos_ativos: int
     conexoes_rede: int
+    # Só em pontos consolidados do histórico: extremos de cada campo no período
+    minimos: Optional[Dict[str, float]] = None
+    maximos: Optional[Dict[str, float]] = None
 
-@dataclass
+@dataclass(slots=True)
 class MetricasAplicacao:
     """Métricas específicas da aplicação."""
     timestamp: datetime
@@ -37,6 +47,9 @@ class MetricasAplicacao:
     workflows_ativos: int
     erros_por_minuto: float
     memoria_aplicacao_mb: float
+    # Só em pontos consolidados do histórico: extremos de cada campo no período
+    minimos: Optional[Dict[str, float]] = None
+    maximos: Optional[Dict[str, float]] = None
 
 @dataclass
 class AlertaMonitoramento:
@@ -50,6 +63,207 @@ class AlertaMonitoramento:
     resolvido: bool = False
     dados_contexto: Optional[Dict[str, Any]] = None
 
+# No Linux, processos e sockets são contados direto no /proc: evita montar a
+# lista de PIDs e, principalmente, o net_connections(), que percorre os
+# descritores de todos os processos para montar um objeto por conexão
+_PROC_DISPONIVEL = sys.platform.startswith('linux') and os.path.isdir('/proc/net')
+_TABELAS_SOCKETS = ('/proc/net/tcp', '/proc/net/tcp6', '/proc/net/udp', '/proc/net/udp6')
+
+def _contar_processos() -> int:
+    """Quantidade de processos em execução."""
+    if _PROC_DISPONIVEL:
+        try:
+            return sum(1 for nome in os.listdir('/proc') if nome.isdigit())
+        except OSError:
+            pass
+    return len(psutil.pids())
+
+def _contar_conexoes() -> int:
+    """Quantidade de sockets TCP/UDP (IPv4 e IPv6), como net_connections('inet')."""
+    if _PROC_DISPONIVEL:
+        total = 0
+        try:
+            for caminho in _TABELAS_SOCKETS:
+                if os.path.exists(caminho):
+                    with open(caminho) as tabela:
+                        # A primeira linha de cada tabela é o cabeçalho
+                        total += sum(1 for _ in tabela) - 1
+            return total
+        except OSError:
+            pass
+    return len(psutil.net_connections())
+
+# Regras de alerta por métrica: (campo, campos do contexto, dispara abaixo do
+# limite, níveis). Os níveis vão do mais severo ao menos severo, cada um como
+# (tipo, severidade, chave do limite, título, descrição); a métrica fora de
+# todos os níveis resolve os alertas de todos eles
+REGRAS_ALERTA_SISTEMA = (
+    ('cpu_percent', ('cpu_percent',), False, (
+        ('cpu_critico', 'critica', 'cpu_critico', 'CPU em uso crítico',
+         'Uso de CPU em {valor:.1f}% (crítico: ≥{limite}%)'),
+        ('cpu_alto', 'alta', 'cpu_alto', 'CPU em uso elevado',
+         'Uso de CPU em {valor:.1f}% (alto: ≥{limite}%)'),
+    )),
+    ('memoria_percent', ('memoria_percent', 'memoria_disponivel_mb'), False, (
+        ('memoria_critica', 'critica', 'memoria_critica', 'Memória em uso crítico',
+         'Uso de memória em {valor:.1f}% (crítico: ≥{limite}%)'),
+        ('memoria_alta', 'alta', 'memoria_alta', 'Memória em uso elevado',
+         'Uso de memória em {valor:.1f}% (alto: ≥{limite}%)'),
+    )),
+    ('disco_percent', ('disco_percent', 'disco_disponivel_gb'), False, (
+        ('disco_critico', 'critica', 'disco_critico', 'Disco em uso crítico',
+         'Uso de disco em {valor:.1f}% (crítico: ≥{limite}%)'),
+        ('disco_alto', 'alta', 'disco_alto', 'Disco em uso elevado',
+         'Uso de disco em {valor:.1f}% (alto: ≥{limite}%)'),
+    )),
+)
+
+REGRAS_ALERTA_APLICACAO = (
+    ('tempo_medio_analise', ('tempo_medio_analise',), False, (
+        ('performance_lenta', 'media', 'tempo_analise_lento', 'Performance de análise degradada',
+         'Tempo médio de análise em {valor:.2f}s (limite: {limite}s)'),
+    )),
+    ('cache_hit_rate', ('cache_hit_rate',), True, (
+        ('cache_hit_baixo', 'media', 'cache_hit_rate_baixo', 'Taxa de acerto do cache baixa',
+         'Taxa de acerto do cache em {valor:.1f}% (mínimo: {limite}%)'),
+    )),
+    ('erros_por_minuto', ('erros_por_minuto',), False, (
+        ('erros_elevados', 'alta', 'erros_por_minuto_alto', 'Taxa de erros elevada',
+         'Erros por minuto: {valor:.1f} (limite: {limite})'),
+    )),
+)
+
+# Campos que são contagens do período: somados (e não promediados) ao consolidar
+CAMPOS_ACUMULADOS = frozenset(('total_analises',))
+
+@lru_cache(maxsize=None)
+def _leitor_campos(classe: type) -> Tuple[Tuple[str, ...], attrgetter]:
+    """Nomes dos campos de uma dataclass e um leitor que devolve seus valores."""
+    nomes = tuple(campo.name for campo in fields(classe))
+    return nomes, attrgetter(*nomes)
+
+def _como_dict(registro: Any) -> Dict[str, Any]:
+    """
+    Equivalente raso de dataclasses.asdict para métricas e alertas: os campos
+    já são valores simples (ou dicionários nunca alterados depois de criados),
+    então a cópia recursiva do asdict é dispensável.
+    """
+    nomes, ler = _leitor_campos(type(registro))
+    return dict(zip(nomes, ler(registro)))
+
+@lru_cache(maxsize=None)
+def _campos_numericos(classe: type) -> Tuple[str, ...]:
+    """Campos de métrica (numéricos) de uma classe de métricas."""
+    return tuple(
+        campo.name for campo in fields(classe)
+        if campo.name not in ('timestamp', 'minimos', 'maximos')
+    )
+
+def _consolidar_metricas(pontos: Sequence[Any]) -> Any:
+    """
+    Consolida pontos consecutivos num único ponto com o timestamp do último:
+    média de cada campo (soma nos acumulados), guardando também mínimo e
+    máximo para que a consolidação não esconda picos.
+    """
+    ultimo = pontos[-1]
+    valores = {}
+    minimos = {}
+    maximos = {}
+    
+    for campo in _campos_numericos(type(ultimo)):
+        serie = [getattr(ponto, campo) for ponto in pontos]
+        total = sum(serie)
+        if campo in CAMPOS_ACUMULADOS:
+            valores[campo] = total
+        elif isinstance(serie[-1], int):
+            valores[campo] = round(total / len(serie))
+        else:
+            valores[campo] = total / len(serie)
+        
+        minimos[campo] = min(
+            ponto.minimos[campo] if ponto.minimos else valor
+            for ponto, valor in zip(pontos, serie)
+        )
+        maximos[campo] = max(
+            ponto.maximos[campo] if ponto.maximos else valor
+            for ponto, valor in zip(pontos, serie)
+        )
+    
+    return type(ultimo)(
+        timestamp=ultimo.timestamp, minimos=minimos, maximos=maximos, **valores
+    )
+
+class HistoricoMetricas:
+    """
+    Histórico de métricas em camadas de resolução decrescente.
+    
+    A primeira camada guarda cada coleta; a cada `fator` pontos novos numa
+    camada, esses pontos são consolidados num único ponto da camada seguinte.
+    Com coletas por minuto e as camadas padrão, a última hora fica minuto a
+    minuto, até 6 horas em médias de 5 minutos e até 24 horas em médias de
+    30 minutos.
+    """
+    
+    def __init__(self, camadas: Sequence[Tuple[int, int]]):
+        """
+        Args:
+            camadas: (fator, capacidade) de cada camada, da mais fina para a
+                mais grossa; o fator da primeira camada é ignorado
+        """
+        self._camadas = [deque(maxlen=capacidade) for _, capacidade in camadas]
+        self._fatores = [fator for fator, _ in camadas[1:]]
+        # Pontos recebidos por cada camada desde a última consolidação
+        self._pendentes = [0] * len(self._fatores)
+    
+    def __len__(self) -> int:
+        return sum(map(len, self._camadas))
+    
+    @property
+    def ultima(self) -> Any:
+        """Ponto mais recente (IndexError se o histórico estiver vazio)."""
+        return self._camadas[0][-1]
+    
+    def append(self, metrica: Any):
+        """Registra uma coleta, propagando consolidações para as camadas seguintes."""
+        self._camadas[0].append(metrica)
+        
+        for nivel, fator in enumerate(self._fatores):
+            self._pendentes[nivel] += 1
+            if self._pendentes[nivel] < fator:
+                break
+            self._pendentes[nivel] = 0
+            camada = self._camadas[nivel]
+            pontos = [camada[i] for i in range(len(camada) - fator, len(camada))]
+            self._camadas[nivel + 1].append(_consolidar_metricas(pontos))
+    
+    def desde(self, limite_tempo: datetime) -> List[Any]:
+        """
+        Pontos posteriores a limite_tempo, em ordem cronológica, cada trecho
+        na camada mais fina que o cobre. Cada camada é lida a partir do fim
+        e a leitura para no primeiro ponto fora da janela.
+        """
+        trechos = []
+        inicio_coberto = None
+        
+        for camada in self._camadas:
+            trecho = []
+            janela_coberta = False
+            for metrica in reversed(camada):
+                if metrica.timestamp <= limite_tempo:
+                    janela_coberta = True
+                    break
+                # Só o que é mais antigo que as camadas mais finas já lidas
+                if inicio_coberto is None or metrica.timestamp < inicio_coberto:
+                    trecho.append(metrica)
+            
+            trechos.append(trecho)
+            if janela_coberta or not camada:
+                break
+            if inicio_coberto is None or camada[0].timestamp < inicio_coberto:
+                inicio_coberto = camada[0].timestamp
+        
+        return [metrica for trecho in reversed(trechos) for metrica in reversed(trecho)]
+
 class MonitorSistema:
     """  
     Coleta métricas, detecta problemas e gera alertas para
@@ -57,19 +271,33 @@ class MonitorSistema:
     """
     
     def __init__(self):
-        self.metricas_sistema_historico = []
-        self.metricas_aplicacao_historico = []
+        self.configuracao_alertas = self._carregar_configuracao_alertas()
+        camadas = self.configuracao_alertas['camadas_historico']
+        self.metricas_sistema_historico = HistoricoMetricas(camadas)
+        self.metricas_aplicacao_historico = HistoricoMetricas(camadas)
         self.alertas_ativos = {}
         self.alertas_historico = []
-        self.configuracao_alertas = self._carregar_configuracao_alertas()
+        # Histerese: amostras seguidas fora/dentro do limite por tipo de alerta
+        self._amostras_violadas: Dict[str, int] = {}
+        self._amostras_normais: Dict[str, int] = {}
+        # Última emissão por tipo: (severidade, instante monotônico)
+        self._ultima_emissao: Dict[str, Tuple[str, float]] = {}
         self.inicio_monitoramento = datetime.now()
-        self.ultima_coleta = None
+        # Intervalos medidos com o relógio monotônico (imune a ajustes do
+        # relógio de parede); datetime só nos timestamps registrados
+        self._inicio_monotonico = time.monotonic()
+        self.ultima_coleta: Optional[float] = None
         
         # Contadores para métricas da aplicação
         self.contador_analises = 0
         self.contador_erros = 0
         self.tempos_analise = []
         
+        # Processo reutilizado entre coletas; a primeira leitura de CPU só
+        # marca a referência para a medição não bloqueante das seguintes
+        self._processo = psutil.Process(os.getpid())
+        psutil.cpu_percent(interval=None)
+        
     def _carregar_configuracao_alertas(self) -> Dict[str, Any]:
         """Carrega configuração dos alertas."""
         return {
@@ -82,8 +310,16 @@ class MonitorSistema:
             'tempo_analise_lento': 30.0,
             'cache_hit_rate_baixo': 50.0,
             'erros_por_minuto_alto': 10,
-            'max_historico_metricas': 1440,
-            'intervalo_coleta_segundos': 60
+            # Histerese contra alertas intermitentes perto do limite
+            'amostras_para_disparar': 2,
+            'amostras_para_resolver': 3,
+            'janela_supressao_segundos': 300,
+            # (fator, capacidade) por camada: 60 coletas, 72 médias de 5 e
+            # 48 médias de 30 coletas
+            'camadas_historico': ((1, 60), (5, 72), (6, 48)),
+            'intervalo_coleta_segundos': 60,
+            # Desligado, processos_ativos e conexoes_rede ficam em 0
+            'coletar_processos_e_conexoes': True
         }
     
     async def iniciar_monitoramento(self):
@@ -93,7 +329,7 @@ class MonitorSistema:
         while True:
             try:
                 await self._coletar_metricas()
-                await self._verificar_alertas()
+                self._verificar_alertas()
                 await self._limpar_dados_antigos()
                 
                 await asyncio.sleep(self.configuracao_alertas['intervalo_coleta_segundos'])
@@ -105,18 +341,27 @@ class MonitorSistema:
     async def _coletar_metricas(self):
         """Coleta métricas do sistema e da aplicação."""
         agora = datetime.now()
+        instante = time.monotonic()
         
         # Métricas do sistema
         try:
+            # Cada chamada do psutil é feita uma única vez por coleta; o uso
+            # de CPU é a média desde a coleta anterior, sem bloquear o loop
+            memoria = psutil.virtual_memory()
+            disco = psutil.disk_usage('/')
+            if self.configuracao_alertas['coletar_processos_e_conexoes']:
+                processos, conexoes = _contar_processos(), _contar_conexoes()
+            else:
+                processos = conexoes = 0
             metricas_sistema = MetricasSistema(
                 timestamp=agora,
-                cpu_percent=psutil.cpu_percent(interval=1),
-                memoria_percent=psutil.virtual_memory().percent,
-                memoria_disponivel_mb=psutil.virtual_memory().available / (1024 * 1024),
-                disco_percent=psutil.disk_usage('/').percent,
-                disco_disponivel_gb=psutil.disk_usage('/').free / (1024 * 1024 * 1024),
-                processos_ativos=len(psutil.pids()),
-                conexoes_rede=len(psutil.net_connections())
+                cpu_percent=psutil.cpu_percent(interval=None),
+                memoria_percent=memoria.percent,
+                memoria_disponivel_mb=memoria.available / (1024 * 1024),
+                disco_percent=disco.percent,
+                disco_disponivel_gb=disco.free / (1024 * 1024 * 1024),
+                processos_ativos=processos,
+                conexoes_rede=conexoes
             )
             
             self.metricas_sistema_historico.append(metricas_sistema)
@@ -125,35 +370,34 @@ class MonitorSistema:
             logger.error(f"Erro ao coletar métricas do sistema: {e}")
         
         try:
-            metricas_app = await self._coletar_metricas_aplicacao(agora)
+            metricas_app = await self._coletar_metricas_aplicacao(agora, instante)
             self.metricas_aplicacao_historico.append(metricas_app)
             
         except Exception as e:
             logger.error(f"Erro ao coletar métricas da aplicação: {e}")
         
-        self.ultima_coleta = agora
+        self.ultima_coleta = instante
     
-    async def _coletar_metricas_aplicacao(self, timestamp: datetime) -> MetricasAplicacao:
+    async def _coletar_metricas_aplicacao(
+        self,
+        timestamp: datetime,
+        instante: float
+    ) -> MetricasAplicacao:
         """Coleta métricas específicas da aplicação."""
         
         analises_por_minuto = 0.0
-        if self.ultima_coleta:
-            intervalo_minutos = (timestamp - self.ultima_coleta).total_seconds() / 60
+        erros_por_minuto = 0.0
+        if self.ultima_coleta is not None:
+            intervalo_minutos = (instante - self.ultima_coleta) / 60
             if intervalo_minutos > 0:
                 analises_por_minuto = self.contador_analises / intervalo_minutos
+                erros_por_minuto = self.contador_erros / intervalo_minutos
         
         tempo_medio = 0.0
         if self.tempos_analise:
             tempo_medio = sum(self.tempos_analise) / len(self.tempos_analise)
-        
-        erros_por_minuto = 0.0
-        if self.ultima_coleta:
-            intervalo_minutos = (timestamp - self.ultima_coleta).total_seconds() / 60
-            if intervalo_minutos > 0:
-                erros_por_minuto = self.contador_erros / intervalo_minutos
 
-        processo_atual = psutil.Process()
-        memoria_app = processo_atual.memory_info().rss / (1024 * 1024)
+        memoria_app = self._processo.memory_info().rss / (1024 * 1024)
         
         metricas = MetricasAplicacao(
             timestamp=timestamp,
@@ -189,142 +433,82 @@ class MonitorSistema:
         except Exception:
             return 0
     
-    async def _verificar_alertas(self):
+    def _verificar_alertas(self):
         """Verifica condições de alerta baseadas nas métricas coletadas."""
         if not self.metricas_sistema_historico or not self.metricas_aplicacao_historico:
             return
         
-        ultima_metrica_sistema = self.metricas_sistema_historico[-1]
-        ultima_metrica_app = self.metricas_aplicacao_historico[-1]
-        
-        # Verifica alertas de sistema
-        await self._verificar_alerta_cpu(ultima_metrica_sistema)
-        await self._verificar_alerta_memoria(ultima_metrica_sistema)
-        await self._verificar_alerta_disco(ultima_metrica_sistema)
-        
-        # Verifica alertas de aplicação
-        await self._verificar_alerta_performance(ultima_metrica_app)
-        await self._verificar_alerta_cache(ultima_metrica_app)
-        await self._verificar_alerta_erros(ultima_metrica_app)
-    
-    async def _verificar_alerta_cpu(self, metricas: MetricasSistema):
-        """Verifica alertas relacionados ao uso de CPU."""
-        cpu_percent = metricas.cpu_percent
-        
-        if cpu_percent >= self.configuracao_alertas['cpu_critico']:
-            await self._criar_alerta(
-                'cpu_critico',
-                'critica',
-                'CPU em uso crítico',
-                f'Uso de CPU em {cpu_percent:.1f}% (crítico: ≥{self.configuracao_alertas["cpu_critico"]}%)',
-                {'cpu_percent': cpu_percent}
-            )
-        elif cpu_percent >= self.configuracao_alertas['cpu_alto']:
-            await self._criar_alerta(
-                'cpu_alto',
-                'alta',
-                'CPU em uso elevado',
-                f'Uso de CPU em {cpu_percent:.1f}% (alto: ≥{self.configuracao_alertas["cpu_alto"]}%)',
-                {'cpu_percent': cpu_percent}
-            )
-        else:
-            await self._resolver_alerta('cpu_critico')
-            await self._resolver_alerta('cpu_alto')
-    
-    async def _verificar_alerta_memoria(self, metricas: MetricasSistema):
-        """Verifica alertas relacionados ao uso de memória."""
-        memoria_percent = metricas.memoria_percent
-        
-        if memoria_percent >= self.configuracao_alertas['memoria_critica']:
-            await self._criar_alerta(
-                'memoria_critica',
-                'critica',
-                'Memória em uso crítico',
-                f'Uso de memória em {memoria_percent:.1f}% (crítico: ≥{self.configuracao_alertas["memoria_critica"]}%)',
-                {'memoria_percent': memoria_percent, 'memoria_disponivel_mb': metricas.memoria_disponivel_mb}
-            )
-        elif memoria_percent >= self.configuracao_alertas['memoria_alta']:
-            await self._criar_alerta(
-                'memoria_alta',
-                'alta',
-                'Memória em uso elevado',
-                f'Uso de memória em {memoria_percent:.1f}% (alto: ≥{self.configuracao_alertas["memoria_alta"]}%)',
-                {'memoria_percent': memoria_percent, 'memoria_disponivel_mb': metricas.memoria_disponivel_mb}
-            )
-        else:
-            await self._resolver_alerta('memoria_critica')
-            await self._resolver_alerta('memoria_alta')
-    
-    async def _verificar_alerta_disco(self, metricas: MetricasSistema):
-        """Verifica alertas relacionados ao uso de disco."""
-        disco_percent = metricas.disco_percent
-        
-        if disco_percent >= self.configuracao_alertas['disco_critico']:
-            await self._criar_alerta(
-                'disco_critico',
-                'critica',
-                'Disco em uso crítico',
-                f'Uso de disco em {disco_percent:.1f}% (crítico: ≥{self.configuracao_alertas["disco_critico"]}%)',
-                {'disco_percent': disco_percent, 'disco_disponivel_gb': metricas.disco_disponivel_gb}
-            )
-        elif disco_percent >= self.configuracao_alertas['disco_alto']:
-            await self._criar_alerta(
-                'disco_alto',
-                'alta',
-                'Disco em uso elevado',
-                f'Uso de disco em {disco_percent:.1f}% (alto: ≥{self.configuracao_alertas["disco_alto"]}%)',
-                {'disco_percent': disco_percent, 'disco_disponivel_gb': metricas.disco_disponivel_gb}
-            )
-        else:
-            await self._resolver_alerta('disco_critico')
-            await self._resolver_alerta('disco_alto')
+        # Uma única varredura síncrona: só comparações com os limites
+        for metricas, regras in (
+            (self.metricas_sistema_historico.ultima, REGRAS_ALERTA_SISTEMA),
+            (self.metricas_aplicacao_historico.ultima, REGRAS_ALERTA_APLICACAO)
+        ):
+            for campo, campos_contexto, dispara_abaixo, niveis in regras:
+                valor = getattr(metricas, campo)
+                
+                for nivel in niveis:
+                    limite = self.configuracao_alertas[nivel[2]]
+                    if (valor < limite) if dispara_abaixo else (valor >= limite):
+                        # Fora do limite: a contagem para resolver recomeça
+                        for tipo, *_ in niveis:
+                            self._amostras_normais.pop(tipo, None)
+                        self._registrar_violacao(nivel, valor, limite, metricas, campos_contexto)
+                        break
+                    self._amostras_violadas.pop(nivel[0], None)
+                else:
+                    self._registrar_normalidade(niveis)
     
-    async def _verificar_alerta_performance(self, metricas: MetricasAplicacao):
-        """Verifica alertas relacionados à performance da aplicação."""
-        tempo_medio = metricas.tempo_medio_analise
+    def _registrar_violacao(
+        self,
+        nivel: Tuple[str, str, str, str, str],
+        valor: float,
+        limite: float,
+        metricas: Any,
+        campos_contexto: Tuple[str, ...]
+    ):
+        """
+        Conta uma amostra fora do limite. O alerta só é criado após
+        amostras_para_disparar amostras seguidas, e não é reemitido com o
+        mesmo tipo e severidade dentro da janela de supressão (o valor medido
+        quase nunca se repete, então não entra na comparação).
+        """
+        tipo, severidade, _, titulo, descricao = nivel
+        violadas = self._amostras_violadas[tipo] = self._amostras_violadas.get(tipo, 0) + 1
+        if tipo in self.alertas_ativos or violadas < self.configuracao_alertas['amostras_para_disparar']:
+            return
         
-        if tempo_medio >= self.configuracao_alertas['tempo_analise_lento']:
-            await self._criar_alerta(
-                'performance_lenta',
-                'media',
-                'Performance de análise degradada',
-                f'Tempo médio de análise em {tempo_medio:.2f}s (limite: {self.configuracao_alertas["tempo_analise_lento"]}s)',
-                {'tempo_medio_analise': tempo_medio}
-            )
-        else:
-            await self._resolver_alerta('performance_lenta')
-    
-    async def _verificar_alerta_cache(self, metricas: MetricasAplicacao):
-        """Verifica alertas relacionados ao cache."""
-        hit_rate = metricas.cache_hit_rate
+        agora = time.monotonic()
+        ultima = self._ultima_emissao.get(tipo)
+        if (
+            ultima is not None
+            and ultima[0] == severidade
+            and agora - ultima[1] < self.configuracao_alertas['janela_supressao_segundos']
+        ):
+            return
         
-        if hit_rate < self.configuracao_alertas['cache_hit_rate_baixo']:
-            await self._criar_alerta(
-                'cache_hit_baixo',
-                'media',
-                'Taxa de acerto do cache baixa',
-                f'Taxa de acerto do cache em {hit_rate:.1f}% (mínimo: {self.configuracao_alertas["cache_hit_rate_baixo"]}%)',
-                {'cache_hit_rate': hit_rate}
-            )
-        else:
-            await self._resolver_alerta('cache_hit_baixo')
+        self._ultima_emissao[tipo] = (severidade, agora)
+        self._criar_alerta(
+            tipo,
+            severidade,
+            titulo,
+            descricao.format(valor=valor, limite=limite),
+            {c: getattr(metricas, c) for c in campos_contexto}
+        )
     
-    async def _verificar_alerta_erros(self, metricas: MetricasAplicacao):
-        """Verifica alertas relacionados a erros."""
-        erros_por_minuto = metricas.erros_por_minuto
-        
-        if erros_por_minuto >= self.configuracao_alertas['erros_por_minuto_alto']:
-            await self._criar_alerta(
-                'erros_elevados',
-                'alta',
-                'Taxa de erros elevada',
-                f'Erros por minuto: {erros_por_minuto:.1f} (limite: {self.configuracao_alertas["erros_por_minuto_alto"]})',
-                {'erros_por_minuto': erros_por_minuto}
-            )
-        else:
-            await self._resolver_alerta('erros_elevados')
+    def _registrar_normalidade(self, niveis: Tuple[Tuple[str, str, str, str, str], ...]):
+        """
+        Conta uma amostra dentro de todos os limites; cada alerta ativo só é
+        resolvido após amostras_para_resolver amostras seguidas.
+        """
+        for tipo, *_ in niveis:
+            if tipo not in self.alertas_ativos:
+                continue
+            normais = self._amostras_normais[tipo] = self._amostras_normais.get(tipo, 0) + 1
+            if normais >= self.configuracao_alertas['amostras_para_resolver']:
+                del self._amostras_normais[tipo]
+                self._resolver_alerta(tipo)
     
-    async def _criar_alerta(
+    def _criar_alerta(
         self,
         tipo: str,
         severidade: str,
@@ -349,7 +533,7 @@ class MonitorSistema:
             
             logger.warning(f"ALERTA {severidade.upper()}: {titulo} - {descricao}")
     
-    async def _resolver_alerta(self, tipo: str):
+    def _resolver_alerta(self, tipo: str):
         """Resolve um alerta ativo."""
         if tipo in self.alertas_ativos:
             alerta = self.alertas_ativos[tipo]
@@ -360,20 +544,18 @@ class MonitorSistema:
     
     async def _limpar_dados_antigos(self):
         """Remove dados antigos do histórico para economizar memória."""
-        max_historico = self.configuracao_alertas['max_historico_metricas']
-        
-        if len(self.metricas_sistema_historico) > max_historico:
-            self.metricas_sistema_historico = self.metricas_sistema_historico[-max_historico:]
+        # Os históricos de métricas já são limitados pela capacidade das camadas
         
-        if len(self.metricas_aplicacao_historico) > max_historico:
-            self.metricas_aplicacao_historico = self.metricas_aplicacao_historico[-max_historico:]
-        
-        # Remove alertas do histórico mais antigos que 7 dias
+        # Remove alertas do histórico mais antigos que 7 dias: o histórico
+        # está em ordem de criação, então basta cortar o início da lista
         limite_tempo = datetime.now() - timedelta(days=7)
-        self.alertas_historico = [
-            a for a in self.alertas_historico
-            if a.timestamp > limite_tempo
-        ]
+        del self.alertas_historico[:self._indice_alertas_apos(limite_tempo)]
+    
+    def _indice_alertas_apos(self, limite_tempo: datetime) -> int:
+        """Posição do primeiro alerta do histórico posterior a limite_tempo."""
+        return bisect.bisect_right(
+            self.alertas_historico, limite_tempo, key=attrgetter('timestamp')
+        )
     
     def registrar_analise(self, tempo_execucao: float):
         """Registra uma análise realizada."""
@@ -389,8 +571,8 @@ class MonitorSistema:
         if not self.metricas_sistema_historico or not self.metricas_aplicacao_historico:
             return {'status': 'inicializando', 'detalhes': 'Coletando métricas iniciais...'}
         
-        ultima_sistema = self.metricas_sistema_historico[-1]
-        ultima_app = self.metricas_aplicacao_historico[-1]
+        ultima_sistema = self.metricas_sistema_historico.ultima
+        ultima_app = self.metricas_aplicacao_historico.ultima
         
         # Determina status geral baseado nos alertas
         alertas_criticos = [a for a in self.alertas_ativos.values() if a.severidade == 'critica']
@@ -408,11 +590,11 @@ class MonitorSistema:
         return {
             'status': status,
             'timestamp': datetime.now().isoformat(),
-            'uptime_segundos': (datetime.now() - self.inicio_monitoramento).total_seconds(),
+            'uptime_segundos': time.monotonic() - self._inicio_monotonico,
             'alertas_ativos': len(self.alertas_ativos),
-            'metricas_sistema': asdict(ultima_sistema),
-            'metricas_aplicacao': asdict(ultima_app),
-            'alertas_detalhes': [asdict(a) for a in self.alertas_ativos.values()]
+            'metricas_sistema': _como_dict(ultima_sistema),
+            'metricas_aplicacao': _como_dict(ultima_app),
+            'alertas_detalhes': [_como_dict(a) for a in self.alertas_ativos.values()]
         }
     
     def obter_metricas_historico(
@@ -435,31 +617,27 @@ class MonitorSistema:
         resultado = {}
         
         if tipo in ['sistema', 'ambos']:
-            metricas_filtradas = [
-                asdict(m) for m in self.metricas_sistema_historico
-                if m.timestamp > limite_tempo
+            resultado['sistema'] = [
+                _como_dict(m) for m in self.metricas_sistema_historico.desde(limite_tempo)
             ]
-            resultado['sistema'] = metricas_filtradas
         
         if tipo in ['aplicacao', 'ambos']:
-            metricas_filtradas = [
-                asdict(m) for m in self.metricas_aplicacao_historico
-                if m.timestamp > limite_tempo
+            resultado['aplicacao'] = [
+                _como_dict(m) for m in self.metricas_aplicacao_historico.desde(limite_tempo)
             ]
-            resultado['aplicacao'] = metricas_filtradas
         
         return resultado
     
     def obter_alertas_historico(self, dias: int = 7) -> List[Dict[str, Any]]:
         """Obtém histórico de alertas."""
         limite_tempo = datetime.now() - timedelta(days=dias)
+        inicio = self._indice_alertas_apos(limite_tempo)
         
-        alertas_filtrados = [
-            asdict(a) for a in self.alertas_historico
-            if a.timestamp > limite_tempo
+        # Do mais recente para o mais antigo, sem reordenar
+        return [
+            _como_dict(self.alertas_historico[i])
+            for i in range(len(self.alertas_historico) - 1, inicio - 1, -1)
         ]
-        
-        return sorted(alertas_filtrados, key=lambda x: x['timestamp'], reverse=True)
 
 # Instância global do monitor
 monitor_sistema = MonitorSistema()
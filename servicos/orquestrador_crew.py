@@ -4,8 +4,10 @@ de agentes e workflows de otimização de código.
 """
 
 import asyncio
+import itertools
 import logging
-from typing import Dict, List, Any, Optional
+from collections import deque
+from typing import Dict, List, Any, Optional, Sequence
 from datetime import datetime
 import json
 from dataclasses import dataclass, asdict
@@ -14,6 +16,14 @@ from modelos.schemas import ConfiguracaoCrewAI, Sugestao, TipoSugestao
 
 logger = logging.getLogger(__name__)
 
+# Sufixo sequencial dos IDs de workflow: o carimbo de tempo tem resolução de
+# segundos e workflows criados no mesmo segundo (lotes, integradores que
+# compartilham o orquestrador) não podem colidir
+_SEQUENCIA_WORKFLOW = itertools.count(1)
+
+# Execuções mantidas em historico_execucoes (as mais antigas saem primeiro)
+MAXIMO_HISTORICO_EXECUCOES = 1000
+
 @dataclass
 class TarefaWorkflow:
     """Representa uma tarefa no workflow do Crew AI."""
@@ -45,7 +55,7 @@ class OrquestradorCrewAI:
         self.configuracao = ConfiguracaoCrewAI()
         self.agentes_registrados = {}
         self.workflows_ativos = {}
-        self.historico_execucoes = []
+        self.historico_execucoes = deque(maxlen=MAXIMO_HISTORICO_EXECUCOES)
         self._inicializar_agentes_padrao()
     
     def _inicializar_agentes_padrao(self):
@@ -118,7 +128,7 @@ class OrquestradorCrewAI:
         self,
         codigo: str,
         nome_arquivo: Optional[str] = None,
-        prioridades: Optional[List[str]] = None
+        prioridades: Optional[Sequence[str]] = None
     ) -> str:
         """
         Cria um workflow de otimização de código.
@@ -126,12 +136,15 @@ class OrquestradorCrewAI:
         Args:
             codigo: Código Python a ser analisado
             nome_arquivo: Nome do arquivo (opcional)
-            prioridades: Lista de prioridades para análise
+            prioridades: Sequência de prioridades para análise
             
         Returns:
             ID do workflow criado
         """
-        workflow_id = f"workflow_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        workflow_id = (
+            f"workflow_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            f"_{next(_SEQUENCIA_WORKFLOW)}"
+        )
         
         # Define as tarefas do workflow baseadas nas prioridades
         tarefas = self._definir_tarefas_workflow(codigo, prioridades or [])
@@ -155,7 +168,7 @@ class OrquestradorCrewAI:
     def _definir_tarefas_workflow(
         self,
         codigo: str,
-        prioridades: List[str]
+        prioridades: Sequence[str]
     ) -> List[TarefaWorkflow]:
         """Define as tarefas do workflow baseadas no código e prioridades."""
         tarefas = []
@@ -257,11 +270,20 @@ class OrquestradorCrewAI:
             logger.info(f"Workflow {workflow_id} concluído com sucesso!")
             return resultados_finais
             
+        except asyncio.CancelledError:
+            workflow['status'] = 'cancelado'
+            raise
+            
         except Exception as e:
             workflow['status'] = 'erro'
             workflow['erro'] = str(e)
             logger.error(f"Erro na execução do workflow {workflow_id}: {e}")
             raise
+        
+        finally:
+            # Encerrado, o workflow só serve para consulta de status: o código
+            # analisado (até o limite de SolicitacaoAnalise) não fica retido
+            workflow.pop('codigo', None)
     
     def _dependencias_concluidas(
         self,
@@ -440,6 +462,10 @@ class OrquestradorCrewAI:
             'total_tarefas': len(workflow['tarefas'])
         }
     
+    def descartar_workflow(self, workflow_id: str):
+        """Remove um workflow do registro (ex.: quando o integrador o descarta)."""
+        self.workflows_ativos.pop(workflow_id, None)
+    
     def _calcular_progresso_workflow(self, workflow: Dict[str, Any]) -> float:
         """Calcula o progresso percentual de um workflow."""
         total_tarefas = len(workflow['tarefas'])
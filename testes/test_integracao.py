@@ -7,15 +7,24 @@ cache, e fluxos completos de análise.
 
 import pytest
 import asyncio
+import orjson
 import os
+from dataclasses import replace
 from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, patch
 
 from servicos.banco_dados import GerenciadorBancoDados
-from servicos.gerenciador_cache import GerenciadorCache
+from servicos.gerenciador_cache import (
+    FORMATO_SUGESTOES_DEDUPLICADAS,
+    OPCOES_ORJSON_CANONICO,
+    VERSAO_FORMATO_CACHE,
+    GerenciadorCache
+)
 from servicos.analisador_codigo import AnalisadorCodigo
-from servicos.monitor_sistema import MonitorSistema
-from modelos.schemas import SolicitacaoAnalise, NivelDetalhamento
+from servicos.monitor_sistema import MonitorSistema, MetricasSistema, MetricasAplicacao
+from servicos import integrador_crew
+from servicos.integrador_crew import IntegradorCrewAI
+from modelos.schemas import SolicitacaoAnalise, NivelDetalhamento, Sugestao, TipoSugestao
 
 @pytest.mark.integration
 class TestIntegracaoBancoDados:
@@ -27,7 +36,7 @@ class TestIntegracaoBancoDados:
         bd = GerenciadorBancoDados()
         
         # Configura para usar banco de teste
-        bd.config.nome_banco = "agente_otimizacao_test"
+        bd.config = replace(bd.config, nome_banco="agente_otimizacao_test")
         
         try:
             await bd.inicializar_banco()
@@ -191,6 +200,154 @@ class TestIntegracaoCache:
         assert 'configuracao' in info
         assert info['tipo_cache'] in ['redis', 'local']
 
+class RedisFalso:
+    """Redis em memória com os comandos usados pelo GerenciadorCache."""
+    
+    def __init__(self):
+        self.dados = {}
+        self.chamadas_mget = 0
+    
+    async def get(self, chave):
+        return self.dados.get(chave)
+    
+    async def mget(self, chaves):
+        self.chamadas_mget += 1
+        return [self.dados.get(chave) for chave in chaves]
+    
+    async def setex(self, chave, ttl, valor):
+        self.dados[chave] = valor
+    
+    def pipeline(self, transaction=True):
+        return PipelineFalso(self)
+
+class PipelineFalso:
+    """Pipeline do RedisFalso: acumula os SETEX e os aplica em execute()."""
+    
+    def __init__(self, redis_falso):
+        self.redis_falso = redis_falso
+        self.comandos = []
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *excecao):
+        return False
+    
+    def setex(self, chave, ttl, valor):
+        self.comandos.append((chave, valor))
+    
+    async def execute(self):
+        self.redis_falso.dados.update(self.comandos)
+
+@pytest.mark.integration
+class TestFormatoCache:
+    """Testes do cache local (sem Redis) e do formato gravado no Redis."""
+    
+    @pytest.fixture
+    def cache_local(self):
+        """Fixture que retorna um gerenciador sem Redis (cache em memória)."""
+        return GerenciadorCache()
+    
+    @pytest.fixture
+    def cache_redis(self):
+        """Fixture que retorna um gerenciador ligado a um Redis em memória."""
+        cache = GerenciadorCache()
+        cache.redis_client = RedisFalso()
+        return cache
+    
+    @pytest.mark.asyncio
+    async def test_cache_local_descarta_menos_usado(self, cache_local):
+        """Testa a remoção da entrada menos recentemente usada (LRU)."""
+        cache_local.config['max_cache_local'] = 2
+        await cache_local.salvar_analise_cache("a = 1", {"pontuacao": 1})
+        await cache_local.salvar_analise_cache("b = 2", {"pontuacao": 2})
+        # A leitura torna "a = 1" a mais recente
+        assert await cache_local.obter_analise_cache("a = 1") is not None
+        
+        await cache_local.salvar_analise_cache("c = 3", {"pontuacao": 3})
+        
+        assert len(cache_local.cache_local) == 2
+        assert await cache_local.obter_analise_cache("b = 2") is None
+        assert await cache_local.obter_analise_cache("a = 1") is not None
+        assert await cache_local.obter_analise_cache("c = 3") is not None
+    
+    @pytest.mark.asyncio
+    async def test_cache_local_remove_expirados(self, cache_local):
+        """Testa a limpeza das entradas vencidas pelo heap de expiração."""
+        await cache_local.salvar_analise_cache("a = 1", {"pontuacao": 1}, ttl=-1)
+        await cache_local.salvar_analise_cache("b = 2", {"pontuacao": 2}, ttl=60)
+        # Regravada com prazo novo: a entrada antiga no heap fica obsoleta
+        await cache_local.salvar_analise_cache("c = 3", {"pontuacao": 3}, ttl=-1)
+        await cache_local.salvar_analise_cache("c = 3", {"pontuacao": 3}, ttl=60)
+        
+        await cache_local.limpar_cache_expirado()
+        
+        assert len(cache_local.cache_local) == 2
+        assert await cache_local.obter_analise_cache("a = 1") is None
+        assert await cache_local.obter_analise_cache("b = 2") is not None
+        assert await cache_local.obter_analise_cache("c = 3") is not None
+        # Só restam no heap os prazos das entradas vigentes
+        assert len(cache_local._heap_expiracao) == 2
+    
+    @pytest.mark.asyncio
+    async def test_obter_analises_cache_em_lote(self, cache_local):
+        """Testa a consulta em lote: ordem preservada e contadores."""
+        await cache_local.salvar_analise_cache("a = 1", {"pontuacao": 1})
+        await cache_local.salvar_analise_cache("b = 2", {"pontuacao": 2})
+        
+        entradas = await cache_local.obter_analises_cache(["b = 2", "x = 0", "a = 1"])
+        
+        assert [e and e['resultado']['pontuacao'] for e in entradas] == [2, None, 1]
+        assert entradas[0]['tamanho_codigo'] == len("b = 2")
+        assert cache_local.estatisticas['hits'] == 2
+        assert cache_local.estatisticas['misses'] == 1
+    
+    @pytest.mark.asyncio
+    async def test_sugestoes_deduplicadas_no_redis(self, cache_redis):
+        """Testa a gravação deduplicada e a reidratação num único MGET."""
+        comum = {"tipo": "performance", "titulo": "Loop"}
+        await cache_redis.salvar_analise_cache(
+            "a = 1", {"sugestoes": [comum, {"tipo": "seguranca", "titulo": "eval"}], "pontuacao": 1}
+        )
+        await cache_redis.salvar_analise_cache("b = 2", {"sugestoes": [comum], "pontuacao": 2})
+        
+        dados = cache_redis.redis_client.dados
+        chaves_sugestoes = [chave for chave in dados if ":sug:" in chave]
+        # A sugestão comum é gravada uma única vez
+        assert len(chaves_sugestoes) == 2
+        assert all(valor[:1] == VERSAO_FORMATO_CACHE for valor in map(dados.get, chaves_sugestoes))
+        chave_analise = cache_redis._gerar_chave_cache("analise", cache_redis._gerar_hash_codigo("a = 1"))
+        assert dados[chave_analise][:1] == FORMATO_SUGESTOES_DEDUPLICADAS
+        
+        entradas = await cache_redis.obter_analises_cache(["a = 1", "b = 2"])
+        
+        assert entradas[0]['resultado']['sugestoes'][0] == comum
+        assert entradas[1]['resultado'] == {"sugestoes": [comum], "pontuacao": 2}
+        # Um MGET para as análises e outro para todas as sugestões
+        assert cache_redis.redis_client.chamadas_mget == 2
+    
+    @pytest.mark.asyncio
+    async def test_decodificar_analise_sem_sugestao(self, cache_redis):
+        """Testa que a falta de uma chave sug: invalida só a análise que a referencia."""
+        comum = {"tipo": "performance", "titulo": "Loop"}
+        unica = {"tipo": "seguranca", "titulo": "eval"}
+        await cache_redis.salvar_analise_cache("a = 1", {"sugestoes": [comum, unica]})
+        await cache_redis.salvar_analise_cache("b = 2", {"sugestoes": [comum]})
+        
+        dados = cache_redis.redis_client.dados
+        hash_unica = cache_redis._gerar_hash_bytes(orjson.dumps(unica, option=OPCOES_ORJSON_CANONICO))
+        del dados[cache_redis._gerar_chave_cache("sug", hash_unica)]
+        
+        chaves = [
+            cache_redis._gerar_chave_cache("analise", cache_redis._gerar_hash_codigo(codigo))
+            for codigo in ("a = 1", "b = 2")
+        ]
+        resultados = await cache_redis._decodificar_analises(
+            [dados[chaves[0]], dados[chaves[1]], None, b"\x80formato antigo"]
+        )
+        
+        assert resultados == [None, {"sugestoes": [comum]}, None, None]
+
 @pytest.mark.integration
 class TestIntegracaoCompleta:
     """Testes de integração do sistema completo."""
@@ -310,17 +467,19 @@ def funcao_complexa(dados):
         resultados = []
         for i, codigo in enumerate(codigos_teste):
             try:
+                inicio = datetime.now()
                 sugestoes = await analisador.analisar_codigo(
                     codigo,
                     nivel_detalhamento=NivelDetalhamento.INTERMEDIARIO
                 )
+                tempo = (datetime.now() - inicio).total_seconds()
                 pontuacao = analisador.calcular_pontuacao_qualidade(codigo)
                 
                 resultados.append({
                     'codigo_id': i,
                     'sugestoes': len(sugestoes),
                     'pontuacao': pontuacao,
-                    'tempo': analisador.ultimo_tempo_analise
+                    'tempo': tempo
                 })
                 
             except Exception as e:
@@ -334,6 +493,234 @@ def funcao_complexa(dados):
             assert 0 <= resultado['pontuacao'] <= 100
             assert resultado['tempo'] > 0
 
+@pytest.mark.integration
+class TestIntegracaoCrewAI:
+    """Testes de integração do integrador Crew AI."""
+    
+    @pytest.fixture
+    def integrador(self, tmp_path):
+        """Fixture que retorna um integrador com cache em disco temporário."""
+        return IntegradorCrewAI(diretorio_cache=tmp_path)
+    
+    @pytest.mark.asyncio
+    async def test_lote_analisa_cada_codigo_no_proprio_workflow(self, integrador):
+        """Testa que workflows de um lote não colidem entre si."""
+        codigos = ["a = 1", "b = 2", "c = 3"]
+        orquestrador = integrador.orquestrador
+        executar_original = orquestrador._executar_tarefa
+        codigos_executados = set()
+        
+        async def registrar_codigo(tarefa, codigo):
+            codigos_executados.add(codigo.strip())
+            return await executar_original(tarefa, codigo)
+        
+        with patch.object(orquestrador, '_executar_tarefa', registrar_codigo):
+            respostas = await integrador.analisar_lote(
+                [SolicitacaoAnalise(codigo=codigo) for codigo in codigos]
+            )
+        
+        assert len(respostas) == len(codigos)
+        assert codigos_executados == set(codigos)
+        assert len(integrador.workflows_em_execucao) == len(codigos)
+        assert integrador.obter_status_workflows(False)['workflows_concluidos'] == len(codigos)
+    
+    @pytest.mark.asyncio
+    async def test_integradores_do_mesmo_loop_nao_colidem(self, tmp_path):
+        """Testa integradores que compartilham o orquestrador do loop."""
+        integrador_a = IntegradorCrewAI(diretorio_cache=tmp_path / "a")
+        integrador_b = IntegradorCrewAI(diretorio_cache=tmp_path / "b")
+        assert integrador_a.orquestrador is integrador_b.orquestrador
+        
+        await asyncio.gather(
+            integrador_a.analisar_com_crew_ai(SolicitacaoAnalise(codigo="a = 1", nome_arquivo="a.py")),
+            integrador_b.analisar_com_crew_ai(SolicitacaoAnalise(codigo="b = 2", nome_arquivo="b.py"))
+        )
+        
+        ids_a = set(integrador_a.workflows_em_execucao)
+        ids_b = set(integrador_b.workflows_em_execucao)
+        assert len(ids_a) == len(ids_b) == 1
+        assert ids_a.isdisjoint(ids_b)
+        workflows = integrador_a.orquestrador.workflows_ativos
+        assert workflows[ids_a.pop()]['nome_arquivo'] == "a.py"
+        assert workflows[ids_b.pop()]['nome_arquivo'] == "b.py"
+        # Encerrados, os workflows não retêm o código analisado
+        assert not any('codigo' in workflow for workflow in workflows.values())
+    
+    @pytest.mark.asyncio
+    async def test_cache_em_disco_entre_instancias_e_versoes(self, tmp_path, monkeypatch):
+        """Testa a leitura do cache em disco e sua invalidação pela versão."""
+        solicitacao = SolicitacaoAnalise(codigo="def f(x):\n    return x * 2")
+        
+        primeiro = IntegradorCrewAI(diretorio_cache=tmp_path)
+        await primeiro.analisar_com_crew_ai(solicitacao, usar_workflow_completo=False)
+        # A gravação em disco roda num executor
+        for _ in range(50):
+            if list(tmp_path.glob("*.json")):
+                break
+            await asyncio.sleep(0.02)
+        
+        segundo = IntegradorCrewAI(diretorio_cache=tmp_path)
+        with patch.object(segundo, '_executar_analise_simples', AsyncMock()) as simples:
+            resposta = await segundo.analisar_com_crew_ai(solicitacao, usar_workflow_completo=False)
+            simples.assert_not_called()
+        assert resposta.codigo_original == solicitacao.codigo
+        
+        monkeypatch.setattr(integrador_crew, 'VERSAO_CACHE_RESULTADOS', 999)
+        terceiro = IntegradorCrewAI(diretorio_cache=tmp_path)
+        assert terceiro._ler_resultado_disco(
+            terceiro._chave_resultado(solicitacao, False)
+        ) is None
+    
+    @pytest.mark.asyncio
+    async def test_hedge_usa_analise_local_quando_workflow_demora(self, integrador):
+        """Testa que o hedge devolve a análise local e cancela o workflow lento."""
+        async def workflow_lento(workflow_id):
+            await asyncio.sleep(10)
+        
+        with patch.object(integrador.orquestrador, 'executar_workflow', workflow_lento):
+            resposta = await integrador.analisar_com_crew_ai(
+                SolicitacaoAnalise(codigo="x = 1"), atraso_hedge=0.05
+            )
+            # O workflow cancelado termina de desfazer-se no loop
+            await asyncio.sleep(0.05)
+        
+        assert "fallback" in resposta.resumo_melhorias
+        # Só a resposta do workflow é memorizada
+        assert not integrador._resultado_cache
+        assert integrador.obter_status_workflows(False)['workflows_ativos'] == 0
+        assert [wf['status'] for wf in integrador.workflows_em_execucao.values()] == ['cancelado']
+    
+    @pytest.mark.asyncio
+    async def test_hedge_prefere_workflow_rapido(self, integrador):
+        """Testa que um workflow dentro do prazo vence e é memorizado."""
+        resposta = await integrador.analisar_com_crew_ai(
+            SolicitacaoAnalise(codigo="x = 1"), atraso_hedge=5.0
+        )
+        
+        assert "fallback" not in resposta.resumo_melhorias
+        assert len(integrador._resultado_cache) == 1
+    
+    @pytest.mark.asyncio
+    async def test_memoizacao_por_codigo_e_opcoes(self, integrador):
+        """Testa que respostas são reaproveitadas só para o mesmo código e opções."""
+        solicitacao = SolicitacaoAnalise(codigo="y = [i for i in range(10)]")
+        executar_original = integrador._executar_analise_simples
+        
+        with patch.object(
+            integrador, '_executar_analise_simples', AsyncMock(side_effect=executar_original)
+        ) as simples:
+            primeira = await integrador.analisar_com_crew_ai(solicitacao, usar_workflow_completo=False)
+            segunda = await integrador.analisar_com_crew_ai(solicitacao, usar_workflow_completo=False)
+            assert simples.call_count == 1
+            
+            await integrador.analisar_com_crew_ai(
+                SolicitacaoAnalise(codigo=solicitacao.codigo, focar_performance=True),
+                usar_workflow_completo=False
+            )
+            assert simples.call_count == 2
+        
+        assert segunda.sugestoes == primeira.sugestoes
+        assert segunda.timestamp >= primeira.timestamp
+    
+    def test_dedup_mantem_maior_prioridade(self, integrador):
+        """Testa que duplicatas por título mantêm a de maior prioridade."""
+        def sugestao(titulo, prioridade):
+            return Sugestao(
+                tipo=TipoSugestao.PERFORMANCE,
+                titulo=titulo,
+                descricao=f"{titulo} ({prioridade})",
+                impacto="medio",
+                prioridade=prioridade
+            )
+        
+        unicas = list(integrador._remover_sugestoes_duplicadas(iter([
+            sugestao("A", 3), sugestao("B", 5), sugestao("A", 9), sugestao("A", 4)
+        ])))
+        
+        # A de maior prioridade, na posição da primeira ocorrência
+        assert [(s.titulo, s.prioridade) for s in unicas] == [("A", 9), ("B", 5)]
+    
+    @pytest.mark.asyncio
+    async def test_extrai_sugestoes_de_todas_as_tarefas(self, integrador):
+        """Testa a conversão concorrente das tarefas do workflow."""
+        resultado_workflow = {
+            'resultados_por_tarefa': {
+                'analise_performance': {'problemas_encontrados': [
+                    {'tipo': 'loop', 'descricao': 'Loop aninhado', 'severidade': 'media'}
+                ]},
+                'revisao_boas_praticas': {'problemas_encontrados': [
+                    {'tipo': 'nomes', 'descricao': 'Nomes curtos', 'severidade': 'baixa'}
+                ]},
+                'auditoria_seguranca': {'vulnerabilidades_encontradas': [{}]},
+                'analise_estrutura': {'metricas': {}}
+            }
+        }
+        
+        sugestoes = await integrador._extrair_sugestoes_do_workflow(resultado_workflow)
+        
+        assert [(s.titulo, s.prioridade) for s in sugestoes] == [
+            ("Vulnerabilidade: Desconhecida", 9),
+            ("Otimização de loop", 6),
+            ("Melhoria em nomes", 3)
+        ]
+        assert sugestoes[0].impacto == "alto"
+    
+    @pytest.mark.asyncio
+    async def test_contagem_de_status_dos_workflows(self, integrador):
+        """Testa as contagens por status mantidas a cada transição."""
+        with patch.object(
+            integrador.orquestrador, 'executar_workflow', AsyncMock(side_effect=ValueError("falha"))
+        ):
+            await integrador.analisar_com_crew_ai(SolicitacaoAnalise(codigo="a = 1"))
+        await integrador.analisar_com_crew_ai(SolicitacaoAnalise(codigo="b = 2"))
+        
+        status = integrador.obter_status_workflows()
+        assert status['workflows_ativos'] == 0
+        assert status['workflows_concluidos'] == 1
+        assert status['workflows_com_erro'] == 1
+        assert sorted(wf['status'] for wf in status['detalhes'].values()) == ['concluido', 'erro']
+    
+    @pytest.mark.asyncio
+    async def test_registro_de_workflows_limitado(self, integrador, monkeypatch):
+        """Testa o descarte dos workflows encerrados mais antigos."""
+        monkeypatch.setattr(integrador_crew, 'MAXIMO_WORKFLOWS_REGISTRADOS', 2)
+        
+        for numero in range(4):
+            await integrador.analisar_com_crew_ai(SolicitacaoAnalise(codigo=f"x = {numero}"))
+        
+        assert len(integrador.workflows_em_execucao) == 2
+        assert integrador.obter_status_workflows(False)['workflows_concluidos'] == 2
+        # Os descartados também saem do orquestrador compartilhado
+        assert set(integrador.orquestrador.workflows_ativos) == set(integrador.workflows_em_execucao)
+    
+    @pytest.mark.asyncio
+    async def test_cancelar_workflow_interrompe_execucao(self, integrador):
+        """Testa que o cancelamento interrompe a execução e aciona o fallback."""
+        interrompidos = []
+        
+        async def workflow_lento(workflow_id):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                interrompidos.append(workflow_id)
+                raise
+        
+        with patch.object(integrador.orquestrador, 'executar_workflow', workflow_lento):
+            analise = asyncio.create_task(
+                integrador.analisar_com_crew_ai(SolicitacaoAnalise(codigo="z = 1"))
+            )
+            while not integrador.workflows_em_execucao:
+                await asyncio.sleep(0.01)
+            workflow_id = next(iter(integrador.workflows_em_execucao))
+            
+            assert await integrador.cancelar_workflow(workflow_id)
+            resposta = await asyncio.wait_for(analise, timeout=5)
+        
+        assert interrompidos == [workflow_id]
+        assert "fallback" in resposta.resumo_melhorias
+        assert integrador.workflows_em_execucao[workflow_id]['status'] == 'cancelado'
+        assert await integrador.cancelar_workflow("inexistente") is False
+
 @pytest.mark.integration
 class TestIntegracaoMonitoramento:
     """Testes de integração do sistema de monitoramento."""
@@ -363,6 +750,101 @@ class TestIntegracaoMonitoramento:
         assert 'timestamp' in status
         assert 'uptime_segundos' in status
         assert status['status'] in ['inicializando', 'saudavel', 'atencao', 'degradado', 'critico']
+    
+    def test_histerese_alertas(self, monitor):
+        """Testa que alertas só disparam e resolvem após amostras seguidas."""
+        def registrar_cpu(cpu_percent):
+            agora = datetime.now()
+            monitor.metricas_sistema_historico.append(
+                MetricasSistema(agora, cpu_percent, 10.0, 1000.0, 10.0, 100.0, 50, 5)
+            )
+            monitor.metricas_aplicacao_historico.append(
+                MetricasAplicacao(agora, 1, 1.0, 1.0, 90.0, 0, 0.0, 100.0)
+            )
+            monitor._verificar_alertas()
+        
+        # Uma amostra isolada acima do limite não dispara
+        registrar_cpu(80.0)
+        registrar_cpu(50.0)
+        registrar_cpu(80.0)
+        assert 'cpu_alto' not in monitor.alertas_ativos
+        
+        registrar_cpu(81.0)
+        assert 'cpu_alto' in monitor.alertas_ativos
+        
+        # Só resolve após três amostras seguidas abaixo do limite
+        registrar_cpu(50.0)
+        registrar_cpu(50.0)
+        registrar_cpu(80.0)
+        registrar_cpu(50.0)
+        registrar_cpu(50.0)
+        assert 'cpu_alto' in monitor.alertas_ativos
+        
+        registrar_cpu(50.0)
+        assert 'cpu_alto' not in monitor.alertas_ativos
+        assert len(monitor.alertas_historico) == 1
+    
+    def test_supressao_de_alerta_reemitido(self, monitor):
+        """Testa que o mesmo tipo e severidade não é reemitido dentro da janela."""
+        def registrar_cpu(cpu_percent):
+            agora = datetime.now()
+            monitor.metricas_sistema_historico.append(
+                MetricasSistema(agora, cpu_percent, 10.0, 1000.0, 10.0, 100.0, 50, 5)
+            )
+            monitor.metricas_aplicacao_historico.append(
+                MetricasAplicacao(agora, 1, 1.0, 1.0, 90.0, 0, 0.0, 100.0)
+            )
+            monitor._verificar_alertas()
+        
+        for cpu_percent in (80.0, 81.0, 50.0, 50.0, 50.0):
+            registrar_cpu(cpu_percent)
+        assert 'cpu_alto' not in monitor.alertas_ativos
+        
+        # Valores diferentes, mesmo tipo e severidade: suprimido
+        registrar_cpu(84.3)
+        registrar_cpu(77.9)
+        assert 'cpu_alto' not in monitor.alertas_ativos
+        
+        # A supressão do alerta alto não alcança o crítico
+        registrar_cpu(95.0)
+        registrar_cpu(96.0)
+        assert monitor.alertas_ativos['cpu_critico'].severidade == 'critica'
+        assert len(monitor.alertas_historico) == 2
+    
+    def test_historico_em_camadas(self, monitor):
+        """Testa a consolidação do histórico e a costura das camadas em desde()."""
+        # 8 horas de coletas por minuto; a CPU registra o índice da coleta
+        inicio = datetime.now() - timedelta(hours=8)
+        for i in range(480):
+            monitor.metricas_sistema_historico.append(
+                MetricasSistema(inicio + timedelta(minutes=i + 1), float(i), 10.0, 1000.0, 10.0, 100.0, 50, 5)
+            )
+        
+        pontos = monitor.obter_metricas_historico(horas=8, tipo='sistema')['sistema']
+        
+        # Ordem cronológica estrita
+        instantes = [ponto['timestamp'] for ponto in pontos]
+        assert instantes == sorted(set(instantes))
+        
+        # A última hora fica coleta a coleta, sem extremos
+        assert [ponto['cpu_percent'] for ponto in pontos[-60:]] == [float(i) for i in range(420, 480)]
+        assert all(ponto['minimos'] is None for ponto in pontos[-60:])
+        
+        # Cada ponto cobre um intervalo de coletas [mínimo, máximo]; as camadas
+        # não se sobrepõem
+        intervalos = [
+            (ponto['cpu_percent'], ponto['cpu_percent']) if ponto['minimos'] is None
+            else (ponto['minimos']['cpu_percent'], ponto['maximos']['cpu_percent'])
+            for ponto in pontos
+        ]
+        assert all(anterior[1] < atual[0] for anterior, atual in zip(intervalos, intervalos[1:]))
+        assert intervalos[0][0] == 0.0
+        
+        # Médias de 5 e de 30 coletas, com os extremos preservados
+        larguras = {maximo - minimo for minimo, maximo in intervalos}
+        assert larguras == {0.0, 4.0, 29.0}
+        for ponto, (minimo, maximo) in zip(pontos, intervalos):
+            assert ponto['cpu_percent'] == (minimo + maximo) / 2
 
 @pytest.mark.integration
 @pytest.mark.slow